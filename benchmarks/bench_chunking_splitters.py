@@ -0,0 +1,59 @@
+"""
+Chunking time of the offset splitters against the LangChain splitters they replace.
+
+    python benchmarks/bench_chunking_splitters.py --size-mb 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The module dir for the entry point file, the root for the code shared between modules
+sys.path[:0] = [os.path.join(ROOT, 'modules', 'txt', 'chunking'), ROOT]
+
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter  # noqa: E402
+from chunks_extractor import ChunksExtractor  # noqa: E402
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do', 'eiusmod']
+    paragraphs = list()
+    length = 0
+    while length < size:
+        paragraph = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 200))) + '.'
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return '\n\n'.join(paragraphs)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=100)
+    args = parser.parse_args()
+
+    text = make_text(int(args.size_mb * 2 ** 20))
+    baselines = {
+        'fixed-size': CharacterTextSplitter(separator="", chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+        'recursive': RecursiveCharacterTextSplitter(chunk_size=args.chunk_size,
+                                                    chunk_overlap=args.chunk_overlap,
+                                                    length_function=len,
+                                                    is_separator_regex=False),
+    }
+    for strategy, splitter in baselines.items():
+        tic = time.perf_counter()
+        expected = [document.page_content for document in splitter.create_documents([text])]
+        baseline_time = time.perf_counter() - tic
+        tic = time.perf_counter()
+        chunks = ChunksExtractor.chunking_strategy(text, strategy, args.chunk_size, args.chunk_overlap)
+        offsets_time = time.perf_counter() - tic
+        print(f"{strategy:>10}: {len(chunks)} chunks, identical={chunks == expected}, "
+              f"langchain {baseline_time:.2f}s, offsets {offsets_time:.2f}s ({baseline_time / offsets_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Cleaning time of ChunksExtractor.clean_text against the baseline partition_text + unstructured cleaners chain.
+
+    python benchmarks/bench_clean_text.py --chunks 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from functools import partial
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The module dir for the entry point file, the root for the code shared between modules
+sys.path[:0] = [os.path.join(ROOT, 'modules', 'txt', 'chunking'), ROOT]
+
+import nltk  # noqa: E402
+from nltk.tokenize.punkt import PunktSentenceTokenizer  # noqa: E402
+import unstructured.partition.text as partition_text_module  # noqa: E402
+from unstructured.cleaners.core import clean, clean_non_ascii_chars, clean_ordered_bullets, group_broken_paragraphs, \
+    remove_punctuation, replace_unicode_quotes  # noqa: E402
+from unstructured.documents.elements import Text  # noqa: E402
+from chunks_extractor import ChunksExtractor  # noqa: E402
+
+CLEANERS = [
+    partial(clean, extra_whitespace=True, dashes=True, bullets=True, trailing_punctuation=True, lowercase=True),
+    replace_unicode_quotes,
+    clean_non_ascii_chars,
+    group_broken_paragraphs,
+    remove_punctuation,
+]
+
+
+def baseline_clean(file_path: str) -> str:
+    text = ''
+    for element in partition_text_module.partition_text(filename=file_path):
+        element = Text(element.text)
+        element.apply(*CLEANERS)
+        if element.text.split() != []:
+            element.text = clean_ordered_bullets(text=element.text)
+        text += element.text + ' '
+    return text
+
+
+def make_chunk(rng: random.Random, size: int) -> str:
+    words = ['The', 'quick', 'brown', 'fox', '–', 'jumps', 'over', 'the', 'lazy', 'dog.', '•', '“quoted”', '1.2', 'café']
+    lines = list()
+    length = 0
+    while length < size:
+        line = ' '.join(rng.choice(words) for _ in range(rng.randint(5, 30)))
+        lines.append(line)
+        length += len(line) + 1
+    return rng.choice(['\n', '\n\n']).join(lines)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunks', type=int, default=500)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('taggers/averaged_perceptron_tagger')
+    except LookupError:
+        # Without the NLTK models, both paths split sentences with an untrained Punkt model and the baseline skips
+        # element classification (its result is not used by the cleaning), so the baseline is faster than in the runner
+        print("NLTK models not found - the baseline runs without element classification")
+        partition_text_module.sent_tokenize = PunktSentenceTokenizer().tokenize
+        partition_text_module.is_possible_narrative_text = lambda *args, **kwargs: False
+        partition_text_module.is_possible_title = lambda *args, **kwargs: False
+
+    rng = random.Random(0)
+    chunks = [make_chunk(rng, args.chunk_size).encode('utf-8') for _ in range(args.chunks)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = list()
+        for ind, data in enumerate(chunks):
+            paths.append(os.path.join(temp_dir, f'chunk-{ind}.txt'))
+            with open(paths[-1], 'wb') as f:
+                f.write(data)
+        tic = time.perf_counter()
+        expected = [baseline_clean(path) for path in paths]
+        baseline_time = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    cleaned = [ChunksExtractor.clean_text(data, to_correct_spelling=False) for data in chunks]
+    clean_time = time.perf_counter() - tic
+    print(f"{args.chunks} chunks of {args.chunk_size} characters, identical={cleaned == expected}")
+    print(f"baseline: {baseline_time:.2f}s, clean_text: {clean_time:.2f}s ({baseline_time / clean_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Time of the NLTK strategies on one process against the sharded process pool, with a check that the spans are identical.
+
+    python benchmarks/bench_nltk_sharding.py --size-mb 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The module dir for the entry point file, the root for the code shared between modules
+sys.path[:0] = [os.path.join(ROOT, 'modules', 'txt', 'chunking'), ROOT]
+
+import nltk  # noqa: E402
+from nltk.tokenize.punkt import PunktSentenceTokenizer  # noqa: E402
+import chunks_extractor  # noqa: E402
+from chunks_extractor import ChunksExtractor  # noqa: E402
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'Dr.', 'Smith', 'e.g.', 'elit', 'sed', 'do', 'eiusmod', 'etc.']
+    paragraphs = list()
+    length = 0
+    while length < size:
+        sentences = [' '.join(rng.choice(words) for _ in range(rng.randint(5, 30))) + rng.choice(['.', '?', '!'])
+                     for _ in range(rng.randint(1, 8))]
+        paragraphs.append(' '.join(sentences))
+        length += len(paragraphs[-1]) + 2
+    return '\n\n'.join(paragraphs)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=20)
+    args = parser.parse_args()
+
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        print("NLTK punkt model not found - both paths use an untrained Punkt model")
+        tokenizer = PunktSentenceTokenizer()
+        nltk.sent_tokenize = lambda text, language='english': tokenizer.tokenize(text)
+
+    text = make_text(int(args.size_mb * 2 ** 20))
+    print(f"{len(text) / 2 ** 20:.1f} MB, {chunks_extractor._available_cpus()} CPUs, "
+          f"shards of {chunks_extractor.NLTK_SHARD_SIZE} chars")
+    for strategy, tokenize in [('nltk-sentence', chunks_extractor._sentence_spans),
+                               ('nltk-paragraphs', chunks_extractor._paragraph_spans)]:
+        tic = time.perf_counter()
+        expected = tokenize(text)
+        serial_time = time.perf_counter() - tic
+        tic = time.perf_counter()
+        spans = ChunksExtractor.chunking_spans(text, strategy, 0, 0)
+        sharded_time = time.perf_counter() - tic
+        print(f"{strategy:>15}: {len(spans)} chunks, identical={spans == expected}, "
+              f"serial {serial_time:.2f}s, sharded {sharded_time:.2f}s ({serial_time / sharded_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
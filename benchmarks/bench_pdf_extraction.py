@@ -0,0 +1,58 @@
+"""
+PDF text extraction time on one process against the process pool and the supervised workers, with a check that the
+text is identical.
+
+    python benchmarks/bench_pdf_extraction.py --pages 2000 --num-workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'modules', 'pdf', 'pdf_extract'))
+
+import fitz  # noqa: E402
+from pdf_extractor import PdfExtractor  # noqa: E402
+
+
+def make_pdf(path: str, pages: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'café', 'naïve', 'elit', 'sed', 'do', 'eiusmod']
+    with fitz.open() as doc:
+        for page_index in range(pages):
+            page = doc.new_page()
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(200, 600)))
+            page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Page {page_index + 1}\n{text}", fontsize=8)
+        doc.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--num-workers', type=int, default=4)
+    parser.add_argument('--pages-per-shard', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'bench.pdf')
+        make_pdf(pdf_path, args.pages)
+        expected = None
+        for name, num_workers, page_timeout in [('serial', 1, 0),
+                                                (f'{args.num_workers} processes', args.num_workers, 0),
+                                                (f'{args.num_workers} supervised', args.num_workers, 60)]:
+            tic = time.perf_counter()
+            [text_path] = PdfExtractor.extract_text_from_pdf(pdf_path, num_workers=num_workers,
+                                                             pages_per_shard=args.pages_per_shard,
+                                                             page_timeout=page_timeout)
+            elapsed = time.perf_counter() - tic
+            with open(text_path, encoding='utf-8') as f:
+                text = f.read()
+            expected = text if expected is None else expected
+            print(f"{name:>15}: {args.pages} pages, identical={text == expected}, {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
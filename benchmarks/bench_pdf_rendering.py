@@ -0,0 +1,64 @@
+"""
+PDF page rendering time on one process against the process pool and the supervised workers, with a check that the
+images are byte-identical.
+
+    python benchmarks/bench_pdf_rendering.py --pages 300 --num-workers 4 --image-format jpeg
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'modules', 'pdf', 'pdf_to_image'))
+
+import fitz  # noqa: E402
+from pdf_to_image import ServiceRunner  # noqa: E402
+
+
+def make_pdf(path: str, pages: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'café', 'naïve', 'elit', 'sed', 'do', 'eiusmod']
+    with fitz.open() as doc:
+        for page_index in range(pages):
+            page = doc.new_page()
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(200, 600)))
+            page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Page {page_index + 1}\n{text}", fontsize=8)
+        doc.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--num-workers', type=int, default=4)
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--colorspace', default='rgb', choices=['rgb', 'gray'])
+    parser.add_argument('--image-format', default='png', choices=['png', 'jpeg', 'webp'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'bench.pdf')
+        make_pdf(pdf_path, args.pages)
+        expected = None
+        for name, num_workers, page_timeout in [('serial', 1, 0),
+                                                (f'{args.num_workers} processes', args.num_workers, 0),
+                                                (f'{args.num_workers} supervised', args.num_workers, 60)]:
+            images_path = os.path.join(temp_dir, name)
+            os.makedirs(images_path)
+            tic = time.perf_counter()
+            images = list()
+            for _, result in ServiceRunner.render_pages(file_path=pdf_path, images_path=images_path,
+                                                        num_workers=num_workers, dpi=args.dpi,
+                                                        colorspace=args.colorspace, image_format=args.image_format,
+                                                        page_timeout=page_timeout):
+                with open(result['path'], 'rb') as f:
+                    images.append(f.read())
+            elapsed = time.perf_counter() - tic
+            expected = images if expected is None else expected
+            print(f"{name:>15}: {args.pages} pages, identical={images == expected}, {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Spell correction throughput of SpellCorrector against autocorrect.Speller, on dictionary words with random typos.
+
+    python benchmarks/bench_spell_corrector.py --words 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The module dir for the entry point file, the root for the code shared between modules
+sys.path[:0] = [os.path.join(ROOT, 'modules', 'txt', 'chunking'), ROOT]
+
+from autocorrect import Speller  # noqa: E402
+from chunks_extractor import SpellCorrector  # noqa: E402
+
+
+def typo(rng: random.Random, word: str) -> str:
+    word = list(word)
+    for _ in range(rng.randint(0, 2)):
+        ind = rng.randrange(len(word))
+        if rng.random() < 0.5 and len(word) > 1:
+            del word[ind]
+        else:
+            word.insert(ind, rng.choice('abcdefghijklmnopqrstuvwxyz'))
+    return ''.join(word)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    speller = Speller(lang='en')
+    rng = random.Random(args.seed)
+    dictionary = sorted(word for word in speller.nlp_data if word.isalpha() and word.isascii())
+    text = ' '.join(typo(rng, rng.choice(dictionary)) for _ in range(args.words))
+
+    tic = time.perf_counter()
+    expected = speller(text)
+    baseline_time = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    spell_corrector = SpellCorrector(lang='en')
+    spell_corrector._get_deletes_index()
+    build_time = time.perf_counter() - tic
+    tic = time.perf_counter()
+    corrected = spell_corrector(text)
+    corrector_time = time.perf_counter() - tic
+
+    print(f"{args.words} words, identical={corrected == expected}")
+    print(f"autocorrect.Speller: {baseline_time:.2f}s ({args.words / baseline_time:.0f} words/s)")
+    print(f"SpellCorrector: {corrector_time:.2f}s ({args.words / corrector_time:.0f} words/s), "
+          f"index built once per process in {build_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
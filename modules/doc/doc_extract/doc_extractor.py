@@ -1,13 +1,115 @@
+from xml.etree import ElementTree
 from spire.doc import Document as SpireDocument, FileFormat
-from docx import Document as DocxDocument
+from typing import Iterator
 from pathlib import Path
 import dtlpy as dl
+import posixpath
 import tempfile
+import zipfile
 import logging
 import os
 
 logger = logging.getLogger('pdf-to-text-logger')
 
+# DOCX parts
+W_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+OFFICE_DOCUMENT_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+DEFAULT_DOCUMENT_PART = 'word/document.xml'
+
+# Text equivalents of the run elements, the same as python-docx
+RUN_TEXT = {W_NAMESPACE + 'cr': '\n',
+            W_NAMESPACE + 'noBreakHyphen': '-',
+            W_NAMESPACE + 'ptab': '\t',
+            W_NAMESPACE + 'tab': '\t'}
+
+
+def _document_part(docx_zip: zipfile.ZipFile) -> str:
+    """
+    Finds the main document part of a DOCX package from its relationships.
+
+    Args:
+        docx_zip (zipfile.ZipFile): The opened DOCX package.
+
+    Returns:
+        str: The name of the main document part in the package.
+    """
+    try:
+        relationships = ElementTree.fromstring(docx_zip.read('_rels/.rels'))
+    except KeyError:
+        return DEFAULT_DOCUMENT_PART
+    for relationship in relationships:
+        if relationship.get('Type') == OFFICE_DOCUMENT_RELATIONSHIP:
+            return posixpath.normpath(relationship.get('Target').lstrip('/'))
+    return DEFAULT_DOCUMENT_PART
+
+
+def _run_text(run: ElementTree.Element) -> str:
+    """
+    Returns the text of a `w:r` element, translating tabs and breaks like python-docx does.
+    """
+    text = list()
+    for child in run:
+        if child.tag == W_NAMESPACE + 't':
+            text.append(child.text or '')
+        elif child.tag == W_NAMESPACE + 'br':
+            # Column and page breaks have no text equivalent
+            if child.get(W_NAMESPACE + 'type', 'textWrapping') == 'textWrapping':
+                text.append('\n')
+        else:
+            text.append(RUN_TEXT.get(child.tag, ''))
+    return ''.join(text)
+
+
+def _paragraph_text(paragraph: ElementTree.Element) -> str:
+    """
+    Returns the text of a `w:p` element: its runs, and the runs of its hyperlinks.
+    """
+    text = list()
+    for child in paragraph:
+        if child.tag == W_NAMESPACE + 'r':
+            text.append(_run_text(child))
+        elif child.tag == W_NAMESPACE + 'hyperlink':
+            text.extend(_run_text(run) for run in child.iterfind(W_NAMESPACE + 'r'))
+    return ''.join(text)
+
+
+def _table_rows(table: ElementTree.Element) -> Iterator[str]:
+    """
+    Yields the text of each row of a `w:tbl` element, with the cells separated by tabs.
+
+    A cell spanning several grid columns is repeated for each of them, and a cell continuing a vertical merge takes the
+    text of the cell starting the merge, as python-docx reads them. The cells of the previous row are kept by grid
+    offset to resolve the merges, so every row is read once.
+    """
+    previous_row = dict()
+    for row in table.iterfind(W_NAMESPACE + 'tr'):
+        # Rows may start after the first grid column
+        grid_before = row.find(f'{W_NAMESPACE}trPr/{W_NAMESPACE}gridBefore')
+        grid_offset = 0 if grid_before is None else int(grid_before.get(W_NAMESPACE + 'val', 0))
+        current_row = dict()
+        cells = list()
+        for cell in row.iterfind(W_NAMESPACE + 'tc'):
+            properties = cell.find(W_NAMESPACE + 'tcPr')
+            grid_span, vertical_merge = 1, None
+            if properties is not None:
+                span = properties.find(W_NAMESPACE + 'gridSpan')
+                if span is not None:
+                    grid_span = int(span.get(W_NAMESPACE + 'val'))
+                merge = properties.find(W_NAMESPACE + 'vMerge')
+                if merge is not None:
+                    vertical_merge = merge.get(W_NAMESPACE + 'val', 'continue')
+
+            if vertical_merge == 'continue' and grid_offset in previous_row:
+                text, cell_span = previous_row[grid_offset]
+            else:
+                text = '\n'.join(_paragraph_text(paragraph) for paragraph in cell.iterfind(W_NAMESPACE + 'p'))
+                cell_span = grid_span
+            current_row[grid_offset] = (text, cell_span)
+            cells.extend([text] * cell_span)
+            grid_offset += grid_span
+        previous_row = current_row
+        yield '\t'.join(cells)
+
 
 class DocExtractor(dl.BaseServiceRunner):
 
@@ -73,11 +175,47 @@ class DocExtractor(dl.BaseServiceRunner):
 
         return new_item
 
+    @staticmethod
+    def iter_content(docx_path, extract_tables=True) -> Iterator[str]:
+        """
+        Streams the text lines of a DOCX file: one line per paragraph and, optionally, one line per table row with the
+        cells separated by tabs, in document order.
+
+        The document XML is parsed incrementally from the DOCX package, and each paragraph or table is released once its
+        text is yielded, so memory is bounded by the largest paragraph or table rather than by the document.
+
+        Args:
+            docx_path (str): The local path to the DOCX file to be processed.
+            extract_tables (bool, optional): Whether to extract text from tables in the DOCX file. Default is True.
+
+        Returns:
+            Iterator[str]: The text lines extracted.
+        """
+        with zipfile.ZipFile(docx_path) as docx_zip:
+            with docx_zip.open(_document_part(docx_zip)) as document_xml:
+                depth = 0
+                body = None
+                for event, element in ElementTree.iterparse(document_xml, events=('start', 'end')):
+                    if event == 'start':
+                        depth += 1
+                        if depth == 2 and element.tag == W_NAMESPACE + 'body':
+                            body = element
+                        continue
+
+                    depth -= 1
+                    # Only the block elements directly in the body, nested paragraphs and tables are read with them
+                    if depth != 2 or body is None:
+                        continue
+                    if element.tag == W_NAMESPACE + 'p':
+                        yield _paragraph_text(element)
+                    elif element.tag == W_NAMESPACE + 'tbl' and extract_tables is True:
+                        yield from _table_rows(element)
+                    body.remove(element)
+
     @staticmethod
     def extract_content(docx_path, extract_tables=True) -> str:
         """
-        Extracts text content from a DOCX file, including optional table content,
-        and saves the extracted text to a txt file.
+        Extracts text content from a DOCX file, including optional table content.
 
         Args:
             docx_path (str): The local path to the DOCX file to be processed.
@@ -86,22 +224,4 @@ class DocExtractor(dl.BaseServiceRunner):
         Returns:
             str: The text extracted.
         """
-        doc = DocxDocument(docx_path)
-        full_text = list()
-        table_index = 0
-        for element in doc.element.body:
-            if element.tag.endswith('p'):  # Check if element is a paragraph
-                para = element.text
-                full_text.append(para)
-
-            elif element.tag.endswith('tbl') and extract_tables is True:  # Check if element is a table
-                table = doc.tables[table_index]
-                for row in table.rows:
-                    row_text = "\t".join(cell.text for cell in row.cells)
-                    full_text.append(row_text)
-                table_index += 1
-
-                # Join all collected text into one string
-        text = '\n'.join(full_text)
-
-        return text
+        return '\n'.join(DocExtractor.iter_content(docx_path=docx_path, extract_tables=extract_tables))
@@ -1,8 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from multiprocessing.connection import wait
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, Tuple
+import multiprocessing
+import time
+import pandas as pd
 import dtlpy as dl
 import tempfile
 import logging
+import hashlib
+import shutil
 
 # import pypdf
 import tqdm
@@ -11,6 +19,150 @@ import os
 
 logger = logging.getLogger('pdf-to-text-logger')
 
+# Parallel text extraction - worker processes (1 extracts in the calling process) and pages per worker task
+DEFAULT_NUM_WORKERS = 1
+DEFAULT_PAGES_PER_SHARD = 50
+# Streaming extraction - pages between checkpoint uploads, and where the checkpoints are kept in the dataset. The
+# checkpoint extension is not a text one, so the partial text never fires text triggers
+DEFAULT_CHECKPOINT_INTERVAL = 100
+CHECKPOINT_REMOTE_PATH = '/.pdf_extraction_checkpoints'
+CHECKPOINT_EXTENSION = '.checkpoint'
+# Image extraction - images below these sizes (icons, bullets) are skipped
+DEFAULT_MIN_IMAGE_PIXELS = 1024
+DEFAULT_MIN_IMAGE_BYTES = 512
+# Output mode - 'document' uploads one .txt item per PDF, 'pages' one item per group of pages
+DEFAULT_OUTPUT_MODE = 'document'
+DEFAULT_PAGES_PER_ITEM = 1
+# Page triage - a page needs this many non-whitespace characters to have a text layer, and images covering this
+# fraction of a text page make it mixed
+DEFAULT_PAGE_TRIAGE = False
+TRIAGE_MIN_TEXT_CHARS = 16
+TRIAGE_MIXED_IMAGE_COVERAGE = 0.3
+# Per-page time budget in seconds - pages are processed in supervised worker processes that are killed when a page
+# runs longer, and the page is skipped. 0 processes the pages without a budget
+DEFAULT_PAGE_TIMEOUT = 0
+
+
+def _extract_pages_text(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Extracts the text of pages [start, stop) with a document opened by the calling process."""
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_index].get_text() for page_index in range(start, stop)]
+
+
+def _page_text(page) -> str:
+    return page.get_text()
+
+
+def _text_chars(text: str) -> int:
+    """Number of non-whitespace characters of a page text."""
+    return len(''.join(text.split()))
+
+
+def _supervised_pages_worker(pdf_path: str, start: int, stop: int, connection, page_function: Callable):
+    """Sends (page index, result) of each page in [start, stop) to the supervisor as soon as the page is done."""
+    with fitz.open(pdf_path) as doc:
+        for page_index in range(start, stop):
+            connection.send((page_index, page_function(doc[page_index])))
+    connection.close()
+
+
+def _supervised_pages(pdf_path: str, page_function: Callable, page_timeout: float, num_workers: int = 1,
+                      pages_per_shard: int = DEFAULT_PAGES_PER_SHARD, start_page: int = 0) -> Iterator[tuple]:
+    """
+    Yields (page index, result) of `page_function` for each page from `start_page`, in page order, running the pages
+    in worker processes that each handle a shard of consecutive pages.
+
+    A worker that does not finish a page within `page_timeout` seconds is killed, the page is yielded with a None
+    result, and a new worker continues the shard from the next page. A page whose worker crashes is skipped the same
+    way.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    shards = deque((start, min(start + pages_per_shard, page_count))
+                   for start in range(start_page, page_count, pages_per_shard))
+    workers = dict()
+    results = dict()
+    next_page = start_page
+
+    def start_worker(start: int, stop: int):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_supervised_pages_worker,
+                                          args=(pdf_path, start, stop, sender, page_function),
+                                          daemon=True)
+        process.start()
+        sender.close()
+        workers[receiver] = {'process': process, 'page': start, 'stop': stop,
+                             'deadline': time.monotonic() + page_timeout}
+
+    def stop_worker(receiver, skip_page: bool):
+        state = workers.pop(receiver)
+        state['process'].kill()
+        state['process'].join()
+        receiver.close()
+        if skip_page is True and state['page'] < state['stop']:
+            results[state['page']] = None
+            if state['page'] + 1 < state['stop']:
+                shards.appendleft((state['page'] + 1, state['stop']))
+
+    try:
+        while next_page < page_count:
+            while shards and len(workers) < num_workers:
+                start_worker(*shards.popleft())
+            timeout = max(0, min(state['deadline'] for state in workers.values()) - time.monotonic())
+            for receiver in wait(list(workers), timeout=timeout):
+                try:
+                    page_index, result = receiver.recv()
+                except EOFError:
+                    # The worker exited - done with its shard, or crashed in the middle of a page
+                    if workers[receiver]['page'] < workers[receiver]['stop']:
+                        logger.warning(f"Page worker crashed, skipping page | page={workers[receiver]['page'] + 1}")
+                    stop_worker(receiver, skip_page=True)
+                    continue
+                results[page_index] = result
+                workers[receiver]['page'] = page_index + 1
+                workers[receiver]['deadline'] = time.monotonic() + page_timeout
+            now = time.monotonic()
+            for receiver in [receiver for receiver, state in workers.items() if state['deadline'] <= now]:
+                logger.warning(f"Page exceeded the time budget, skipping page | page={workers[receiver]['page'] + 1} "
+                               f"page_timeout={page_timeout}")
+                stop_worker(receiver, skip_page=True)
+
+            # Workers wait on a full pipe while the caller consumes the results, which must not count against them
+            consume_start = time.monotonic()
+            while next_page in results:
+                yield next_page, results.pop(next_page)
+                next_page += 1
+            consumed = time.monotonic() - consume_start
+            for state in workers.values():
+                state['deadline'] += consumed
+    finally:
+        for receiver in list(workers):
+            stop_worker(receiver, skip_page=False)
+
+
+def _triage_page(page, chars: int = None) -> str:
+    """
+    Classifies a page as 'text', 'image' (image-only, e.g. a scan), 'mixed' or 'empty' without rendering it.
+
+    `chars` is the number of non-whitespace characters of the page text, when the text extraction already counted
+    them. Otherwise only pages that use fonts can have a text layer, so the text is only extracted for those to count
+    its characters. The image coverage is the fraction of the page area covered by image placements, clipped to the
+    page.
+    """
+    page_area = abs(page.rect) or 1
+    coverage = 0
+    for image_info in page.get_image_info():
+        coverage += abs(fitz.Rect(image_info['bbox']) & page.rect)
+    coverage = min(coverage / page_area, 1.0)
+    if chars is None:
+        chars = _text_chars(page.get_text()) if len(page.get_fonts()) > 0 else 0
+
+    if chars < TRIAGE_MIN_TEXT_CHARS:
+        return 'image' if coverage > 0 else 'empty'
+    if coverage >= TRIAGE_MIXED_IMAGE_COVERAGE:
+        return 'mixed'
+    return 'text'
+
 
 class PdfExtractor(dl.BaseServiceRunner):
 
@@ -28,6 +180,16 @@ class PdfExtractor(dl.BaseServiceRunner):
         node = context.node
         extract_images = node.metadata['customNodeConfig']['extract_images']
         remote_path_for_extractions = node.metadata['customNodeConfig']['remote_path_for_extractions']
+        num_workers = node.metadata['customNodeConfig'].get('num_workers', DEFAULT_NUM_WORKERS)
+        pages_per_shard = node.metadata['customNodeConfig'].get('pages_per_shard', DEFAULT_PAGES_PER_SHARD)
+        streaming = node.metadata['customNodeConfig'].get('streaming', False)
+        checkpoint_interval = node.metadata['customNodeConfig'].get('checkpoint_interval', DEFAULT_CHECKPOINT_INTERVAL)
+        min_image_pixels = node.metadata['customNodeConfig'].get('min_image_pixels', DEFAULT_MIN_IMAGE_PIXELS)
+        min_image_bytes = node.metadata['customNodeConfig'].get('min_image_bytes', DEFAULT_MIN_IMAGE_BYTES)
+        output_mode = node.metadata['customNodeConfig'].get('output_mode', DEFAULT_OUTPUT_MODE)
+        pages_per_item = node.metadata['customNodeConfig'].get('pages_per_item', DEFAULT_PAGES_PER_ITEM)
+        page_triage = node.metadata['customNodeConfig'].get('page_triage', DEFAULT_PAGE_TRIAGE)
+        page_timeout = node.metadata['customNodeConfig'].get('page_timeout', DEFAULT_PAGE_TIMEOUT)
 
         logger.info(
             f"Starting PDF extraction | item_id={item.id} name={item.name} mimetype={item.mimetype} dir={item.dir}"
@@ -41,16 +203,79 @@ class PdfExtractor(dl.BaseServiceRunner):
             item_local_path = item.download(local_path=temp_dir)
             logger.info(f"Downloaded item | item_id={item.id} local_path={item_local_path}")
 
+            # Extra user metadata of specific output files
+            files_metadata = dict()
+            # Pages skipped for exceeding the page time budget
+            skipped_pages = list()
+            # Non-whitespace characters of each extracted page, so the triage does not extract the text again
+            page_chars = dict() if page_triage is True else None
+            # Text and images in one pass over the document, unless the text is extracted by worker processes,
+            # streamed to disk or split into page items
+            single_pass = (extract_images is True and streaming is not True and num_workers <= 1
+                           and output_mode == 'document' and page_timeout <= 0)
             try:
-                new_items_path = self.extract_text_from_pdf(pdf_path=item_local_path)
-                logger.info(f"Extracted text | item_id={item.id} text_file={new_items_path}")
+                if output_mode == 'pages':
+                    page_files = self.extract_text_by_pages(pdf_path=item_local_path,
+                                                            pages_per_item=pages_per_item,
+                                                            num_workers=num_workers,
+                                                            pages_per_shard=pages_per_shard,
+                                                            page_timeout=page_timeout,
+                                                            skipped_pages=skipped_pages,
+                                                            page_chars=page_chars)
+                    new_items_path = [path for path, _ in page_files]
+                    files_metadata.update(page_files)
+                elif single_pass is True:
+                    new_items_path = self.extract_text_and_images(pdf_path=item_local_path,
+                                                                  min_image_pixels=min_image_pixels,
+                                                                  min_image_bytes=min_image_bytes,
+                                                                  page_chars=page_chars)
+                    logger.info(f"Extracted text and images | item_id={item.id} files={len(new_items_path)}")
+                elif streaming is True:
+                    new_items_path = self.extract_text_streaming(pdf_path=item_local_path,
+                                                                 item=item,
+                                                                 num_workers=num_workers,
+                                                                 pages_per_shard=pages_per_shard,
+                                                                 checkpoint_interval=checkpoint_interval,
+                                                                 page_timeout=page_timeout,
+                                                                 skipped_pages=skipped_pages,
+                                                                 page_chars=page_chars)
+                else:
+                    new_items_path = self.extract_text_from_pdf(pdf_path=item_local_path,
+                                                                num_workers=num_workers,
+                                                                pages_per_shard=pages_per_shard,
+                                                                page_timeout=page_timeout,
+                                                                skipped_pages=skipped_pages,
+                                                                page_chars=page_chars)
+                logger.info(f"Extracted text | item_id={item.id} text_files={len(new_items_path)}")
             except Exception:
                 logger.exception(f"Failed extracting text | item_id={item.id} path={item_local_path}")
                 raise
 
-            if extract_images is True:
+            if output_mode != 'pages':
+                files_metadata[new_items_path[0]] = dict()
+            if page_timeout > 0:
+                # Each page item gets the skipped pages of its own range
+                for new_item_path, page_metadata in files_metadata.items():
+                    page_metadata['skipped_pages'] = [
+                        page for page in skipped_pages
+                        if page_metadata.get('page_start', page) <= page <= page_metadata.get('page_end', page)
+                    ]
+                if skipped_pages:
+                    logger.warning(f"Skipped pages over the time budget | item_id={item.id} pages={skipped_pages}")
+
+            if page_triage is True:
+                triage = self.triage_pages(pdf_path=item_local_path, skipped_pages=skipped_pages, page_chars=page_chars)
+                # Each page item gets the classes of its own pages, and the document counts
+                for new_item_path, page_metadata in files_metadata.items():
+                    first_page, last_page = page_metadata.get('page_start', 1), page_metadata.get('page_end')
+                    page_metadata['page_triage'] = {**triage, 'pages': triage['pages'][first_page - 1:last_page]}
+                logger.info(f"Triaged pages | item_id={item.id} counts={triage['counts']} scanned={triage['scanned']}")
+
+            if extract_images is True and single_pass is not True:
                 try:
-                    new_images_path = self.extract_images_from_pdf(pdf_path=item_local_path)
+                    new_images_path = self.extract_images_from_pdf(pdf_path=item_local_path,
+                                                                   min_image_pixels=min_image_pixels,
+                                                                   min_image_bytes=min_image_bytes)
                     new_items_path.extend(new_images_path)
                     logger.info(f"Extracted images | item_id={item.id} images_saved={len(new_images_path)}")
                 except Exception:
@@ -63,10 +288,18 @@ class PdfExtractor(dl.BaseServiceRunner):
             logger.info(
                 f"Uploading extracted files | item_id={item.id} count={len(new_items_path)} remote_path={remote_path}"
             )
+            # Per-file metadata is only supported by the data-frame form of the bulk upload
+            rows = list()
+            for new_item_path in new_items_path:
+                user_metadata = {"extracted_from_pdf": True, "original_item_id": item.id}
+                user_metadata.update(files_metadata.get(new_item_path, dict()))
+                rows.append({
+                    'local_path': new_item_path,
+                    'remote_path': remote_path,
+                    'item_metadata': {"user": user_metadata},
+                })
             new_items = item.dataset.items.upload(
-                local_path=new_items_path,
-                remote_path=remote_path,
-                item_metadata={"user": {"extracted_from_pdf": True, "original_item_id": item.id}},
+                local_path=pd.DataFrame(rows),
                 overwrite=True,
                 raise_on_error=True,
             )
@@ -86,36 +319,40 @@ class PdfExtractor(dl.BaseServiceRunner):
             logger.info(
                 f"Upload completed | item_id={item.id} uploaded_count={len(all_items)} remote_path={remote_path} names={uploaded_names}"
             )
+            if streaming is True and output_mode != 'pages':
+                # Only now, so that a failed upload is retried from the checkpoints
+                self.delete_checkpoints(item=item)
 
         return all_items
 
     @staticmethod
-    def extract_text_from_pdf(pdf_path: str) -> List[str]:
+    def extract_text_from_pdf(pdf_path: str, num_workers: int = DEFAULT_NUM_WORKERS,
+                              pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+                              page_timeout: float = DEFAULT_PAGE_TIMEOUT, skipped_pages: list = None,
+                              page_chars: dict = None) -> List[str]:
         """
         Extracts text from a PDF file and saves it as a single .txt file.
 
         Args:
             pdf_path (str): The path to the PDF file to be processed.
+            num_workers (int): Number of worker processes extracting pages in parallel. 1 extracts serially.
+            pages_per_shard (int): Number of consecutive pages each worker task extracts.
+            page_timeout (float): Time budget of a page in seconds. 0 extracts without a budget.
+            skipped_pages (list): Collects the page numbers (1-based) of the pages skipped for exceeding the budget.
+            page_chars (dict): Collects the number of non-whitespace characters of each page text, by page number
+                (1-based), for `triage_pages`.
 
         Returns:
             list: A list containing the path to the generated .txt file.
         """
         logger.info(f"Begin text extraction | pdf_path={pdf_path}")
         try:
-            with fitz.open(pdf_path) as doc:
-                # pdf_reader = pypdf.PdfReader(open_file)
-                logger.info(f"PDF metadata: {doc.metadata} pages={len(doc)}")
-
-                text_parts = []
-                with tqdm.tqdm(total=len(doc), desc="Extracting text from PDF") as pbar:
-                    for i_page, page in enumerate(doc):
-                        text_parts.append(page.get_text())
-                        if (i_page + 1) % 10 == 0:
-                            pbar.update(10)
-                    # Update remaining pages at the end
-                    remaining = len(doc) % 10
-                    if remaining:
-                        pbar.update(remaining)
+            text_parts = list(PdfExtractor.extract_pages_text(pdf_path=pdf_path,
+                                                              num_workers=num_workers,
+                                                              pages_per_shard=pages_per_shard,
+                                                              page_timeout=page_timeout,
+                                                              skipped_pages=skipped_pages,
+                                                              page_chars=page_chars))
 
             new_item_path = f'{os.path.splitext(pdf_path)[0]}.txt'
             text_content = '\n\n'.join(text_parts)
@@ -130,12 +367,304 @@ class PdfExtractor(dl.BaseServiceRunner):
         return [new_item_path]
 
     @staticmethod
-    def extract_images_from_pdf(pdf_path) -> List:
+    def extract_text_by_pages(pdf_path: str, pages_per_item: int = DEFAULT_PAGES_PER_ITEM,
+                              num_workers: int = DEFAULT_NUM_WORKERS,
+                              pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+                              page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+                              skipped_pages: list = None, page_chars: dict = None) -> List[Tuple[str, dict]]:
+        """
+        Extracts text from a PDF file into one .txt file per group of `pages_per_item` consecutive pages.
+
+        Joining the files' texts with a blank line in between gives the text `extract_text_from_pdf` writes. Each file
+        comes with its page range (1-based, inclusive) and the character offsets of its text in that document text.
+
+        Args:
+            pdf_path (str): The path to the PDF file to be processed.
+            pages_per_item (int): Number of pages per .txt file.
+            num_workers (int): Number of worker processes. 1 extracts in the calling process.
+            pages_per_shard (int): Number of consecutive pages each worker task extracts.
+            page_timeout (float): Time budget of a page in seconds. 0 extracts without a budget.
+            skipped_pages (list): Collects the page numbers (1-based) of the pages skipped for exceeding the budget.
+            page_chars (dict): Collects the number of non-whitespace characters of each page text, by page number
+                (1-based), for `triage_pages`.
+
+        Returns:
+            list: (path, metadata) of each generated .txt file, in page order. The metadata holds `page_start`,
+            `page_end`, `char_start`, `char_end` and the document's `page_count`.
+        """
+        logger.info(f"Begin text extraction by pages | pdf_path={pdf_path} pages_per_item={pages_per_item}")
+        stem = os.path.splitext(pdf_path)[0]
+        page_files = list()
+        offset = 0
+
+        def write_group(first_page: int, texts: List[str]):
+            nonlocal offset
+            text_content = '\n\n'.join(texts)
+            new_item_path = f'{stem}_pages_{first_page + 1}-{first_page + len(texts)}.txt'
+            with open(new_item_path, 'w', encoding='utf-8') as f:
+                f.write(text_content)
+            page_files.append((new_item_path, {
+                "page_start": first_page + 1,
+                "page_end": first_page + len(texts),
+                "char_start": offset,
+                "char_end": offset + len(text_content),
+            }))
+            # Pages are separated by a blank line in the document text
+            offset += len(text_content) + 2
+
+        group = list()
+        page_count = 0
+        pages = PdfExtractor.extract_pages_text(pdf_path=pdf_path,
+                                                num_workers=num_workers,
+                                                pages_per_shard=pages_per_shard,
+                                                page_timeout=page_timeout,
+                                                skipped_pages=skipped_pages,
+                                                page_chars=page_chars)
+        for page_index, page_text in enumerate(pages):
+            group.append(page_text)
+            page_count = page_index + 1
+            if len(group) == pages_per_item:
+                write_group(first_page=page_index + 1 - len(group), texts=group)
+                group = list()
+        if group:
+            write_group(first_page=page_count - len(group), texts=group)
+
+        for _, page_metadata in page_files:
+            page_metadata["page_count"] = page_count
+        logger.info(f"Text files written | pdf_path={pdf_path} files={len(page_files)} pages={page_count}")
+        return page_files
+
+    @staticmethod
+    def triage_pages(pdf_path: str, skipped_pages: list = None, page_chars: dict = None) -> dict:
+        """
+        Classifies every page of a PDF file as 'text', 'image', 'mixed' or 'empty' without rendering, from the page's
+        fonts, text characters and image coverage.
+
+        Args:
+            pdf_path (str): The path to the PDF file to be processed.
+            skipped_pages (list): Page numbers (1-based) of pages skipped by the text extraction. They are not
+                opened again and are classified as 'skipped'.
+            page_chars (dict): The number of non-whitespace characters of each page text by page number (1-based),
+                as collected by the text extraction. The text of the pages it holds is not extracted again.
+
+        Returns:
+            dict: `pages` - the class of each page in page order, `counts` - the number of pages of each class, and
+            `scanned` - True when image-only pages make up at least half of the non-empty, non-skipped pages.
+        """
+        with fitz.open(pdf_path) as doc:
+            skipped = set(skipped_pages or list())
+            page_chars = page_chars or dict()
+            page_classes = ['skipped' if page.number + 1 in skipped
+                            else _triage_page(page, chars=page_chars.get(page.number + 1)) for page in doc]
+        counts = {page_class: page_classes.count(page_class)
+                  for page_class in ('text', 'image', 'mixed', 'empty', 'skipped')}
+        non_empty = len(page_classes) - counts['empty'] - counts['skipped']
+        scanned = counts['image'] > 0 and counts['image'] * 2 >= non_empty
+        return {'pages': page_classes, 'counts': counts, 'scanned': scanned}
+
+    @staticmethod
+    def extract_pages_text(pdf_path: str, num_workers: int = DEFAULT_NUM_WORKERS,
+                           pages_per_shard: int = DEFAULT_PAGES_PER_SHARD, start_page: int = 0,
+                           page_timeout: float = DEFAULT_PAGE_TIMEOUT, skipped_pages: list = None,
+                           page_chars: dict = None) -> Iterator[str]:
+        """
+        Yields the text of each page of a PDF file, in page order.
+
+        With more than one worker, the pages are split into shards of `pages_per_shard` consecutive pages and each
+        shard is extracted by a worker process that opens its own document. Shards are yielded in page order, so the
+        output is the same as extracting serially.
+
+        With a page time budget, the pages are extracted by supervised worker processes (at least one). A page that
+        takes longer than `page_timeout` seconds is skipped: its worker is killed, an empty text is yielded for it and
+        its page number is appended to `skipped_pages`.
+
+        Args:
+            pdf_path (str): The path to the PDF file to be processed.
+            num_workers (int): Number of worker processes. 1 extracts in the calling process.
+            pages_per_shard (int): Number of consecutive pages each worker task extracts.
+            start_page (int): Index of the first page to extract.
+            page_timeout (float): Time budget of a page in seconds. 0 extracts without a budget.
+            skipped_pages (list): Collects the page numbers (1-based) of the skipped pages.
+            page_chars (dict): Collects the number of non-whitespace characters of each page text, by page number
+                (1-based), for `triage_pages`.
+
+        Returns:
+            Iterator[str]: The text of each page from `start_page`.
+        """
+        if page_timeout > 0:
+            pages = _supervised_pages(pdf_path=pdf_path,
+                                      page_function=_page_text,
+                                      page_timeout=page_timeout,
+                                      num_workers=max(num_workers, 1),
+                                      pages_per_shard=pages_per_shard,
+                                      start_page=start_page)
+            for page_index, page_text in pages:
+                if page_text is None:
+                    if skipped_pages is not None:
+                        skipped_pages.append(page_index + 1)
+                    page_text = ''
+                elif page_chars is not None:
+                    page_chars[page_index + 1] = _text_chars(page_text)
+                yield page_text
+            return
+
+        with fitz.open(pdf_path) as doc:
+            # pdf_reader = pypdf.PdfReader(open_file)
+            logger.info(f"PDF metadata: {doc.metadata} pages={len(doc)}")
+            page_count = len(doc)
+
+            if num_workers <= 1 or page_count - start_page <= pages_per_shard:
+                with tqdm.tqdm(total=page_count, initial=start_page, desc="Extracting text from PDF") as pbar:
+                    for i_page in range(start_page, page_count):
+                        page_text = doc[i_page].get_text()
+                        if page_chars is not None:
+                            page_chars[i_page + 1] = _text_chars(page_text)
+                        yield page_text
+                        if (i_page + 1) % 10 == 0:
+                            pbar.update(10)
+                    # Update remaining pages at the end
+                    remaining = page_count % 10
+                    if remaining:
+                        pbar.update(remaining)
+                return
+
+        starts = list(range(start_page, page_count, pages_per_shard))
+        stops = [min(start + pages_per_shard, page_count) for start in starts]
+        logger.info(f"Extracting {page_count - start_page} pages in {len(starts)} shards with {num_workers} processes")
+        with ProcessPoolExecutor(max_workers=num_workers) as executor, \
+                tqdm.tqdm(total=page_count, initial=start_page, desc="Extracting text from PDF") as pbar:
+            shards = executor.map(_extract_pages_text, [pdf_path] * len(starts), starts, stops)
+            for start, shard in zip(starts, shards):
+                if page_chars is not None:
+                    page_chars.update((start + 1 + offset, _text_chars(text)) for offset, text in enumerate(shard))
+                yield from shard
+                pbar.update(len(shard))
+
+    @staticmethod
+    def extract_text_streaming(pdf_path: str, item: dl.Item, num_workers: int = DEFAULT_NUM_WORKERS,
+                               pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+                               checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+                               page_timeout: float = DEFAULT_PAGE_TIMEOUT, skipped_pages: list = None,
+                               page_chars: dict = None) -> List[str]:
+        """
+        Extracts text from a PDF file page by page, appending each page to the .txt file as soon as it is extracted.
+
+        Every `checkpoint_interval` pages, the text written since the previous checkpoint is uploaded to the item's
+        dataset under `CHECKPOINT_REMOTE_PATH` as a non-text `CHECKPOINT_EXTENSION` part file, together with its page
+        range. A retried execution of the same item downloads the parts, concatenates them and continues from the
+        next page. The checkpoints are kept until `delete_checkpoints` is called, once the text item is uploaded.
+
+        Args:
+            pdf_path (str): The path to the PDF file to be processed.
+            item (dl.Item): The PDF item, used to store and find the checkpoints.
+            num_workers (int): Number of worker processes. 1 extracts in the calling process.
+            pages_per_shard (int): Number of consecutive pages each worker task extracts.
+            checkpoint_interval (int): Number of pages between two checkpoint uploads.
+            page_timeout (float): Time budget of a page in seconds. 0 extracts without a budget.
+            skipped_pages (list): Collects the page numbers (1-based) of the pages skipped for exceeding the budget,
+                including the ones skipped before the checkpoints it resumes from.
+            page_chars (dict): Collects the number of non-whitespace characters of each page text extracted by this
+                execution, by page number (1-based), for `triage_pages`.
+
+        Returns:
+            list: A list containing the path to the generated .txt file.
+        """
+        new_item_path = f'{os.path.splitext(pdf_path)[0]}.txt'
+        if skipped_pages is None:
+            skipped_pages = list()
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+
+        # The parts of the item by their first page, chained from the first page of the document
+        parts = dict()
+        for checkpoint_item in item.dataset.items.list(filters=PdfExtractor.checkpoint_filters(item=item)).all():
+            checkpoint = checkpoint_item.metadata.get('user', dict()).get('pdf_extraction_checkpoint', dict())
+            if checkpoint.get('page_count') == page_count and 'first_page' in checkpoint:
+                parts[checkpoint['first_page']] = (checkpoint, checkpoint_item)
+        start_page = 0
+        with open(new_item_path, 'wb') as f:
+            while start_page in parts:
+                checkpoint, checkpoint_item = parts[start_page]
+                f.write(checkpoint_item.download(save_locally=False).read())
+                skipped_pages.extend(checkpoint.get('skipped_pages', list()))
+                start_page = checkpoint['next_page']
+        if start_page > 0:
+            logger.info(f"Resuming text extraction | item_id={item.id} start_page={start_page}")
+
+        def upload_checkpoint(first_page: int, next_page: int, part_offset: int, part_skipped_pages: list):
+            part_name = f"{item.id}-{first_page}{CHECKPOINT_EXTENSION}"
+            part_path = os.path.join(os.path.dirname(new_item_path), part_name)
+            with open(new_item_path, 'rb') as text_file, open(part_path, 'wb') as part_file:
+                text_file.seek(part_offset)
+                shutil.copyfileobj(text_file, part_file)
+            item.dataset.items.upload(
+                local_path=part_path,
+                remote_path=CHECKPOINT_REMOTE_PATH,
+                remote_name=part_name,
+                item_metadata={"user": {"pdf_extraction_checkpoint": {
+                    "original_item_id": item.id,
+                    "page_count": page_count,
+                    "first_page": first_page,
+                    "next_page": next_page,
+                    "skipped_pages": part_skipped_pages,
+                }}},
+                overwrite=True,
+                raise_on_error=True,
+            )
+            os.remove(part_path)
+            logger.info(f"Uploaded extraction checkpoint | item_id={item.id} pages={first_page}-{next_page}")
+
+        logger.info(f"Begin streaming text extraction | pdf_path={pdf_path} start_page={start_page}")
+        part_page, part_offset, part_skipped = start_page, os.path.getsize(new_item_path), len(skipped_pages)
+        with open(new_item_path, 'a', encoding='utf-8') as f:
+            pages = PdfExtractor.extract_pages_text(pdf_path=pdf_path,
+                                                    num_workers=num_workers,
+                                                    pages_per_shard=pages_per_shard,
+                                                    start_page=start_page,
+                                                    page_timeout=page_timeout,
+                                                    skipped_pages=skipped_pages,
+                                                    page_chars=page_chars)
+            for page_index, page_text in enumerate(pages, start=start_page):
+                if page_index > 0:
+                    f.write('\n\n')
+                f.write(page_text)
+                if (page_index + 1) % checkpoint_interval == 0 and page_index + 1 < page_count:
+                    f.flush()
+                    upload_checkpoint(first_page=part_page, next_page=page_index + 1, part_offset=part_offset,
+                                      part_skipped_pages=skipped_pages[part_skipped:])
+                    part_page, part_offset = page_index + 1, os.path.getsize(new_item_path)
+                    part_skipped = len(skipped_pages)
+        logger.info(f"Text file written | path={new_item_path} pages={page_count}")
+        return [new_item_path]
+
+    @staticmethod
+    def checkpoint_filters(item: dl.Item) -> dl.Filters:
+        """
+        Filters of the streaming extraction checkpoints of an item. By the item id in the metadata, so checkpoints of
+        older versions (.txt files) are found as well. Items of a dot folder are hidden, which the default filters
+        exclude.
+        """
+        filters = dl.Filters(field='dir', values=CHECKPOINT_REMOTE_PATH, use_defaults=False)
+        filters.add(field='type', values='file')
+        filters.add(field='metadata.user.pdf_extraction_checkpoint.original_item_id', values=item.id)
+        return filters
+
+    @staticmethod
+    def delete_checkpoints(item: dl.Item):
+        """Deletes the streaming extraction checkpoints of an item, once its text item is uploaded."""
+        item.dataset.items.delete(filters=PdfExtractor.checkpoint_filters(item=item))
+        logger.info(f"Deleted extraction checkpoints | item_id={item.id}")
+
+    @staticmethod
+    def extract_images_from_pdf(pdf_path, min_image_pixels: int = DEFAULT_MIN_IMAGE_PIXELS,
+                                min_image_bytes: int = DEFAULT_MIN_IMAGE_BYTES) -> List:
         """
         Extracts images from a PDF file and saves them as separate image files.
 
         Args:
             pdf_path (str): The path to the PDF file to extract images from.
+            min_image_pixels (int): Images with fewer pixels (width x height) are skipped.
+            min_image_bytes (int): Images whose encoded size is smaller are skipped.
 
         Returns:
             list: A list of paths to the saved image files extracted from the PDF.
@@ -144,33 +673,109 @@ class PdfExtractor(dl.BaseServiceRunner):
         # Use context manager to ensure PDF document is properly closed
         with fitz.open(pdf_path) as pdf_file:
             images_paths = list()
+            seen = set()
             # iterate over PDF pages
             for page_index in range(len(pdf_file)):
-
                 page = pdf_file.load_page(page_index)  # load the page
-                image_list = page.get_images(full=True)  # get images on the page
+                images_paths.extend(PdfExtractor.save_page_images(pdf_file=pdf_file,
+                                                                  page=page,
+                                                                  pdf_path=pdf_path,
+                                                                  seen=seen,
+                                                                  min_image_pixels=min_image_pixels,
+                                                                  min_image_bytes=min_image_bytes))
 
-                if image_list:
-                    logger.info(f"Found a total of {len(image_list)} images on page {page_index}")
-                else:
-                    logger.info(f"No images found on page {page_index}")
+        logger.info(f"Image extraction completed | pdf_path={pdf_path} images_saved={len(images_paths)}")
 
-                for image_index, img in enumerate(image_list, start=1):
-                    # get the cross-reference number of the image object in the PDF (xref - the PDF reader way to locate and access various objects).
-                    xref = img[0]
+        return images_paths
 
-                    base_image = pdf_file.extract_image(xref)
-                    image_bytes, image_ext = base_image["image"], base_image["ext"]
+    @staticmethod
+    def extract_text_and_images(pdf_path: str, min_image_pixels: int = DEFAULT_MIN_IMAGE_PIXELS,
+                                min_image_bytes: int = DEFAULT_MIN_IMAGE_BYTES, page_chars: dict = None) -> List[str]:
+        """
+        Extracts the text and the images of a PDF file in a single pass over its pages.
 
-                    # save the image
-                    image_name = f'{os.path.splitext(pdf_path)[0]}_page_{page_index + 1}.{image_ext}'
-                    with open(image_name, "wb") as image_file:
-                        image_file.write(image_bytes)
-                        images_paths.append(image_name)
-                        logger.info(f"Image saved as {image_name}")
+        The text is saved as a single .txt file, identical to the one `extract_text_from_pdf` writes. Images are saved
+        as in `extract_images_from_pdf`.
 
+        Args:
+            pdf_path (str): The path to the PDF file to be processed.
+            min_image_pixels (int): Images with fewer pixels (width x height) are skipped.
+            min_image_bytes (int): Images whose encoded size is smaller are skipped.
+            page_chars (dict): Collects the number of non-whitespace characters of each page text, by page number
+                (1-based), for `triage_pages`.
+
+        Returns:
+            list: The path to the generated .txt file, followed by the paths to the saved image files.
+        """
+        logger.info(f"Begin text and image extraction | pdf_path={pdf_path}")
+        text_parts = list()
+        images_paths = list()
+        seen = set()
+        with fitz.open(pdf_path) as pdf_file:
+            logger.info(f"PDF metadata: {pdf_file.metadata} pages={len(pdf_file)}")
+            for page in tqdm.tqdm(pdf_file, total=len(pdf_file), desc="Extracting text and images from PDF"):
+                text_parts.append(page.get_text())
+                if page_chars is not None:
+                    page_chars[page.number + 1] = _text_chars(text_parts[-1])
+                images_paths.extend(PdfExtractor.save_page_images(pdf_file=pdf_file,
+                                                                  page=page,
+                                                                  pdf_path=pdf_path,
+                                                                  seen=seen,
+                                                                  min_image_pixels=min_image_pixels,
+                                                                  min_image_bytes=min_image_bytes))
+
+        new_item_path = f'{os.path.splitext(pdf_path)[0]}.txt'
+        text_content = '\n\n'.join(text_parts)
+        with open(new_item_path, 'w', encoding='utf-8') as f:
+            f.write(text_content)
+        logger.info(f"Text file written | path={new_item_path} characters={len(text_content)}")
         logger.info(f"Image extraction completed | pdf_path={pdf_path} images_saved={len(images_paths)}")
+        return [new_item_path] + images_paths
+
+    @staticmethod
+    def save_page_images(pdf_file, page, pdf_path: str, seen: set, min_image_pixels: int = DEFAULT_MIN_IMAGE_PIXELS,
+                         min_image_bytes: int = DEFAULT_MIN_IMAGE_BYTES) -> List[str]:
+        """
+        Saves the images of a page that were not saved for an earlier page.
 
+        Each image object (xref) is decoded at most once per document, and images with identical content under
+        different xrefs are saved once. Images below the size thresholds are skipped; the pixel check uses the
+        dimensions listed on the page, so small images are never decoded.
+
+        Args:
+            pdf_file (fitz.Document): The open PDF document.
+            page (fitz.Page): The page to save the images of.
+            pdf_path (str): The path to the PDF file, used to name the image files.
+            seen (set): The xrefs and content hashes already handled in this document, updated in place.
+            min_image_pixels (int): Images with fewer pixels (width x height) are skipped.
+            min_image_bytes (int): Images whose encoded size is smaller are skipped.
+
+        Returns:
+            list: The paths to the saved image files, named `<pdf name>_page_<page>_xref_<xref>.<ext>`.
+        """
+        images_paths = list()
+        # get the cross-reference number of the image object in the PDF (xref - the PDF reader way to locate and
+        # access various objects), and its width and height
+        for xref, _, width, height, *_ in page.get_images(full=True):
+            if xref in seen:
+                continue
+            seen.add(xref)
+            if width * height < min_image_pixels:
+                continue
+
+            base_image = pdf_file.extract_image(xref)
+            image_bytes, image_ext = base_image["image"], base_image["ext"]
+            digest = hashlib.sha1(image_bytes).digest()
+            if len(image_bytes) < min_image_bytes or digest in seen:
+                continue
+            seen.add(digest)
+
+            # save the image
+            image_name = f'{os.path.splitext(pdf_path)[0]}_page_{page.number + 1}_xref_{xref}.{image_ext}'
+            with open(image_name, "wb") as image_file:
+                image_file.write(image_bytes)
+            images_paths.append(image_name)
+            logger.info(f"Image saved as {image_name}")
         return images_paths
 
 
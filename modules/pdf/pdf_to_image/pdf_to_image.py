@@ -1,13 +1,369 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.connection import wait
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List
+import multiprocessing
+import threading
+import hashlib
+import shutil
+import queue
+import json
+import numpy as np
+import pandas as pd
 import dtlpy as dl
 import tempfile
 import logging
+import math
+import time
 import fitz
+import cv2
 import os
 
 logger = logging.getLogger(name=__name__)
 
+# Per-page time budget in seconds - pages are rendered in supervised worker processes that are killed when a page
+# runs longer, and the page is skipped. 0 renders the pages without a budget
+DEFAULT_PAGE_TIMEOUT = 0
+# Consecutive pages rendered by one worker process task (at most)
+PAGES_PER_SHARD = 10
+# Rendering - worker processes (1 renders in the calling process), resolution, colorspace ('rgb' or 'gray'),
+# image format ('png', 'jpeg' or 'webp') and quality of the lossy formats (1-100)
+DEFAULT_NUM_WORKERS = 1
+DEFAULT_DPI = 72
+DEFAULT_COLORSPACE = 'rgb'
+DEFAULT_IMAGE_FORMAT = 'png'
+DEFAULT_QUALITY = 90
+IMAGE_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'webp': 'webp'}
+# Remote directory of the full-size images. Smaller pyramid levels go to sub-directories named after the level
+IMAGES_REMOTE_PATH = "/images-files"
+# Pyramid levels - long side in pixels of the smaller images made from each full-size render
+DEFAULT_PYRAMID = False
+DEFAULT_THUMBNAIL_SIZE = 256
+DEFAULT_MEDIUM_SIZE = 1024
+# Render-and-upload pipeline - rendered pages waiting for upload, and pages per upload call
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_UPLOAD_BATCH_SIZE = 16
+# Render cache - pages already rendered with the same settings are reused from this local directory, which is
+# bounded in size by evicting the least recently used pages
+DEFAULT_RENDER_CACHE = False
+DEFAULT_RENDER_CACHE_SIZE_MB = 1024
+RENDER_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'pdf_to_image_render_cache')
+# Concurrent executions of the service share the cache
+RENDER_CACHE_LOCK = threading.Lock()
+# Blank page detection - 'keep' does not check the pages, 'flag' marks blank pages in their metadata and 'drop' does not
+# encode and upload them. A page is blank when at most `blank_threshold` of the pixels of its downsampled view (long
+# side of BLANK_SAMPLE_SIZE pixels) differ from the background by more than BLANK_TOLERANCE gray levels
+DEFAULT_BLANK_PAGE_MODE = 'keep'
+DEFAULT_BLANK_THRESHOLD = 0.001
+BLANK_SAMPLE_SIZE = 512
+BLANK_TOLERANCE = 24
+
+
+def _encode_pixmap(pixmap: fitz.Pixmap, image_format: str, quality: int) -> bytes:
+    """Encodes a rendered page. MuPDF writes PNG and JPEG, and OpenCV writes WebP."""
+    if image_format == 'png':
+        return pixmap.tobytes(output='png')
+    if image_format == 'jpeg':
+        return pixmap.tobytes(output='jpeg', jpg_quality=quality)
+    if image_format == 'webp':
+        samples = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+        if pixmap.n == 3:
+            samples = cv2.cvtColor(samples, cv2.COLOR_RGB2BGR)
+        success, encoded = cv2.imencode('.webp', samples, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        if not success:
+            raise ValueError(f"Failed encoding page {pixmap} as webp")
+        return encoded.tobytes()
+    raise ValueError(f"Unsupported image format: {image_format}. Supported formats: {list(IMAGE_EXTENSIONS)}")
+
+
+def _is_blank(pixmap: fitz.Pixmap, blank_threshold: float = DEFAULT_BLANK_THRESHOLD) -> bool:
+    """
+    Checks whether a rendered page is blank from a strided view of its sample buffer, without copying or encoding it.
+    The background is the most frequent gray level, and the content is the fraction of pixels that differ from it.
+    """
+    samples = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    step = max(1, max(pixmap.height, pixmap.width) // BLANK_SAMPLE_SIZE)
+    view = samples[::step, ::step, :min(pixmap.n, 3)]
+    # Sum of the channels, in gray levels times the number of channels
+    gray = view.sum(axis=2, dtype=np.int16)
+    background = np.bincount(gray.ravel()).argmax()
+    content = np.abs(gray - background) > BLANK_TOLERANCE * view.shape[2]
+    return bool(np.count_nonzero(content) <= blank_threshold * content.size)
+
+
+def _resize_pixmap(pixmap: fitz.Pixmap, size: int) -> fitz.Pixmap:
+    """Downscales a rendered page so that its long side is `size` pixels. Smaller pages are returned as they are."""
+    scale = size / max(pixmap.width, pixmap.height)
+    if scale >= 1:
+        return pixmap
+    samples = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    width, height = max(1, round(pixmap.width * scale)), max(1, round(pixmap.height * scale))
+    resized = cv2.resize(samples, (width, height), interpolation=cv2.INTER_AREA)
+    return fitz.Pixmap(pixmap.colorspace, width, height, resized.tobytes(), pixmap.alpha)
+
+
+def _render_page(page, images_path: str, filename: str, dpi: int = DEFAULT_DPI,
+                 colorspace: str = DEFAULT_COLORSPACE, image_format: str = DEFAULT_IMAGE_FORMAT,
+                 quality: int = DEFAULT_QUALITY, blank_page_mode: str = DEFAULT_BLANK_PAGE_MODE,
+                 blank_threshold: float = DEFAULT_BLANK_THRESHOLD, pyramid_sizes: dict = None) -> dict:
+    """
+    Renders a page as an image and returns the image `path` and whether the page is `blank`. A blank page is not
+    encoded in 'drop' mode, and its path is None.
+
+    For each level in `pyramid_sizes` (level name: long side), a downscaled copy of the same render is written under
+    a sub-directory named after the level, and its path is returned in `levels`.
+    """
+    image_filename = os.path.join(images_path, f"{filename}-{page.number}.{IMAGE_EXTENSIONS[image_format]}")
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY if colorspace == 'gray' else fitz.csRGB)
+    blank = blank_page_mode != 'keep' and _is_blank(pixmap=pixmap, blank_threshold=blank_threshold)
+    if blank is True and blank_page_mode == 'drop':
+        return {'path': None, 'blank': True, 'levels': dict()}
+    with open(image_filename, 'wb') as f:
+        f.write(_encode_pixmap(pixmap=pixmap, image_format=image_format, quality=quality))
+    levels = dict()
+    for level, size in (pyramid_sizes or dict()).items():
+        levels[level] = os.path.join(images_path, level, os.path.basename(image_filename))
+        os.makedirs(os.path.dirname(levels[level]), exist_ok=True)
+        with open(levels[level], 'wb') as f:
+            f.write(_encode_pixmap(pixmap=_resize_pixmap(pixmap=pixmap, size=size),
+                                   image_format=image_format,
+                                   quality=quality))
+    return {'path': image_filename, 'blank': blank, 'levels': levels}
+
+
+def _render_pages(file_path: str, page_numbers: List[int], page_function: Callable) -> list:
+    """Renders the given pages with a document opened by the calling process."""
+    with fitz.open(file_path) as pdf_document:
+        return [page_function(pdf_document.load_page(page_number)) for page_number in page_numbers]
+
+
+def _supervised_pages_worker(file_path: str, page_numbers: List[int], connection, page_function: Callable):
+    """Sends (page number, result) of each of the given pages to the supervisor as soon as the page is done."""
+    with fitz.open(file_path) as pdf_document:
+        for page_number in page_numbers:
+            connection.send((page_number, page_function(pdf_document.load_page(page_number))))
+    connection.close()
+
+
+def _supervised_pages(file_path: str, page_numbers: List[int], page_function: Callable, page_timeout: float,
+                      num_workers: int = 1, pages_per_shard: int = PAGES_PER_SHARD) -> Iterator[tuple]:
+    """
+    Yields (page number, result) of `page_function` for each of the given pages, in their order, running the pages in
+    worker processes that each handle a shard of `pages_per_shard` pages.
+
+    A worker that does not finish a page within `page_timeout` seconds is killed, the page is yielded with a None
+    result, and a new worker continues the shard from the next page. A page whose worker crashes is skipped the same
+    way.
+    """
+    shards = deque(page_numbers[start:start + pages_per_shard]
+                   for start in range(0, len(page_numbers), pages_per_shard))
+    workers = dict()
+    results = dict()
+    next_position = 0
+
+    def start_worker(shard: List[int]):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_supervised_pages_worker,
+                                          args=(file_path, shard, sender, page_function),
+                                          daemon=True)
+        process.start()
+        sender.close()
+        # 'position' is the index in the shard of the page the worker is on
+        workers[receiver] = {'process': process, 'shard': shard, 'position': 0,
+                             'deadline': time.monotonic() + page_timeout}
+
+    def stop_worker(receiver, skip_page: bool):
+        state = workers.pop(receiver)
+        state['process'].kill()
+        state['process'].join()
+        receiver.close()
+        if skip_page is True and state['position'] < len(state['shard']):
+            results[state['shard'][state['position']]] = None
+            if state['position'] + 1 < len(state['shard']):
+                shards.appendleft(state['shard'][state['position'] + 1:])
+
+    try:
+        while next_position < len(page_numbers):
+            while shards and len(workers) < num_workers:
+                start_worker(shards.popleft())
+            timeout = max(0, min(state['deadline'] for state in workers.values()) - time.monotonic())
+            for receiver in wait(list(workers), timeout=timeout):
+                state = workers[receiver]
+                try:
+                    page_number, result = receiver.recv()
+                except EOFError:
+                    # The worker exited - done with its shard, or crashed in the middle of a page
+                    if state['position'] < len(state['shard']):
+                        logger.warning(f"Page worker crashed, skipping page {state['shard'][state['position']]}")
+                    stop_worker(receiver, skip_page=True)
+                    continue
+                results[page_number] = result
+                state['position'] += 1
+                state['deadline'] = time.monotonic() + page_timeout
+            now = time.monotonic()
+            for receiver in [receiver for receiver, state in workers.items() if state['deadline'] <= now]:
+                state = workers[receiver]
+                logger.warning(f"Page {state['shard'][state['position']]} exceeded the time budget of "
+                               f"{page_timeout} seconds, skipping it")
+                stop_worker(receiver, skip_page=True)
+
+            # Workers wait on a full pipe while the caller consumes the results, which must not count against them
+            consume_start = time.monotonic()
+            while next_position < len(page_numbers) and page_numbers[next_position] in results:
+                page_number = page_numbers[next_position]
+                yield page_number, results.pop(page_number)
+                next_position += 1
+            consumed = time.monotonic() - consume_start
+            for state in workers.values():
+                state['deadline'] += consumed
+    finally:
+        for receiver in list(workers):
+            stop_worker(receiver, skip_page=False)
+
+
+def _parse_page_selection(page_selection, page_count: int) -> List[int]:
+    """
+    Returns the sorted page numbers (0-based) a page selection refers to, checked against the page count.
+
+    A selection is a list of page numbers, or a string of comma separated terms: a page number (`3`), an inclusive
+    range (`2-5`, or `10-` for page 10 to the last page), `first:N`, `last:N` or `every:K` (pages 0, K, 2K, ...).
+    An empty selection selects all the pages.
+    """
+    if page_selection is None or page_selection == '' or page_selection == []:
+        return list(range(page_count))
+    if isinstance(page_selection, str):
+        terms = [term.strip() for term in page_selection.split(',') if term.strip()]
+    else:
+        terms = list(page_selection)
+
+    selected = set()
+    for term in terms:
+        try:
+            if isinstance(term, int):
+                pages = [term]
+            elif term.startswith(('first:', 'last:', 'every:')):
+                kind, value = term.split(':')
+                value = int(value)
+                if value < 1:
+                    raise ValueError(f"{kind} must be positive")
+                if kind == 'first':
+                    pages = range(min(value, page_count))
+                elif kind == 'last':
+                    pages = range(max(page_count - value, 0), page_count)
+                else:
+                    pages = range(0, page_count, value)
+            elif '-' in term:
+                first, last = term.split('-')
+                last = int(last) if last.strip() else page_count - 1
+                pages = range(int(first), last + 1)
+                if int(first) > last:
+                    raise ValueError("the range is reversed")
+            else:
+                pages = [int(term)]
+        except ValueError as e:
+            raise ValueError(f"Invalid page selection term '{term}': {e}") from e
+        out_of_range = [page for page in pages if not 0 <= page < page_count]
+        if out_of_range:
+            raise ValueError(f"Page selection term '{term}' is out of range, the document has {page_count} pages "
+                             f"(0 to {page_count - 1})")
+        selected.update(pages)
+    return sorted(selected)
+
+
+def _file_hash(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _link_or_copy(source: str, destination: str):
+    """Hard-links a file, or copies it when the two paths are on different file systems."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def _render_cache_get(cache_dir: str, key: str, image_filename: str) -> dict:
+    """
+    Returns the render result of a cached page, with its images linked to `image_filename` (and to the pyramid level
+    directories next to it), or None when the page is not cached. A hit marks the page as recently used.
+    """
+    entry_path = os.path.join(cache_dir, key)
+    linked = list()
+    try:
+        with RENDER_CACHE_LOCK:
+            with open(os.path.join(entry_path, 'entry.json')) as f:
+                entry = json.load(f)
+            result = {'path': None, 'blank': entry['blank'], 'levels': dict()}
+            if entry['path'] is not None:
+                _link_or_copy(os.path.join(entry_path, entry['path']), image_filename)
+                linked.append(image_filename)
+                result['path'] = image_filename
+                for level, level_file in entry['levels'].items():
+                    result['levels'][level] = os.path.join(os.path.dirname(image_filename), level,
+                                                           os.path.basename(image_filename))
+                    os.makedirs(os.path.dirname(result['levels'][level]), exist_ok=True)
+                    _link_or_copy(os.path.join(entry_path, level_file), result['levels'][level])
+                    linked.append(result['levels'][level])
+            os.utime(entry_path)
+    except (OSError, ValueError, KeyError):
+        # The page is rendered again to the same paths - unlink the files already linked, so that the render does not
+        # write into the cached files through their shared inode
+        for path in linked:
+            os.remove(path)
+        return None
+    return result
+
+
+def _render_cache_put(cache_dir: str, key: str, result: dict):
+    """Stores the render result of a page. The entry is written to a temporary directory and renamed into place."""
+    entry_path = os.path.join(cache_dir, key)
+    temp_path = tempfile.mkdtemp(dir=cache_dir, prefix='.')
+    entry = {'path': None, 'blank': result['blank'], 'levels': dict()}
+    try:
+        if result['path'] is not None:
+            entry['path'] = f"full{os.path.splitext(result['path'])[1]}"
+            _link_or_copy(result['path'], os.path.join(temp_path, entry['path']))
+            for level, level_path in result['levels'].items():
+                entry['levels'][level] = f"{level}{os.path.splitext(level_path)[1]}"
+                _link_or_copy(level_path, os.path.join(temp_path, entry['levels'][level]))
+        with open(os.path.join(temp_path, 'entry.json'), 'w') as f:
+            json.dump(entry, f)
+        with RENDER_CACHE_LOCK:
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path)
+            os.rename(temp_path, entry_path)
+    except OSError:
+        logger.exception(f"Failed storing render cache entry {key}")
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _render_cache_evict(cache_dir: str, max_bytes: int):
+    """Removes the least recently used entries until the cache is at most `max_bytes`."""
+    with RENDER_CACHE_LOCK:
+        entries = list()
+        for entry in os.scandir(cache_dir):
+            # Entries being written start with a dot
+            if entry.is_dir() and not entry.name.startswith('.'):
+                size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+            evicted += 1
+    if evicted:
+        logger.info(f"Render cache: evicted {evicted} pages, {total_bytes / 2 ** 20:.1f} MB left")
+
 
 class ServiceRunner(dl.BaseServiceRunner):
     """
@@ -15,73 +371,381 @@ class ServiceRunner(dl.BaseServiceRunner):
     """
 
     @staticmethod
-    def pdf_item_to_images(item: dl.Item) -> List[dl.Item]:
+    def pdf_item_to_images(item: dl.Item, context: dl.Context = None, page_selection=None) -> List[dl.Item]:
         """
         Convert pdf dataloop item to an image item.
         :param item: pdf dataloop item.
-        :param context: Dataloop context to set if to use replace modality for visualize the item in the platform.
+        :param context: Dataloop context with the node configuration.
+        :param page_selection: The pages to convert, see `_parse_page_selection`. When not given, the selection in
+            the item's `metadata.user.page_selection` (e.g. set by an upstream classifier) is used, and then the node's.
         :return:
         """
 
         if not item.mimetype == "application/pdf":
             raise dl.PlatformException(f"Item id : {item.id} is not a PDF file! This functions excepts pdf only")
 
+        node_config = dict()
+        if context is not None and context.node is not None:
+            node_config = context.node.metadata.get('customNodeConfig', dict())
+        page_timeout = node_config.get('page_timeout', DEFAULT_PAGE_TIMEOUT)
+        num_workers = node_config.get('num_workers', DEFAULT_NUM_WORKERS)
+        dpi = node_config.get('dpi', DEFAULT_DPI)
+        colorspace = node_config.get('colorspace', DEFAULT_COLORSPACE)
+        image_format = node_config.get('image_format', DEFAULT_IMAGE_FORMAT)
+        quality = node_config.get('quality', DEFAULT_QUALITY)
+
+        queue_size = node_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+        upload_batch_size = node_config.get('upload_batch_size', DEFAULT_UPLOAD_BATCH_SIZE)
+        blank_page_mode = node_config.get('blank_page_mode', DEFAULT_BLANK_PAGE_MODE)
+        blank_threshold = node_config.get('blank_threshold', DEFAULT_BLANK_THRESHOLD)
+        pyramid_sizes = dict()
+        if node_config.get('pyramid', DEFAULT_PYRAMID) is True:
+            pyramid_sizes = {'thumbnail': node_config.get('thumbnail_size', DEFAULT_THUMBNAIL_SIZE),
+                             'medium': node_config.get('medium_size', DEFAULT_MEDIUM_SIZE)}
+        render_cache_dir = RENDER_CACHE_DIR if node_config.get('render_cache', DEFAULT_RENDER_CACHE) is True else None
+        render_cache_size_mb = node_config.get('render_cache_size_mb', DEFAULT_RENDER_CACHE_SIZE_MB)
+        if page_selection is None:
+            page_selection = item.metadata.get('user', dict()).get('page_selection')
+        if page_selection is None:
+            page_selection = node_config.get('page_selection', None)
+
         with tempfile.TemporaryDirectory() as temp_dir:
             # Downloading local path
             item_local_path = item.download(local_path=temp_dir)
+            images_path = os.path.join(temp_dir, "images_files")
+            os.makedirs(images_path, exist_ok=True)
 
-            images_paths = ServiceRunner.convert_pdf_to_image(file_path=item_local_path, temp_dir=temp_dir)
-
-            logger.info(f"Total of {len(images_paths)} images were created")
-            # Uploading all created items - upload bulk
-            img_items = item.dataset.items.upload(
-                local_path=images_paths,
-                remote_path="/images-files",
-                item_metadata={"user": {"pdf_to_image": {"converted_to_image": True, "original_item_id": item.id}}},
-                overwrite=True,
-                raise_on_error=True
-            )
-
-        # Uploader returns generator or a single item, or None
-        if img_items is None:
-            all_items = list()
-        elif isinstance(img_items, dl.Item):
-            all_items = [img_items]
-        else:
-            all_items = [item for item in img_items]
+            pages = ServiceRunner.render_pages(file_path=item_local_path,
+                                               images_path=images_path,
+                                               num_workers=num_workers,
+                                               dpi=dpi,
+                                               colorspace=colorspace,
+                                               image_format=image_format,
+                                               quality=quality,
+                                               page_timeout=page_timeout,
+                                               page_selection=page_selection,
+                                               blank_page_mode=blank_page_mode,
+                                               blank_threshold=blank_threshold,
+                                               pyramid_sizes=pyramid_sizes,
+                                               cache_dir=render_cache_dir,
+                                               cache_size_mb=render_cache_size_mb)
+            pdf_to_image_metadata = {"converted_to_image": True, "original_item_id": item.id,
+                                     "dpi": dpi, "colorspace": colorspace, "image_format": image_format}
+            all_items = ServiceRunner.upload_pages_pipeline(pages=pages,
+                                                            item=item,
+                                                            metadata=pdf_to_image_metadata,
+                                                            record_skipped=page_timeout > 0,
+                                                            record_blank=blank_page_mode != 'keep',
+                                                            queue_size=queue_size,
+                                                            upload_batch_size=upload_batch_size)
+        logger.info(f"Total of {len(all_items)} images were uploaded")
 
         return all_items
 
     @staticmethod
-    def convert_pdf_to_image(file_path: str, temp_dir: str) -> List:
+    def upload_pages_pipeline(pages: Iterator[tuple], item: dl.Item, metadata: dict, record_skipped: bool = False,
+                              record_blank: bool = False, queue_size: int = DEFAULT_QUEUE_SIZE,
+                              upload_batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE) -> List[dl.Item]:
+        """
+        Upload rendered pages while the next pages are rendered.
+        The calling thread consumes `pages` and puts the rendered images on a bounded queue, and an upload thread
+        uploads them in batches of `upload_batch_size` and deletes the local files. When the queue is full the
+        rendering waits, so at most about `queue_size + upload_batch_size` rendered images are on disk at a time.
+        :param pages: (page number, render result) of each page in page order, see `render_pages`.
+        :param item: The pdf dataloop item.
+        :param metadata: The `pdf_to_image` user metadata of the image items. The page number is added per item.
+        :param record_skipped: Lists the skipped pages in the `skipped_pages` metadata of the pdf item.
+        :param record_blank: Lists the blank pages in the `blank_pages` metadata of the pdf item, and marks each image
+            item as `blank` or not.
+        :param queue_size: Capacity of the queue between rendering and upload.
+        :param upload_batch_size: Number of pages per upload call.
+        :return: The uploaded full-size image items, in page order. The pyramid levels of a page, if any, are uploaded
+            to sub-directories named after the level, and every image of the page has the remote file paths of all
+            its levels in the `pyramid` metadata and its own level in `pyramid_level`.
+        """
+        rendered = queue.Queue(maxsize=queue_size)
+        # Page lists of the whole document, recorded once in the metadata of the pdf item
+        page_lists = dict()
+        if record_skipped is True:
+            page_lists['skipped_pages'] = list()
+        if record_blank is True:
+            page_lists['blank_pages'] = list()
+        all_items = list()
+        upload_errors = list()
+
+        def upload_batch(batch: List[tuple]):
+            rows = list()
+            for page_number, result in batch:
+                page_metadata = {**metadata, "page_number": page_number}
+                if record_blank is True:
+                    page_metadata["blank"] = result['blank']
+                levels = {'full': (result['path'], IMAGES_REMOTE_PATH)}
+                for level, level_path in result['levels'].items():
+                    levels[level] = (level_path, f"{IMAGES_REMOTE_PATH}/{level}")
+                if len(levels) > 1:
+                    page_metadata["pyramid"] = {level: f"{remote_path}/{os.path.basename(local_path)}"
+                                                for level, (local_path, remote_path) in levels.items()}
+                for level, (local_path, remote_path) in levels.items():
+                    level_metadata = {**page_metadata, "pyramid_level": level} if len(levels) > 1 else page_metadata
+                    rows.append({'local_path': local_path,
+                                 'remote_path': remote_path,
+                                 'item_metadata': {"user": {"pdf_to_image": level_metadata}}})
+            img_items = item.dataset.items.upload(local_path=pd.DataFrame(rows), overwrite=True, raise_on_error=True)
+            # Uploader returns generator or a single item, or None
+            if img_items is None:
+                img_items = list()
+            elif isinstance(img_items, dl.Item):
+                img_items = [img_items]
+            all_items.extend(img_items)
+            for row in rows:
+                os.remove(row['local_path'])
+
+        def upload():
+            batch = list()
+            while True:
+                task = rendered.get()
+                if task is not None:
+                    batch.append(task)
+                if batch and (task is None or len(batch) >= upload_batch_size):
+                    # After a failed upload, keep draining the queue so that the rendering does not block
+                    if not upload_errors:
+                        try:
+                            upload_batch(batch)
+                        except Exception as e:
+                            upload_errors.append(e)
+                    batch = list()
+                if task is None:
+                    break
+
+        uploader = threading.Thread(target=upload)
+        uploader.start()
+        try:
+            for page_number, result in pages:
+                if upload_errors:
+                    break
+                if result is None:
+                    page_lists['skipped_pages'].append(page_number)
+                    continue
+                if result['blank'] is True and record_blank is True:
+                    page_lists['blank_pages'].append(page_number)
+                if result['path'] is not None:
+                    rendered.put((page_number, result))
+        finally:
+            rendered.put(None)
+            uploader.join()
+        if upload_errors:
+            raise upload_errors[0]
+
+        all_items.sort(key=lambda img_item: img_item.metadata['user']['pdf_to_image']['page_number'])
+        if page_lists.get('skipped_pages'):
+            logger.warning(f"Pages {page_lists['skipped_pages']} of item {item.id} were skipped for exceeding the "
+                           f"time budget")
+        if page_lists.get('blank_pages'):
+            logger.info(f"Pages {page_lists['blank_pages']} of item {item.id} are blank")
+        if page_lists:
+            item.metadata.setdefault('user', dict())['pdf_to_image'] = page_lists
+            item.update()
+        return [img_item for img_item in all_items
+                if img_item.metadata['user']['pdf_to_image'].get('pyramid_level', 'full') == 'full']
+
+    @staticmethod
+    def convert_pdf_to_image(file_path: str, temp_dir: str, page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+                             skipped_pages: list = None, num_workers: int = DEFAULT_NUM_WORKERS, dpi: int = DEFAULT_DPI,
+                             colorspace: str = DEFAULT_COLORSPACE, image_format: str = DEFAULT_IMAGE_FORMAT,
+                             quality: int = DEFAULT_QUALITY, page_selection=None,
+                             blank_page_mode: str = DEFAULT_BLANK_PAGE_MODE,
+                             blank_threshold: float = DEFAULT_BLANK_THRESHOLD, blank_pages: list = None) -> List:
         """
         Convert pdf file to a txt file in the platform. Visualize using modality.
+
+        Deprecated - kept for existing callers. The service renders with `render_pages` and uploads with
+        `upload_pages_pipeline`, which also produce the pyramid levels; this returns the full page images only.
         :param file_path: File local path.
         :param temp_dir: Temporary directory to store images.
+        :param page_timeout: Time budget of a page in seconds. With a budget, pages are rendered by supervised
+            worker processes, and a page that takes longer is skipped. 0 renders without a budget.
+        :param skipped_pages: Collects the page numbers (0-based, as in the image names) of the skipped pages.
+        :param num_workers: Number of worker processes rendering pages in parallel. 1 renders in the calling process.
+        :param dpi: Rendering resolution.
+        :param colorspace: 'rgb' or 'gray'.
+        :param image_format: 'png', 'jpeg' or 'webp'.
+        :param quality: Quality of the 'jpeg' and 'webp' formats, 1-100.
+        :param page_selection: The pages to convert, see `_parse_page_selection`. None converts all the pages.
+        :param blank_page_mode: 'keep' does not check the pages, 'flag' and 'drop' collect the blank pages in
+            `blank_pages`, and 'drop' does not create their images.
+        :param blank_threshold: Maximal fraction of content pixels of a blank page.
+        :param blank_pages: Collects the page numbers of the blank pages.
         :return: created images paths
 
         """
-        filename = Path(file_path).stem
         # Path to save the generated images
         images_path = os.path.join(temp_dir, "images_files")
         os.makedirs(images_path, exist_ok=True)
         paths = list()
-        # The converted images
+        pages = ServiceRunner.render_pages(file_path=file_path,
+                                           images_path=images_path,
+                                           num_workers=num_workers,
+                                           dpi=dpi,
+                                           colorspace=colorspace,
+                                           image_format=image_format,
+                                           quality=quality,
+                                           page_timeout=page_timeout,
+                                           page_selection=page_selection,
+                                           blank_page_mode=blank_page_mode,
+                                           blank_threshold=blank_threshold)
+        for page_number, result in pages:
+            if result is None:
+                if skipped_pages is not None:
+                    skipped_pages.append(page_number)
+                continue
+            if result['blank'] is True and blank_pages is not None:
+                blank_pages.append(page_number)
+            if result['path'] is not None:
+                paths.append(result['path'])
+
+        return paths
+
+    @staticmethod
+    def render_pages(file_path: str, images_path: str, num_workers: int = DEFAULT_NUM_WORKERS, dpi: int = DEFAULT_DPI,
+                     colorspace: str = DEFAULT_COLORSPACE, image_format: str = DEFAULT_IMAGE_FORMAT,
+                     quality: int = DEFAULT_QUALITY, page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+                     page_selection=None, blank_page_mode: str = DEFAULT_BLANK_PAGE_MODE,
+                     blank_threshold: float = DEFAULT_BLANK_THRESHOLD, pyramid_sizes: dict = None,
+                     cache_dir: str = None, cache_size_mb: int = DEFAULT_RENDER_CACHE_SIZE_MB) -> Iterator[tuple]:
+        """
+        Render the pages of a pdf file as image files, in parallel worker processes when there is more than one.
+        :param file_path: File local path.
+        :param images_path: Directory to write the images to.
+        :param num_workers: Number of worker processes. 1 renders in the calling process.
+        :param dpi: Rendering resolution.
+        :param colorspace: 'rgb' or 'gray'.
+        :param image_format: 'png', 'jpeg' or 'webp'.
+        :param quality: Quality of the 'jpeg' and 'webp' formats, 1-100.
+        :param page_timeout: Time budget of a page in seconds, 0 for no budget.
+        :param page_selection: The pages to render, see `_parse_page_selection`. None renders all the pages.
+        :param blank_page_mode: 'keep', 'flag' or 'drop' blank pages.
+        :param blank_threshold: Maximal fraction of content pixels of a blank page.
+        :param pyramid_sizes: Long side in pixels of each smaller level (e.g. {'thumbnail': 256}) to make from every
+            render. None makes the full-size images only.
+        :param cache_dir: Directory of the render cache, None to render every page. Pages are cached by the content
+            hash of the pdf, the page number and the render settings, and a cached page is not rendered again.
+        :param cache_size_mb: Size bound of the render cache in MB.
+        :return: (page number, render result) of each selected page in page order. The result holds the image `path`
+            (None for a dropped blank page), whether the page is `blank` and the paths of its pyramid `levels`, and
+            is None for a page skipped for exceeding the time budget.
+        """
+        if image_format not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {image_format}. Supported formats: {list(IMAGE_EXTENSIONS)}")
+        render_page = partial(_render_page,
+                              images_path=images_path,
+                              filename=Path(file_path).stem,
+                              dpi=dpi,
+                              colorspace=colorspace,
+                              image_format=image_format,
+                              quality=quality,
+                              blank_page_mode=blank_page_mode,
+                              blank_threshold=blank_threshold,
+                              pyramid_sizes=pyramid_sizes)
         with fitz.open(file_path) as pdf_document:
-            # Iterate over each page
-            for page_number in range(pdf_document.page_count):
-                # Get the page
-                image_filename = os.path.join(images_path, f"{filename}-{page_number}.png")
-                page = pdf_document.load_page(page_number)
+            page_count = pdf_document.page_count
+        page_numbers = _parse_page_selection(page_selection=page_selection, page_count=page_count)
+        logger.info(f"Rendering {len(page_numbers)} of {page_count} pages")
+        if cache_dir is None:
+            yield from ServiceRunner.render_page_numbers(file_path=file_path,
+                                                         page_numbers=page_numbers,
+                                                         render_page=render_page,
+                                                         num_workers=num_workers,
+                                                         page_timeout=page_timeout)
+            return
 
-                # Render the page as an image (PNG)
-                image = page.get_pixmap()
+        os.makedirs(cache_dir, exist_ok=True)
+        settings = json.dumps({'dpi': dpi, 'colorspace': colorspace, 'image_format': image_format, 'quality': quality,
+                               'blank_page_mode': blank_page_mode, 'blank_threshold': blank_threshold,
+                               'pyramid_sizes': pyramid_sizes or dict()}, sort_keys=True)
+        key_prefix = f"{_file_hash(file_path)}-{hashlib.sha1(settings.encode('utf-8')).hexdigest()[:16]}"
+        image_filenames = {page_number: os.path.join(images_path, f"{Path(file_path).stem}-{page_number}."
+                                                                  f"{IMAGE_EXTENSIONS[image_format]}")
+                           for page_number in page_numbers}
+        # Cached pages are linked into `images_path` only when they are yielded, to keep the disk use of the caller
+        # bounded when the links fall back to copies
+        cached = {page_number for page_number in page_numbers
+                  if os.path.isfile(os.path.join(cache_dir, f"{key_prefix}-{page_number}", 'entry.json'))}
+        misses = [page_number for page_number in page_numbers if page_number not in cached]
+        hits = 0
 
-                # Save the image to a file
-                image.save(image_filename)
-                paths.append(image_filename)
+        rendered = ServiceRunner.render_page_numbers(file_path=file_path,
+                                                     page_numbers=misses,
+                                                     render_page=render_page,
+                                                     num_workers=num_workers,
+                                                     page_timeout=page_timeout)
+        try:
+            for page_number in page_numbers:
+                key = f"{key_prefix}-{page_number}"
+                if page_number in cached:
+                    result = _render_cache_get(cache_dir=cache_dir,
+                                               key=key,
+                                               image_filename=image_filenames[page_number])
+                    if result is not None:
+                        hits += 1
+                        yield page_number, result
+                        continue
+                    # Evicted by a concurrent execution since the lookup
+                    _, result = next(ServiceRunner.render_page_numbers(file_path=file_path,
+                                                                       page_numbers=[page_number],
+                                                                       render_page=render_page,
+                                                                       page_timeout=page_timeout))
+                else:
+                    _, result = next(rendered)
+                # Pages skipped for exceeding the time budget are not cached
+                if result is not None:
+                    _render_cache_put(cache_dir=cache_dir, key=key, result=result)
+                yield page_number, result
+        finally:
+            rendered.close()
+            logger.info(f"Render cache: {hits} hits, {len(page_numbers) - hits} misses")
+            _render_cache_evict(cache_dir=cache_dir, max_bytes=cache_size_mb * 2 ** 20)
 
-        return paths
+    @staticmethod
+    def render_page_numbers(file_path: str, page_numbers: List[int], render_page: Callable,
+                            num_workers: int = DEFAULT_NUM_WORKERS,
+                            page_timeout: float = DEFAULT_PAGE_TIMEOUT) -> Iterator[tuple]:
+        """
+        Render the given pages with `render_page`, see `render_pages`.
+        :param file_path: File local path.
+        :param page_numbers: The pages to render, in order.
+        :param render_page: Renders a page and returns its render result.
+        :param num_workers: Number of worker processes. 1 renders in the calling process.
+        :param page_timeout: Time budget of a page in seconds, 0 for no budget.
+        :return: (page number, render result) of each page, in the order of `page_numbers`.
+        """
+        # Every worker gets at least one shard
+        pages_per_shard = max(1, min(PAGES_PER_SHARD, math.ceil(len(page_numbers) / max(num_workers, 1))))
+
+        if page_timeout > 0:
+            yield from _supervised_pages(file_path=file_path,
+                                         page_numbers=page_numbers,
+                                         page_function=render_page,
+                                         page_timeout=page_timeout,
+                                         num_workers=max(num_workers, 1),
+                                         pages_per_shard=pages_per_shard)
+        elif num_workers <= 1 or len(page_numbers) <= 1:
+            with fitz.open(file_path) as pdf_document:
+                for page_number in page_numbers:
+                    yield page_number, render_page(pdf_document.load_page(page_number))
+        else:
+            shards = deque(page_numbers[start:start + pages_per_shard]
+                           for start in range(0, len(page_numbers), pages_per_shard))
+            logger.info(f"Rendering in {len(shards)} shards with {num_workers} processes")
+            # At most two shards per worker are submitted ahead of the caller, which bounds the rendered images that
+            # were not consumed yet
+            futures = deque()
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                while shards or futures:
+                    while shards and len(futures) < 2 * num_workers:
+                        shard = shards.popleft()
+                        futures.append((shard, executor.submit(_render_pages, file_path, shard, render_page)))
+                    shard, future = futures.popleft()
+                    yield from zip(shard, future.result())
 
 
 if __name__ == "__main__":
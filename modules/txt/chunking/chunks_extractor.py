@@ -1,23 +1,701 @@
-from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter
-from unstructured.cleaners.core import replace_unicode_quotes, clean, clean_non_ascii_chars, clean_ordered_bullets, group_broken_paragraphs, remove_punctuation
-from unstructured.partition.text import partition_text
-from concurrent.futures import ThreadPoolExecutor
-from unstructured.documents.elements import Text
+from unstructured.cleaners.core import auto_paragraph_grouper, clean_bullets, clean_ordered_bullets, group_broken_paragraphs, remove_punctuation, replace_unicode_quotes
+from unstructured.file_utils.encoding import COMMON_ENCODINGS, ENCODE_REC_THRESHOLD
+from unstructured.nlp.patterns import UNICODE_BULLETS, UNICODE_BULLETS_RE
+from unstructured.partition.text import _split_by_paragraph
+from modules.txt.packed_chunks import PACKED_INDEX_INTERVAL
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter, deque
+from autocorrect.constants import alphabets, word_regexes
+from autocorrect.typos import Word
 from autocorrect import Speller
-from functools import partial
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+from itertools import chain, islice
 from tqdm import tqdm
+import pandas as pd
+import numpy as np
+import tiktoken
 import dtlpy as dl
+import unicodedata
+import threading
+import queue
 import tempfile
 import logging
+import chardet
+import hashlib
+import json
+import base64
+import codecs
+import copy
 import nltk
 import time
+import re
 import os
 import io
 
 logger = logging.getLogger('[CHUNKS-EXTRACTOR]')
 
+# Streaming mode defaults
+DEFAULT_UPLOAD_BATCH_SIZE = 500
+DEFAULT_STREAM_READ_SIZE = 1024 * 1024
+# Longest paragraph in characters the streaming 'recursive' strategy buffers whole - a longer one is cut at a line break
+STREAM_MAX_PARAGRAPH_SIZE = 4 * 1024 * 1024
+
+# Separators tried in order by the 'recursive' strategy
+RECURSIVE_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# 'token' strategy - cl100k_base vocabulary shipped in the runner image (see Dockerfile), never fetched at runtime
+TOKENIZER_PATH = '/tokenizers/cl100k_base.tiktoken'
+TOKENIZER_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+TOKENIZER_SPECIAL_TOKENS = {
+    "<|endoftext|>": 100257,
+    "<|fim_prefix|>": 100258,
+    "<|fim_middle|>": 100259,
+    "<|fim_suffix|>": 100260,
+    "<|endofprompt|>": 100276,
+}
+# Spell correction - words whose correction is memoized, and prefix length of the symmetric-delete index
+SPELL_CACHE_SIZE = 200000
+SPELL_PREFIX_LENGTH = 7
+
+# Chunk cleaning - same rules as the unstructured cleaners chain, precompiled
+PARTITION_MAX_SIZE = 1500
+CLEAN_WHITESPACE_TABLE = str.maketrans({'-': ' ', '\u2013': ' ', '\xa0': ' ', '\n': ' '})
+CLEAN_MULTIPLE_SPACES_RE = re.compile(r"[ ]{2,}")
+CLEAN_UNICODE_QUOTES_RE = re.compile(r"[\x91-\x94&\u00e2]")
+CLEAN_BULLET_CHARS = frozenset(bullet.replace('\\', '') for bullet in UNICODE_BULLETS)
+CLEAN_ASCII_PUNCTUATION = bytes(i for i in range(128) if unicodedata.category(chr(i)).startswith("P"))
+
+# clean_multiple_chunks runs the cleaning on threads by default. The 'processes' mode uses one pool per process, capped
+# because each worker holds its own speller index (about 160 MB); downloads and uploads stay on threads
+DEFAULT_CLEAN_EXECUTION_MODE = 'threads'
+CLEAN_IO_WORKERS = 32
+CLEAN_MAX_PROCESSES = 8
+
+# create_chunks_batch - download and upload threads, and the size of the queues between the pipeline stages. The
+# chunking runs in one pool per process, shared by the concurrent executions of the service
+PIPELINE_IO_WORKERS = 8
+PIPELINE_QUEUE_SIZE = 16
+PIPELINE_MAX_PROCESSES = 8
+
+# Chunk deduplication - MinHash signature length, character shingle size and the seed of the hash permutations
+DEDUP_NUM_PERM = 128
+DEDUP_SHINGLE_SIZE = 5
+DEDUP_SEED = 1
+# Shingles hashed at a time when computing a signature, so a long chunk never needs a (shingles x permutations) matrix
+DEDUP_SHINGLE_BLOCK = 1024
+DEFAULT_DEDUP_THRESHOLD = 0.9
+
+# Incremental chunking - threads updating the offsets of the chunks that moved in the text, and where the chunk
+# manifests are kept in the dataset. Items of a dot folder are hidden
+INCREMENTAL_UPDATE_WORKERS = 16
+MANIFEST_REMOTE_PATH = '/.chunks_manifests'
+
+# Number of distinct text segments whose token offsets are memoized
+TOKEN_SEGMENT_CACHE_SIZE = 65536
+# The tokenizer pattern never joins a newline with a following non-space character, so these are token boundaries
+TOKEN_SEGMENT_BOUNDARY = re.compile(r'\n(?=\S)')
+
+# NLTK strategies - texts longer than one shard are split at blank lines and tokenized in a process pool
+NLTK_SHARD_SIZE = 256 * 1024
+# Punkt decides a sentence break from the tokens around it, so a window of text around a blank line is enough
+NLTK_BOUNDARY_WINDOW = 2000
+BLANKLINE_GAP_RE = re.compile(r'\s*\n\s*\n\s*')
+
+
+def _available_cpus() -> int:
+    """Number of CPUs this process may run on. Unlike `os.cpu_count()`, it follows the container's cpuset."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _check_chunk_overlap(chunk_size: int, chunk_overlap: int):
+    if chunk_overlap > chunk_size:
+        raise ValueError(
+            f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+        )
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Narrows a span the way `str.strip()` narrows the slice it covers."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _separator_spans(text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+    """
+    Splits text[start:end] on a literal separator, keeping each separator at the start of the piece that follows it.
+    Empty pieces are dropped.
+    """
+    if not separator:
+        return [(ind, ind + 1) for ind in range(start, end)]
+    spans = list()
+    piece_start = start
+    position = text.find(separator, start, end)
+    while position != -1:
+        if position > piece_start:
+            spans.append((piece_start, position))
+        piece_start = position
+        position = text.find(separator, position + len(separator), end)
+    if end > piece_start:
+        spans.append((piece_start, end))
+    return spans
+
+
+def _merge_spans(text: str, spans: List[Tuple[int, int]], chunk_size: int, chunk_overlap: int,
+                 current: deque = None) -> List[Tuple[int, int]]:
+    """
+    Greedily merges adjacent pieces into chunks of up to `chunk_size`, carrying up to `chunk_overlap` forward.
+
+    With `current`, the merge starts from the pieces in it and leaves the pieces of the last chunk there instead of
+    closing it, so that it can go on with the pieces that follow.
+    """
+    chunks = list()
+    keep_open = current is not None
+    if current is None:
+        current = deque()
+    total = sum(end - start for start, end in current)
+    for span in spans:
+        length = span[1] - span[0]
+        if total + length > chunk_size and current:
+            chunk = _strip_span(text, current[0][0], current[-1][1])
+            if chunk[0] < chunk[1]:
+                chunks.append(chunk)
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                first = current.popleft()
+                total -= first[1] - first[0]
+        current.append(span)
+        total += length
+    if current and not keep_open:
+        chunk = _strip_span(text, current[0][0], current[-1][1])
+        if chunk[0] < chunk[1]:
+            chunks.append(chunk)
+    return chunks
+
+
+@lru_cache(maxsize=1)
+def _load_tokenizer(path: str = TOKENIZER_PATH) -> tiktoken.Encoding:
+    """Loads the BPE vocabulary (one `<base64 token> <rank>` pair per line) from a local file once per process."""
+    logger.info(f"Loading tokenizer vocabulary from {path}")
+    with open(path, 'rb') as f:
+        mergeable_ranks = {base64.b64decode(token): int(rank) for token, rank in (line.split() for line in f if line.strip())}
+    return tiktoken.Encoding(
+        name=os.path.splitext(os.path.basename(path))[0],
+        pat_str=TOKENIZER_PATTERN,
+        mergeable_ranks=mergeable_ranks,
+        special_tokens=TOKENIZER_SPECIAL_TOKENS,
+    )
+
+
+@lru_cache(maxsize=TOKEN_SEGMENT_CACHE_SIZE)
+def _segment_token_offsets(segment: str) -> Tuple[int, ...]:
+    """Character offset of every token of a segment. Repeated segments (headers, footers, boilerplate) hit the cache."""
+    tokenizer = _load_tokenizer()
+    _, offsets = tokenizer.decode_with_offsets(tokenizer.encode_ordinary(segment))
+    return tuple(offsets)
+
+
+def _token_offsets(text: str) -> List[int]:
+    """Character offset of every token of the text, tokenizing each distinct segment once."""
+    offsets = list()
+    segment_start = 0
+    for match in TOKEN_SEGMENT_BOUNDARY.finditer(text):
+        segment_end = match.end()
+        offsets.extend(segment_start + offset for offset in _segment_token_offsets(text[segment_start:segment_end]))
+        segment_start = segment_end
+    if segment_start < len(text):
+        offsets.extend(segment_start + offset for offset in _segment_token_offsets(text[segment_start:]))
+    return offsets
+
+
+def _recursive_spans(text: str, start: int, end: int, separators: List[str], chunk_size: int,
+                     chunk_overlap: int) -> List[Tuple[int, int]]:
+    """Splits text[start:end] on the first separator present, recursing into pieces that are still too long."""
+    separator = separators[-1]
+    new_separators = list()
+    for ind, candidate in enumerate(separators):
+        if candidate == "":
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator = candidate
+            new_separators = separators[ind + 1:]
+            break
+
+    chunks = list()
+    good_spans = list()
+    for span in _separator_spans(text, start, end, separator):
+        if span[1] - span[0] < chunk_size:
+            good_spans.append(span)
+            continue
+        if good_spans:
+            chunks.extend(_merge_spans(text, good_spans, chunk_size, chunk_overlap))
+            good_spans = list()
+        if not new_separators:
+            chunks.append(span)
+        else:
+            chunks.extend(_recursive_spans(text, span[0], span[1], new_separators, chunk_size, chunk_overlap))
+    if good_spans:
+        chunks.extend(_merge_spans(text, good_spans, chunk_size, chunk_overlap))
+    return chunks
+
+
+def _stream_recursive_spans(pieces: Iterable[str], chunk_size: int,
+                            chunk_overlap: int) -> Iterator[Tuple[int, int, str]]:
+    """
+    `_recursive_spans` over text read in pieces, yielding (start, end, chunk text) as soon as a chunk is complete.
+
+    Once a blank line has been read, the text is known to split on blank lines first, and each paragraph is handled as
+    it is in memory when it is complete - a short one goes on merging into the open chunk, a long one closes it and is
+    split on its own. Only the open chunk and the paragraph being read are buffered. A paragraph (or text without any
+    blank line) longer than STREAM_MAX_PARAGRAPH_SIZE is cut at its last line break, and only the chunks next to such a
+    cut may differ from the in-memory ones.
+    """
+    separator = RECURSIVE_SEPARATORS[0]
+    max_paragraph_size = max(STREAM_MAX_PARAGRAPH_SIZE, 2 * chunk_size)
+    # Absolute character offset of buffer[0]
+    base = 0
+    buffer = ''
+    # Start of the paragraph being read, and where to look for the next blank line
+    paragraph_start = 0
+    search_start = 0
+    has_separator = False
+    # Pieces of the open chunk
+    current = deque()
+    for piece in chain(pieces, [None]):
+        # (start, end, whether the paragraph was cut) of the complete paragraphs
+        paragraphs = list()
+        if piece is not None:
+            buffer += piece
+            position = buffer.find(separator, search_start)
+            while position != -1:
+                has_separator = True
+                if position > paragraph_start:
+                    paragraphs.append((paragraph_start, position, False))
+                paragraph_start = position
+                search_start = position + len(separator)
+                position = buffer.find(separator, search_start)
+            # A blank line can only start at the last character
+            search_start = max(search_start, len(buffer) - len(separator) + 1)
+            if len(buffer) - paragraph_start > max_paragraph_size:
+                cut = max(buffer.rfind('\n', paragraph_start + 1), buffer.rfind(' ', paragraph_start + 1))
+                if cut == -1:
+                    cut = len(buffer) - (len(buffer) - paragraph_start) % chunk_size
+                paragraphs.append((paragraph_start, cut, True))
+                paragraph_start = cut
+                search_start = max(search_start, cut)
+        elif has_separator and len(buffer) > paragraph_start:
+            paragraphs.append((paragraph_start, len(buffer), False))
+            paragraph_start = len(buffer)
+
+        spans = list()
+        for start, end, is_cut in paragraphs:
+            if end - start < chunk_size and not is_cut:
+                spans.extend(_merge_spans(buffer, [(start, end)], chunk_size, chunk_overlap, current=current))
+                continue
+            spans.extend(_merge_spans(buffer, list(current), chunk_size, chunk_overlap))
+            current.clear()
+            spans.extend(_recursive_spans(buffer, start, end, RECURSIVE_SEPARATORS[1:], chunk_size, chunk_overlap))
+        if piece is None:
+            spans.extend(_merge_spans(buffer, list(current), chunk_size, chunk_overlap))
+            current.clear()
+            if not has_separator:
+                spans.extend(_recursive_spans(buffer, paragraph_start, len(buffer), RECURSIVE_SEPARATORS, chunk_size,
+                                              chunk_overlap))
+        for start, end in spans:
+            yield base + start, base + end, buffer[start:end]
+
+        keep = current[0][0] if current else paragraph_start
+        buffer = buffer[keep:]
+        base += keep
+        paragraph_start -= keep
+        search_start -= keep
+        current = deque((start - keep, end - keep) for start, end in current)
+
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Offsets of the NLTK sentences of the text."""
+    spans = list()
+    cursor = 0
+    # Punkt sentences are slices of the text, in order
+    for sentence in nltk.sent_tokenize(text):
+        start = text.find(sentence, cursor)
+        cursor = start + len(sentence)
+        spans.append((start, cursor))
+    return spans
+
+
+def _paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    """Offsets of the NLTK blank-line separated paragraphs of the text."""
+    return list(nltk.tokenize.BlanklineTokenizer().span_tokenize(text))
+
+
+def _init_sentence_worker():
+    """Loads the Punkt model once, when the worker process starts."""
+    nltk.sent_tokenize("Punkt.")
+
+
+def _is_sentence_boundary(text: str, position: int) -> bool:
+    """Whether no sentence of the whole text crosses the position."""
+    start = max(position - NLTK_BOUNDARY_WINDOW, 0)
+    window = text[start:position + NLTK_BOUNDARY_WINDOW]
+    return all(not (begin < position - start < end) for begin, end in _sentence_spans(window))
+
+
+def _shard_bounds(text: str, shard_size: int, is_boundary=None) -> List[int]:
+    """
+    Splits the text at the end of blank-line gaps into shards of about `shard_size` characters. A shard never ends
+    inside a gap, so paragraphs of the shards are the paragraphs of the text.
+    """
+    bounds = [0]
+    while len(text) - bounds[-1] > shard_size:
+        for gap in BLANKLINE_GAP_RE.finditer(text, bounds[-1] + shard_size):
+            if gap.end() < len(text) and (is_boundary is None or is_boundary(text, gap.end())):
+                bounds.append(gap.end())
+                break
+        else:
+            break
+    bounds.append(len(text))
+    return bounds
+
+
+_nltk_executor = None
+_nltk_executor_lock = threading.Lock()
+
+
+def _get_nltk_executor() -> ProcessPoolExecutor:
+    """
+    Returns the process-wide pool of the sharded NLTK strategies, created on first use with one worker per available
+    CPU. Its workers load the Punkt model once, so later texts only pay for the tokenization.
+    """
+    global _nltk_executor
+    with _nltk_executor_lock:
+        if _nltk_executor is None:
+            max_workers = _available_cpus()
+            logger.info(f"Starting an NLTK pool of {max_workers} processes")
+            _nltk_executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sentence_worker)
+        return _nltk_executor
+
+
+def _reset_nltk_executor(executor: ProcessPoolExecutor):
+    """Drops a broken NLTK pool (e.g. a worker was killed), so the next call starts a new one."""
+    global _nltk_executor
+    with _nltk_executor_lock:
+        if _nltk_executor is executor:
+            _nltk_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parallel_spans(text: str, tokenize, is_boundary=None, parallel: bool = True) -> List[Tuple[int, int]]:
+    """
+    Runs a span tokenizer over shards of the text in the NLTK pool and merges the spans back in order. Shards are
+    cut only where `is_boundary` holds, so the result equals `tokenize(text)`. With `parallel=False` (callers that
+    already run in a pool worker) the text is tokenized in the calling process.
+    """
+    if not parallel or _available_cpus() == 1 or len(text) <= NLTK_SHARD_SIZE:
+        return tokenize(text)
+    bounds = _shard_bounds(text, NLTK_SHARD_SIZE, is_boundary)
+    if len(bounds) <= 2:
+        return tokenize(text)
+    shards = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    executor = _get_nltk_executor()
+    logger.info(f"Tokenizing {len(shards)} shards in the NLTK pool")
+    try:
+        shard_spans = list(executor.map(tokenize, shards))
+    except BrokenProcessPool:
+        _reset_nltk_executor(executor)
+        raise
+    return [(start + offset, end + offset) for offset, spans in zip(bounds, shard_spans) for start, end in spans]
+
+
+@lru_cache(maxsize=1)
+def _minhash_permutations(num_perm: int = DEDUP_NUM_PERM, seed: int = DEDUP_SEED) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed multiply-shift hash functions, so signatures are reproducible across runs."""
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return multipliers, increments
+
+
+def _minhash_signature(text: str, shingle_size: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """MinHash signature of the set of character shingles of the whitespace- and case-normalized text."""
+    data = np.frombuffer(' '.join(text.lower().split()).encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+    count = max(len(data) - shingle_size + 1, 1)
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(min(shingle_size, len(data))):
+        shingles = shingles * np.uint64(257) + data[offset:offset + count]
+    shingles = np.unique(shingles)
+    multipliers, increments = _minhash_permutations()
+    signature = np.full(len(multipliers), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for block in range(0, len(shingles), DEDUP_SHINGLE_BLOCK):
+        hashes = (shingles[block:block + DEDUP_SHINGLE_BLOCK, None] * multipliers[None, :] + increments[None, :])
+        np.minimum(signature, (hashes >> np.uint64(32)).min(axis=0), out=signature)
+    return signature
+
+
+def _lsh_bands(threshold: float, num_perm: int = DEDUP_NUM_PERM) -> Tuple[int, int]:
+    """
+    Picks (bands, rows) so the LSH S-curve rises below the threshold; candidates are verified on the full signature,
+    so erring towards more candidates only costs time, not precision.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) > threshold - 0.1:
+            break
+        best = (bands, rows)
+    return best
+
+
+def _decode_text_bytes(data: bytes) -> str:
+    """Decodes a txt file the way `partition_text(filename=...)` does, detecting the encoding with chardet."""
+    if data.isascii():
+        return data.decode('ascii')
+    result = chardet.detect(data)
+    if result["encoding"] is not None and result["confidence"] >= ENCODE_REC_THRESHOLD:
+        return data.decode(result["encoding"])
+    for encoding in COMMON_ENCODINGS:
+        try:
+            text = data.decode(encoding)
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+        # The fallback reads the file in text mode, which normalizes line endings
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    raise UnicodeDecodeError("Unable to determine the encoding of the text.", data, 0, len(data), "Invalid encoding")
+
+
+def _partition_text_elements(text: str) -> List[str]:
+    """The element texts `partition_text` returns for a txt file with this content."""
+    elements = list()
+    for paragraph in _split_by_paragraph(auto_paragraph_grouper(text), min_partition=0, max_partition=PARTITION_MAX_SIZE):
+        paragraph = paragraph.strip()
+        if not paragraph or (len(paragraph) == 1 and UNICODE_BULLETS_RE.match(paragraph)):
+            continue
+        # Bulleted paragraphs become list items without their bullet
+        if UNICODE_BULLETS_RE.match(paragraph):
+            paragraph = clean_bullets(paragraph)
+        elements.append(paragraph)
+    return elements
+
+
+def _clean_element_text(text: str) -> str:
+    """
+    Applies the cleaners chain of `clean_chunk` to one element. Steps that cannot change the text are skipped, and the
+    common ASCII case uses byte-level translate tables instead of the full unicode tables.
+    """
+    # clean(lowercase, trailing_punctuation, dashes, extra_whitespace, bullets)
+    text = text.lower().strip().rstrip(".,:;")
+    text = CLEAN_MULTIPLE_SPACES_RE.sub(" ", text.translate(CLEAN_WHITESPACE_TABLE)).strip()
+    bullet = UNICODE_BULLETS_RE.match(text)
+    if bullet is not None:
+        text = text[bullet.end():].strip()
+    text = text.strip()
+    # replace_unicode_quotes, clean_non_ascii_chars
+    if CLEAN_UNICODE_QUOTES_RE.search(text):
+        text = replace_unicode_quotes(text)
+    if not text.isascii():
+        text = text.encode("ascii", "ignore").decode()
+    # group_broken_paragraphs - the text has no line breaks left, so it only changes bullet or "e " prefixed text
+    stripped = text.strip()
+    if not stripped:
+        text = ""
+    elif (stripped.startswith('e') and stripped[1:2].isspace()) or not CLEAN_BULLET_CHARS.isdisjoint(text):
+        text = group_broken_paragraphs(text)
+    # remove_punctuation
+    if text.isascii():
+        return text.encode().translate(None, CLEAN_ASCII_PUNCTUATION).decode()
+    return remove_punctuation(text)
+
+
+class SpellCorrector:
+    """
+    Spell corrector that returns the same corrections as `autocorrect.Speller`, built once per process.
+
+    Known words and single-typo candidates are resolved as autocorrect does. For double typos, instead of generating
+    every string two edits away, candidates are looked up in a symmetric-delete index over the dictionary and kept
+    only if they are reachable with two of autocorrect's edits. Corrections are memoized in a bounded LRU cache shared
+    by all threads.
+    """
+
+    def __init__(self, lang: str = 'en', cache_size: int = SPELL_CACHE_SIZE, prefix_length: int = SPELL_PREFIX_LENGTH):
+        self.lang = lang
+        self.speller = Speller(lang=lang)
+        self.nlp_data = self.speller.nlp_data
+        self.alphabet = alphabets[lang]
+        self.word_regex = re.compile(word_regexes[lang])
+        self.prefix_length = prefix_length
+        self._deletes_index = None
+        self._index_lock = threading.Lock()
+        self.correct_word = lru_cache(maxsize=cache_size)(self._correct_word)
+
+    def __call__(self, sentence: str) -> str:
+        return self.word_regex.sub(lambda match: self.correct_word(match.group(0)), sentence)
+
+    def _prefix_deletes(self, word: str) -> set:
+        """The word's prefix and every string obtained from it by deleting up to two characters."""
+        deletes = {word[:self.prefix_length]}
+        frontier = deletes
+        for _ in range(2):
+            frontier = {edit[:ind] + edit[ind + 1:] for edit in frontier for ind in range(len(edit))}
+            deletes |= frontier
+        return deletes
+
+    def _get_deletes_index(self) -> dict:
+        if self._deletes_index is None:
+            with self._index_lock:
+                if self._deletes_index is None:
+                    tic = time.time()
+                    index = dict()
+                    for word in self.nlp_data:
+                        for delete in self._prefix_deletes(word):
+                            index.setdefault(delete, []).append(word)
+                    self._deletes_index = index
+                    logger.info(f"Built spelling index of {len(index)} entries in {time.time() - tic} seconds")
+        return self._deletes_index
+
+    def _is_one_typo(self, source_typos: set, target: str, chars: str) -> bool:
+        """Whether `target` is one typo away from any string in `source_typos`, whose characters are all in `chars`."""
+        alphabet = self.alphabet
+        for ind in range(len(target) + 1):
+            # target was produced by deleting a character
+            if any(target[:ind] + char + target[ind:] in source_typos for char in chars):
+                return True
+            if ind == len(target):
+                break
+            # target was produced by replacing or inserting an alphabet character
+            if target[ind] in alphabet:
+                if any(target[:ind] + char + target[ind + 1:] in source_typos for char in chars):
+                    return True
+                if target[:ind] + target[ind + 1:] in source_typos:
+                    return True
+            # target was produced by transposing two adjacent characters
+            if ind < len(target) - 1:
+                if target[:ind] + target[ind + 1] + target[ind] + target[ind + 2:] in source_typos:
+                    return True
+        return False
+
+    def _double_typos(self, word: str, typos: set) -> set:
+        index = self._get_deletes_index()
+        candidates = set()
+        for delete in self._prefix_deletes(word):
+            candidates.update(index.get(delete, ()))
+        chars = ''.join(set(self.alphabet) | set(word))
+        return {
+            candidate for candidate in candidates
+            if abs(len(candidate) - len(word)) <= 2 and self._is_one_typo(typos, candidate, chars)
+        }
+
+    def _get_candidates(self, word: str) -> list:
+        if word in self.nlp_data:
+            candidates = [word]
+        else:
+            typos = set(Word(word, self.lang).typos())
+            candidates = self.speller.existing(typos) or self._double_typos(word, typos) or [word]
+        return [(self.nlp_data.get(candidate, 0), candidate) for candidate in candidates]
+
+    def _correct_word(self, word: str) -> str:
+        if word == "":
+            return ""
+        candidates = self._get_candidates(word)
+        # in case the word is capitalized
+        if word[0].isupper():
+            candidates += self._get_candidates(word[0].lower() + word[1:])
+        best_word = max(candidates)[1]
+        if word[0].isupper():
+            best_word = best_word[0].upper() + best_word[1:]
+        return best_word
+
+
+_spell_corrector = None
+_spell_corrector_lock = threading.Lock()
+
+
+def get_spell_corrector() -> SpellCorrector:
+    """Returns the process-wide spell corrector, loading the dictionary on first use."""
+    global _spell_corrector
+    if _spell_corrector is None:
+        with _spell_corrector_lock:
+            if _spell_corrector is None:
+                _spell_corrector = SpellCorrector(lang='en')
+    return _spell_corrector
+
+
+def _init_clean_worker(to_correct_spelling: bool):
+    """Builds the per-process state of a cleaning worker once, when the process starts."""
+    if to_correct_spelling is True:
+        get_spell_corrector()
+
+
+_clean_executor = None
+_clean_executor_lock = threading.Lock()
+
+
+def _get_clean_executor(to_correct_spelling: bool) -> ProcessPoolExecutor:
+    """
+    Returns the process-wide cleaning pool, created on first use with one worker per available CPU up to
+    `CLEAN_MAX_PROCESSES`. The workers are started right away, before the caller starts its I/O threads, and build the
+    speller when they start if the first call corrects spelling (later calls build it on first use).
+    """
+    global _clean_executor
+    with _clean_executor_lock:
+        if _clean_executor is None:
+            max_workers = min(_available_cpus(), CLEAN_MAX_PROCESSES)
+            logger.info(f"Starting a cleaning pool of {max_workers} processes")
+            _clean_executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                  initializer=_init_clean_worker,
+                                                  initargs=(to_correct_spelling,))
+            _clean_executor.submit(os.getpid).result()
+        return _clean_executor
+
+
+def _reset_clean_executor(executor: ProcessPoolExecutor):
+    """Drops a broken cleaning pool (e.g. a worker was killed), so the next call starts a new one."""
+    global _clean_executor
+    with _clean_executor_lock:
+        if _clean_executor is executor:
+            _clean_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+_chunk_executor = None
+_chunk_executor_lock = threading.Lock()
+
+
+def _chunk_pool_size() -> int:
+    return min(_available_cpus(), PIPELINE_MAX_PROCESSES)
+
+
+def _get_chunk_executor() -> ProcessPoolExecutor:
+    """
+    Returns the process-wide chunking pool of `chunk_items_pipeline`, created on first use with one worker per
+    available CPU up to `PIPELINE_MAX_PROCESSES`. The workers are started right away, before the caller starts its
+    I/O threads.
+    """
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is None:
+            max_workers = _chunk_pool_size()
+            logger.info(f"Starting a chunking pool of {max_workers} processes")
+            _chunk_executor = ProcessPoolExecutor(max_workers=max_workers)
+            _chunk_executor.submit(os.getpid).result()
+        return _chunk_executor
+
+
+def _reset_chunk_executor(executor: ProcessPoolExecutor):
+    """Drops a broken chunking pool (e.g. a worker was killed), so the next call starts a new one."""
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is executor:
+            _chunk_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
 
 class ChunksExtractor(dl.BaseServiceRunner):
 
@@ -39,9 +717,19 @@ class ChunksExtractor(dl.BaseServiceRunner):
                 - `chunking_strategy` (str): The strategy for splitting text.
                 - `max_chunk_size` (int): The maximum number of characters per chunk.
                 - `chunk_overlap` (int): The number of overlapping characters between consecutive chunks.
+                - `streaming` (bool, optional): Read the file incrementally and upload chunks in batches.
+                - `upload_batch_size` (int, optional): Number of chunks per upload call in streaming mode.
+                - `deduplication` (str, optional): 'exact' or 'near' to drop duplicate chunks before the upload.
+                - `dedup_threshold` (float, optional): Minimum estimated Jaccard similarity of near-duplicates.
+                - `incremental` (bool, optional): Only upload new or changed chunks and delete chunks that no
+                  longer exist, based on the chunk hashes manifest kept in a JSON item next to the file.
+                - `output_format` (str, optional): 'items' for one item per chunk, or 'jsonl' for one packed JSONL
+                  item holding all the chunks of the document.
 
         Returns:
-            List[dl.Item]: A list of Dataloop items, each representing a chunk of the original text file.
+            List[dl.Item]: A list of Dataloop items, each representing a chunk of the original text file. In
+            incremental mode, only the uploaded (new or changed) chunks. With the 'jsonl' output format, the single
+            packed item.
         """
         tic = time.time()
         node = context.node
@@ -49,6 +737,12 @@ class ChunksExtractor(dl.BaseServiceRunner):
         max_chunk_size = node.metadata['customNodeConfig']['max_chunk_size']
         chunk_overlap = node.metadata['customNodeConfig']['chunk_overlap']
         remote_path_for_chunks = node.metadata['customNodeConfig']['remote_path_for_chunks']
+        streaming = node.metadata['customNodeConfig'].get('streaming', False)
+        upload_batch_size = node.metadata['customNodeConfig'].get('upload_batch_size', DEFAULT_UPLOAD_BATCH_SIZE)
+        deduplication = node.metadata['customNodeConfig'].get('deduplication', 'none')
+        dedup_threshold = node.metadata['customNodeConfig'].get('dedup_threshold', DEFAULT_DEDUP_THRESHOLD)
+        incremental = node.metadata['customNodeConfig'].get('incremental', False)
+        output_format = node.metadata['customNodeConfig'].get('output_format', 'items')
 
         if not item.mimetype == 'text/plain':
             raise ValueError(
@@ -56,31 +750,322 @@ class ChunksExtractor(dl.BaseServiceRunner):
                 f"Use other extracting applications from Marketplace to convert text format to txt"
             )
 
+        metadata = self.chunks_metadata(item=item)
+
+        if streaming is True:
+            if deduplication != 'none':
+                logger.warning("Deduplication needs all the chunks of the document and is skipped in streaming mode")
+            if incremental is True and output_format == 'items':
+                logger.warning("Incremental chunking needs all the chunks of the document and is skipped in streaming mode")
+            with tempfile.TemporaryDirectory() as temp_dir:
+                file_path = item.download(local_path=temp_dir, save_locally=True)
+                logger.info(f"Downloaded item to temporary path: {file_path}")
+                chunks = self.stream_chunks(
+                    file_path=file_path,
+                    strategy=chunking_strategy,
+                    chunk_size=max_chunk_size,
+                    chunk_overlap=chunk_overlap,
+                )
+                if output_format == 'jsonl':
+                    items = self.upload_packed_chunks(
+                        chunks=chunks,
+                        item=item,
+                        remote_path_for_chunks=remote_path_for_chunks,
+                        metadata=metadata,
+                    )
+                else:
+                    items = self.upload_chunks_in_batches(
+                        chunks=chunks,
+                        item=item,
+                        remote_path_for_chunks=remote_path_for_chunks,
+                        metadata=metadata,
+                        batch_size=upload_batch_size,
+                    )
+            logger.info(f"Number of chunks: {len(items)}")
+            logger.info(f"Total time taken: {time.time() - tic} seconds")
+            return items
+
         # Extract text
         buffer = item.download(save_locally=False)
         text = buffer.read().decode('utf-8')
         chunk_tic = time.time()
-        chunks = self.chunking_strategy(
+        spans, duplicates = self.document_chunks(
             text=text,
             strategy=chunking_strategy,
             chunk_size=max_chunk_size,
             chunk_overlap=chunk_overlap,
+            deduplication=deduplication,
+            dedup_threshold=dedup_threshold,
         )
         logger.info(f"Time taken to chunk: {time.time() - chunk_tic} seconds")
         upload_tic = time.time()
-        items = self.upload_chunks(
-            chunks=chunks,
+        items = self.upload_document_chunks(
+            text=text,
+            spans=spans,
+            duplicates=duplicates,
             item=item,
             remote_path_for_chunks=remote_path_for_chunks,
-            metadata={'system': {'document': item.name}, 'user': {'extracted_chunk': True, 'original_item_id': item.id}},
+            metadata=metadata,
+            output_format=output_format,
+            incremental=incremental,
         )
         logger.info(f"Time taken to upload: {time.time() - upload_tic} seconds")
         logger.info(f"Number of chunks: {len(items)}")
         logger.info(f"Total time taken: {time.time() - tic} seconds")
         return items
 
+    def create_chunks_batch(self, items: List[dl.Item], context: dl.Context) -> List[dl.Item]:
+        """
+        Creates and uploads text chunks from a batch of txt file items.
+
+        The items go through a three-stage pipeline - concurrent downloads, chunking in a process pool and bulk
+        uploads - connected by bounded queues, so the network and the CPU are busy at the same time. An item that
+        fails is logged and does not stop the rest of the batch.
+
+        Args:
+            items (List[dl.Item]): The Dataloop txt items to chunk.
+            context (dl.Context): The Dataloop context, with the same chunking parameters as `create_chunks` (except
+                `streaming` and `upload_batch_size`).
+
+        Returns:
+            List[dl.Item]: The chunk items of all the items that were chunked successfully.
+
+        Raises:
+            dl.PlatformException: If no item of the batch was chunked.
+        """
+        tic = time.time()
+        node = context.node
+        results = self.chunk_items_pipeline(
+            items=items,
+            strategy=node.metadata['customNodeConfig']['chunking_strategy'],
+            chunk_size=node.metadata['customNodeConfig']['max_chunk_size'],
+            chunk_overlap=node.metadata['customNodeConfig']['chunk_overlap'],
+            remote_path_for_chunks=node.metadata['customNodeConfig']['remote_path_for_chunks'],
+            deduplication=node.metadata['customNodeConfig'].get('deduplication', 'none'),
+            dedup_threshold=node.metadata['customNodeConfig'].get('dedup_threshold', DEFAULT_DEDUP_THRESHOLD),
+            output_format=node.metadata['customNodeConfig'].get('output_format', 'items'),
+            incremental=node.metadata['customNodeConfig'].get('incremental', False),
+        )
+        failures = [result for result in results if result['error'] is not None]
+        for failure in failures:
+            logger.error(f"Failed to chunk item {failure['item_id']}: {failure['error']}")
+        if items and len(failures) == len(items):
+            raise dl.PlatformException(f"No item was chunked! failed items: {[failure['item_id'] for failure in failures]}")
+
+        chunks_items = [chunk_item for result in results for chunk_item in result['chunks']]
+        logger.info(f"Chunked {len(items) - len(failures)} of {len(items)} items into {len(chunks_items)} chunks "
+                    f"in {time.time() - tic} seconds")
+        return chunks_items
+
     @staticmethod
-    def upload_chunks(chunks, item, remote_path_for_chunks, metadata):
+    def chunk_items_pipeline(items: List[dl.Item], strategy: str, chunk_size: int, chunk_overlap: int,
+                             remote_path_for_chunks: str, deduplication: str = 'none',
+                             dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD, output_format: str = 'items',
+                             incremental: bool = False, io_workers: int = PIPELINE_IO_WORKERS,
+                             queue_size: int = PIPELINE_QUEUE_SIZE) -> List[dict]:
+        """
+        Downloads, chunks and uploads txt items in a pipeline.
+
+        Downloads run on `io_workers` threads and put the texts on a bounded queue. One thread per pool worker takes
+        texts from it and chunks them in the process-wide chunking pool, putting the results on a second bounded queue
+        that `io_workers` upload threads consume. When a queue is full the previous stage waits, so at most about `queue_size`
+        documents are held in memory per queue.
+
+        Args:
+            items (List[dl.Item]): The Dataloop txt items to chunk.
+            strategy (str): The chunking method to use, see `chunking_strategy`.
+            chunk_size (int): Maximum size of each chunk.
+            chunk_overlap (int): Maximum overlap between consecutive chunks.
+            remote_path_for_chunks (str): Remote path for the created chunks.
+            deduplication (str, optional): 'none', 'exact' or 'near', see `deduplicate_spans`.
+            dedup_threshold (float, optional): Minimum estimated Jaccard similarity of near-duplicates.
+            output_format (str, optional): 'items' or 'jsonl'. Defaults to 'items'.
+            incremental (bool, optional): Only upload new or changed chunk items. Defaults to False.
+            io_workers (int, optional): Number of download threads and of upload threads.
+            queue_size (int, optional): Capacity of the queues between the stages.
+
+        Returns:
+            List[dict]: For each input item, in order, a dict with its `item_id`, the uploaded `chunks` and the
+            `error` that stopped it (None on success).
+        """
+        results = [{'item_id': item.id, 'chunks': list(), 'error': None} for item in items]
+        downloaded = queue.Queue(maxsize=queue_size)
+        chunked = queue.Queue(maxsize=queue_size)
+        cpu_executor = _get_chunk_executor()
+        chunk_workers = _chunk_pool_size()
+
+        def download(ind: int, item: dl.Item):
+            try:
+                if not item.mimetype == 'text/plain':
+                    raise ValueError(f"Item id : {item.id} is not txt file. This functions excepts txt only.")
+                text = item.download(save_locally=False).read().decode('utf-8')
+            except Exception as e:
+                results[ind]['error'] = f"{type(e).__name__}: {e}"
+                pbar.update()
+                return
+            downloaded.put((ind, item, text))
+
+        def chunk():
+            while True:
+                task = downloaded.get()
+                if task is None:
+                    break
+                ind, item, text = task
+                try:
+                    spans, duplicates = cpu_executor.submit(
+                        ChunksExtractor.document_chunks,
+                        text=text,
+                        strategy=strategy,
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_overlap,
+                        deduplication=deduplication,
+                        dedup_threshold=dedup_threshold,
+                        # Each document is already chunked in its own worker process
+                        parallel=False,
+                    ).result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        _reset_chunk_executor(cpu_executor)
+                    results[ind]['error'] = f"{type(e).__name__}: {e}"
+                    pbar.update()
+                    continue
+                chunked.put((ind, item, text, spans, duplicates))
+
+        def upload():
+            while True:
+                task = chunked.get()
+                if task is None:
+                    break
+                ind, item, text, spans, duplicates = task
+                try:
+                    results[ind]['chunks'] = ChunksExtractor.upload_document_chunks(
+                        text=text,
+                        spans=spans,
+                        duplicates=duplicates,
+                        item=item,
+                        remote_path_for_chunks=remote_path_for_chunks,
+                        metadata=ChunksExtractor.chunks_metadata(item=item),
+                        output_format=output_format,
+                        incremental=incremental,
+                    )
+                except Exception as e:
+                    results[ind]['error'] = f"{type(e).__name__}: {e}"
+                pbar.update()
+
+        with tqdm(total=len(items), desc='Chunking') as pbar:
+            chunkers = [threading.Thread(target=chunk) for _ in range(chunk_workers)]
+            uploaders = [threading.Thread(target=upload) for _ in range(io_workers)]
+            for thread in chunkers + uploaders:
+                thread.start()
+            with ThreadPoolExecutor(max_workers=io_workers) as download_executor:
+                for ind, item in enumerate(items):
+                    download_executor.submit(download, ind, item)
+            for _ in chunkers:
+                downloaded.put(None)
+            for thread in chunkers:
+                thread.join()
+            for _ in uploaders:
+                chunked.put(None)
+            for thread in uploaders:
+                thread.join()
+        return results
+
+    @staticmethod
+    def chunks_metadata(item: dl.Item) -> dict:
+        """Metadata of the chunks created from an item."""
+        return {'system': {'document': item.name}, 'user': {'extracted_chunk': True, 'original_item_id': item.id}}
+
+    @staticmethod
+    def document_chunks(text: str, strategy: str, chunk_size: int, chunk_overlap: int, deduplication: str = 'none',
+                        dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD, parallel: bool = True):
+        """
+        Chunks a document and optionally drops its duplicate chunks.
+
+        Args:
+            text (str): The document text.
+            strategy (str): The chunking method to use, see `chunking_strategy`.
+            chunk_size (int): Maximum size of each chunk.
+            chunk_overlap (int): Maximum overlap between consecutive chunks.
+            deduplication (str, optional): 'none', 'exact' or 'near', see `deduplicate_spans`.
+            dedup_threshold (float, optional): Minimum estimated Jaccard similarity of near-duplicates.
+            parallel (bool, optional): Whether long texts may be tokenized in the NLTK pool, see `chunking_spans`.
+
+        Returns:
+            Tuple[List[Tuple[int, int]], Optional[List[List[Tuple[int, int]]]]]: The chunk offsets, and for each chunk
+            the offsets of the duplicates it stands for (None without deduplication).
+        """
+        spans = ChunksExtractor.chunking_spans(
+            text=text,
+            strategy=strategy,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            parallel=parallel,
+        )
+        duplicates = None
+        if deduplication != 'none':
+            dedup_tic = time.time()
+            num_chunks = len(spans)
+            spans, duplicates = ChunksExtractor.deduplicate_spans(
+                text=text,
+                spans=spans,
+                mode=deduplication,
+                threshold=dedup_threshold,
+            )
+            logger.info(f"Deduplication kept {len(spans)} of {num_chunks} chunks in {time.time() - dedup_tic} seconds")
+        return spans, duplicates
+
+    @staticmethod
+    def upload_document_chunks(text: str, spans, duplicates, item, remote_path_for_chunks, metadata,
+                               output_format: str = 'items', incremental: bool = False) -> List[dl.Item]:
+        """
+        Uploads the chunks of a document in the configured output format.
+
+        Args:
+            text (str): The document text.
+            spans (List[Tuple[int, int]]): (start, end) character offsets of the chunks.
+            duplicates (List[List[Tuple[int, int]]]): For each chunk, the offsets of the duplicates it stands for, or
+                None.
+            item (dl.Item): The original Dataloop item that the chunks are derived from.
+            remote_path_for_chunks (str): Remote path for the created chunks.
+            metadata (dict): Metadata to associate with each uploaded chunk item.
+            output_format (str, optional): 'items' or 'jsonl'. Defaults to 'items'.
+            incremental (bool, optional): Only upload new or changed chunk items. Defaults to False.
+
+        Returns:
+            List[dl.Item]: The uploaded items.
+        """
+        chunks = [text[start:end] for start, end in spans]
+        if output_format == 'jsonl':
+            if incremental is True:
+                logger.warning("Incremental chunking works on chunk items and is skipped with the jsonl output format")
+            return ChunksExtractor.upload_packed_chunks(
+                chunks=[(start, end, chunk) for (start, end), chunk in zip(spans, chunks)],
+                item=item,
+                remote_path_for_chunks=remote_path_for_chunks,
+                metadata=metadata,
+                duplicates=duplicates,
+            )
+        if incremental is True:
+            return ChunksExtractor.upload_changed_chunks(
+                chunks=chunks,
+                item=item,
+                remote_path_for_chunks=remote_path_for_chunks,
+                metadata=metadata,
+                spans=spans,
+                duplicates=duplicates,
+            )
+        return ChunksExtractor.upload_chunks(
+            chunks=chunks,
+            item=item,
+            remote_path_for_chunks=remote_path_for_chunks,
+            metadata=metadata,
+            spans=spans,
+            duplicates=duplicates,
+        )
+
+    @staticmethod
+    def upload_chunks(chunks, item, remote_path_for_chunks, metadata, start_index=0, spans=None, duplicates=None,
+                      indices=None, names=None):
         """
         Saves each text chunk as a separate file, uploads the files as Dataloop items, and removes local copies.
 
@@ -92,6 +1077,14 @@ class ChunksExtractor(dl.BaseServiceRunner):
             item (dl.Item): The original Dataloop item that the chunks are derived from.
             metadata (dict): Metadata to associate with each uploaded chunk item, including any relevant system tags.
             remote_path_for_chunks (str): Remote path for the created chunks.
+            start_index (int, optional): Index of the first chunk, used in the chunk file names. Defaults to 0.
+            spans (List[Tuple[int, int]], optional): (start, end) character offsets of each chunk in the original
+                text. When given, `chunk_index`, `start_offset` and `end_offset` are added to each chunk's user metadata.
+            duplicates (List[List[Tuple[int, int]]], optional): For each chunk, the offsets of the dropped duplicate
+                chunks it stands for, added to its user metadata as `duplicate_spans`. Requires `spans`.
+            indices (List[int], optional): Index of each chunk in the document, when the chunks are not consecutive.
+                Defaults to consecutive indices from `start_index`.
+            names (List[str], optional): File name of each chunk. Defaults to `<item name>-<chunk index>.txt`.
 
         Returns:
             List[dl.Item]: A list of uploaded Dataloop items, each representing a chunk of the original text file.
@@ -100,10 +1093,12 @@ class ChunksExtractor(dl.BaseServiceRunner):
             dl.PlatformException: If no items were uploaded successfully.
         """
 
+        if indices is None:
+            indices = range(start_index, start_index + len(chunks))
         binaries = []
-        for ind, chunk in enumerate(chunks):
+        for pos, (ind, chunk) in enumerate(zip(indices, chunks)):
             base_name = item.name
-            chunk_filename = f"{os.path.splitext(base_name)[0]}-{ind}.txt"
+            chunk_filename = f"{os.path.splitext(base_name)[0]}-{ind}.txt" if names is None else names[pos]
             bin = io.BytesIO(chunk.encode('utf-8'))
             bin.name = chunk_filename
             bin.seek(0)
@@ -111,13 +1106,30 @@ class ChunksExtractor(dl.BaseServiceRunner):
 
         # Uploading all chunk items - bulk
         remote_path = os.path.join(remote_path_for_chunks, item.dir.lstrip('/')).replace('\\', '/')
-        chunks_items = item.dataset.items.upload(
-            local_path=binaries,
-            remote_path=remote_path,
-            item_metadata=metadata,
-            overwrite=True,
-            raise_on_error=True,
-        )
+        if spans is None:
+            chunks_items = item.dataset.items.upload(
+                local_path=binaries,
+                remote_path=remote_path,
+                item_metadata=metadata,
+                overwrite=True,
+                raise_on_error=True,
+            )
+        else:
+            # Per-chunk metadata is only supported by the data-frame form of the bulk upload
+            rows = list()
+            for pos, (ind, bin, (start, end)) in enumerate(zip(indices, binaries, spans)):
+                chunk_metadata = copy.deepcopy(metadata)
+                chunk_metadata.setdefault('user', dict()).update(
+                    {'chunk_index': ind, 'start_offset': start, 'end_offset': end}
+                )
+                if duplicates is not None and duplicates[pos]:
+                    chunk_metadata['user']['duplicate_spans'] = [list(span) for span in duplicates[pos]]
+                rows.append({'local_path': bin, 'remote_path': remote_path, 'item_metadata': chunk_metadata})
+            chunks_items = item.dataset.items.upload(
+                local_path=pd.DataFrame(rows),
+                overwrite=True,
+                raise_on_error=True,
+            )
 
         # raise if none
         if chunks_items is None:
@@ -131,6 +1143,448 @@ class ChunksExtractor(dl.BaseServiceRunner):
 
         return chunks_items
 
+    @staticmethod
+    def upload_packed_chunks(chunks: Iterable[Tuple[int, int, str]], item, remote_path_for_chunks, metadata,
+                             duplicates=None) -> List[dl.Item]:
+        """
+        Writes all the chunks of a document into one JSONL file and uploads it as a single Dataloop item.
+
+        Each line is a record with the chunk `text`, `chunk_index`, `start_offset`, `end_offset` and the chunk's user
+        `metadata`. The chunks are written as they come, so a generator of chunks is never held in memory. The item's
+        `packed_chunks_index` metadata holds the byte offsets of every PACKED_INDEX_INTERVAL-th record.
+
+        Args:
+            chunks (Iterable[Tuple[int, int, str]]): (start, end, chunk text) tuples, typically a generator.
+            item (dl.Item): The original Dataloop item that the chunks are derived from.
+            remote_path_for_chunks (str): Remote path for the packed item.
+            metadata (dict): Metadata of the packed item; its user metadata is also copied into each record.
+            duplicates (List[List[Tuple[int, int]]], optional): For each chunk, the offsets of the dropped duplicate
+                chunks it stands for, added to its record's metadata as `duplicate_spans`.
+
+        Returns:
+            List[dl.Item]: A list holding the packed chunks item.
+
+        Raises:
+            dl.PlatformException: If the packed item was not uploaded.
+        """
+        remote_path = os.path.join(remote_path_for_chunks, item.dir.lstrip('/')).replace('\\', '/')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, f"{os.path.splitext(item.name)[0]}-chunks.jsonl")
+            num_chunks = 0
+            # Byte offsets of every PACKED_INDEX_INTERVAL-th record, for reading record ranges downstream
+            offsets = list()
+            offset = 0
+            with open(file_path, "wb") as packed_file:
+                for ind, (start, end, chunk) in enumerate(chunks):
+                    record_metadata = copy.deepcopy(metadata.get('user', dict()))
+                    if duplicates is not None and duplicates[ind]:
+                        record_metadata['duplicate_spans'] = [list(span) for span in duplicates[ind]]
+                    record = {
+                        'chunk_index': ind,
+                        'start_offset': start,
+                        'end_offset': end,
+                        'text': chunk,
+                        'metadata': record_metadata,
+                    }
+                    if ind % PACKED_INDEX_INTERVAL == 0:
+                        offsets.append(offset)
+                    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                    packed_file.write(line)
+                    offset += len(line)
+                    num_chunks += 1
+
+            packed_metadata = copy.deepcopy(metadata)
+            packed_metadata.setdefault('user', dict()).update({
+                'packed_chunks': True,
+                'num_chunks': num_chunks,
+                'packed_chunks_index': {'interval': PACKED_INDEX_INTERVAL, 'offsets': offsets},
+            })
+            packed_item = item.dataset.items.upload(
+                local_path=file_path,
+                remote_path=remote_path,
+                item_metadata=packed_metadata,
+                overwrite=True,
+                raise_on_error=True,
+            )
+        if packed_item is None:
+            raise dl.PlatformException(f"No items was uploaded! local paths: {file_path}")
+        logger.info(f"Uploaded {num_chunks} chunks packed in item {packed_item.id}")
+        return [packed_item]
+
+    @staticmethod
+    def upload_changed_chunks(chunks, item, remote_path_for_chunks, metadata, spans, duplicates=None) -> List[dl.Item]:
+        """
+        Uploads only the chunks that are not already uploaded for the item and deletes the chunks that no longer exist.
+
+        The manifest of the item's chunks maps a key per chunk to the id and offsets of its chunk item. It is kept in
+        a JSON item (see `save_chunks_manifest`), whose id is in the item's `metadata.user.chunks_manifest_id`. The
+        key is the content hash of the chunk, with `-<n>` appended for its n-th repetition in the text, so identical
+        chunks keep one item each. Chunk files are named by key, so a chunk that moved in the text keeps its item, with
+        its `chunk_index`, `start_offset` and `end_offset` metadata updated, and a new chunk never overwrites an
+        unchanged one.
+
+        The first incremental run on an item that was chunked in the regular mode deletes its `<name>-<index>.txt`
+        chunk items from the chunks folder, since they are not in any manifest.
+
+        Args:
+            chunks (List[str]): The text chunks of the item.
+            item (dl.Item): The original Dataloop item that the chunks are derived from.
+            remote_path_for_chunks (str): Remote path for the created chunks.
+            metadata (dict): Metadata to associate with each uploaded chunk item.
+            spans (List[Tuple[int, int]]): (start, end) character offsets of each chunk in the original text.
+            duplicates (List[List[Tuple[int, int]]], optional): For each chunk, the offsets of the dropped duplicate
+                chunks it stands for.
+
+        Returns:
+            List[dl.Item]: The uploaded (new or changed) chunk items.
+        """
+        manifest = ChunksExtractor.load_chunks_manifest(item=item)
+        first_run = manifest is None
+        if manifest is None:
+            manifest = dict()
+
+        keys = list()
+        occurrences = Counter()
+        for chunk in chunks:
+            digest = hashlib.sha1(chunk.encode('utf-8')).hexdigest()
+            keys.append(digest if occurrences[digest] == 0 else f"{digest}-{occurrences[digest]}")
+            occurrences[digest] += 1
+        offsets = [{'chunk_index': ind, 'start_offset': start, 'end_offset': end}
+                   for ind, (start, end) in enumerate(spans)]
+
+        new_manifest = dict()
+        changed = list()
+        moved = list()
+        for ind, key in enumerate(keys):
+            if key not in manifest:
+                changed.append(ind)
+                continue
+            if any(manifest[key].get(field) != value for field, value in offsets[ind].items()):
+                moved.append(ind)
+            new_manifest[key] = {'id': manifest[key]['id'], **offsets[ind]}
+        removed = [entry['id'] for key, entry in manifest.items() if key not in new_manifest]
+
+        def update_offsets(ind):
+            try:
+                chunk_item = item.dataset.items.get(item_id=new_manifest[keys[ind]]['id'])
+            except dl.exceptions.NotFound:
+                # Deleted outside of the pipeline - uploaded again below
+                return ind
+            chunk_user_metadata = chunk_item.metadata.setdefault('user', dict())
+            chunk_user_metadata.update(offsets[ind])
+            if duplicates is not None and duplicates[ind]:
+                chunk_user_metadata['duplicate_spans'] = [list(span) for span in duplicates[ind]]
+            else:
+                chunk_user_metadata.pop('duplicate_spans', None)
+            chunk_item.update()
+            return None
+
+        missing = list()
+        if moved:
+            with ThreadPoolExecutor(max_workers=INCREMENTAL_UPDATE_WORKERS) as executor:
+                missing = [ind for ind in executor.map(update_offsets, moved) if ind is not None]
+            for ind in missing:
+                del new_manifest[keys[ind]]
+            changed = sorted(changed + missing)
+        logger.info(f"Incremental chunking: {len(changed)} new or changed chunks, {len(new_manifest)} unchanged "
+                    f"({len(moved) - len(missing)} moved), {len(removed)} removed")
+
+        items = list()
+        if changed:
+            stem = os.path.splitext(item.name)[0]
+            names = [f"{stem}-{keys[ind]}.txt" for ind in changed]
+            items = ChunksExtractor.upload_chunks(
+                chunks=[chunks[ind] for ind in changed],
+                item=item,
+                remote_path_for_chunks=remote_path_for_chunks,
+                metadata=metadata,
+                spans=[spans[ind] for ind in changed],
+                duplicates=None if duplicates is None else [duplicates[ind] for ind in changed],
+                indices=changed,
+                names=names,
+            )
+            indices = {name: ind for name, ind in zip(names, changed)}
+            for chunk_item in items:
+                ind = indices[chunk_item.name]
+                new_manifest[keys[ind]] = {'id': chunk_item.id, **offsets[ind]}
+
+        if removed:
+            filters = dl.Filters(field='id', values=removed, operator=dl.FiltersOperations.IN)
+            item.dataset.items.delete(filters=filters)
+            logger.info(f"Deleted {len(removed)} chunks that no longer exist")
+
+        if first_run:
+            # Chunks of a previous regular run are not in the manifest - delete them rather than leave them orphaned
+            remote_path = os.path.join(remote_path_for_chunks, item.dir.lstrip('/')).replace('\\', '/')
+            filters = dl.Filters(field='dir', values='/' + remote_path.strip('/'))
+            filters.add(field='metadata.user.original_item_id', values=item.id)
+            filters.add(field='metadata.user.extracted_chunk', values=True)
+            filters.add(field='metadata.user.packed_chunks', values=True, operator=dl.FiltersOperations.NOT_EQUAL)
+            if new_manifest:
+                filters.add(field='id', values=[entry['id'] for entry in new_manifest.values()],
+                            operator=dl.FiltersOperations.NIN)
+            item.dataset.items.delete(filters=filters)
+
+        ChunksExtractor.save_chunks_manifest(item=item, manifest=new_manifest)
+        item.update()
+        return items
+
+    @staticmethod
+    def load_chunks_manifest(item: dl.Item) -> Optional[dict]:
+        """
+        The chunks manifest of an item, or None if the item was never chunked incrementally or its manifest item was
+        deleted. Manifests of older versions were kept in the item's `metadata.user.chunks_manifest` itself.
+        """
+        user_metadata = item.metadata.get('user', dict())
+        if 'chunks_manifest_id' in user_metadata:
+            try:
+                manifest_item = item.dataset.items.get(item_id=user_metadata['chunks_manifest_id'])
+            except dl.exceptions.NotFound:
+                logger.warning(f"Chunks manifest item not found, chunking from scratch | item_id={item.id}")
+                return None
+            manifest = json.loads(manifest_item.download(save_locally=False).getvalue())
+        elif 'chunks_manifest' in user_metadata:
+            manifest = user_metadata['chunks_manifest']
+        else:
+            return None
+        # Manifests written before the offsets were tracked map keys to bare item ids
+        return {key: entry if isinstance(entry, dict) else {'id': entry} for key, entry in manifest.items()}
+
+    @staticmethod
+    def save_chunks_manifest(item: dl.Item, manifest: dict) -> dl.Item:
+        """
+        Uploads the chunks manifest of an item as `<item id>.json` in MANIFEST_REMOTE_PATH, overwriting the previous
+        one, and records its id in the item's metadata. The item itself is not updated.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest_path = os.path.join(temp_dir, f"{item.id}.json")
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            manifest_item = item.dataset.items.upload(
+                local_path=manifest_path,
+                remote_path=MANIFEST_REMOTE_PATH,
+                item_metadata={"user": {"chunks_manifest_of": item.id}},
+                overwrite=True,
+                raise_on_error=True,
+            )
+        user_metadata = item.metadata.setdefault('user', dict())
+        user_metadata.pop('chunks_manifest', None)
+        user_metadata['chunks_manifest_id'] = manifest_item.id
+        return manifest_item
+
+    @staticmethod
+    def upload_chunks_in_batches(chunks: Iterable[Tuple[int, int, str]], item, remote_path_for_chunks, metadata,
+                                 batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE) -> List[dl.Item]:
+        """
+        Uploads chunks from an iterable in bulk batches, so only one batch of chunk texts is held in memory at a time.
+
+        Args:
+            chunks (Iterable[Tuple[int, int, str]]): (start, end, chunk text) tuples to upload, typically a generator.
+            item (dl.Item): The original Dataloop item that the chunks are derived from.
+            remote_path_for_chunks (str): Remote path for the created chunks.
+            metadata (dict): Metadata to associate with each uploaded chunk item.
+            batch_size (int, optional): Maximum number of chunks per upload call.
+
+        Returns:
+            List[dl.Item]: All uploaded chunk items, in chunk order.
+        """
+        chunks = iter(chunks)
+        all_items = list()
+        while True:
+            batch = list(islice(chunks, batch_size))
+            if not batch:
+                break
+            upload_tic = time.time()
+            all_items.extend(
+                ChunksExtractor.upload_chunks(
+                    chunks=[chunk for _, _, chunk in batch],
+                    item=item,
+                    remote_path_for_chunks=remote_path_for_chunks,
+                    metadata=metadata,
+                    start_index=len(all_items),
+                    spans=[(start, end) for start, end, _ in batch],
+                )
+            )
+            logger.info(f"Uploaded batch of {len(batch)} chunks in {time.time() - upload_tic} seconds")
+        return all_items
+
+    @staticmethod
+    def deduplicate_spans(text: str, spans: List[Tuple[int, int]], mode: str = 'exact',
+                          threshold: float = DEFAULT_DEDUP_THRESHOLD) -> Tuple[List[Tuple[int, int]], List[List[Tuple[int, int]]]]:
+        """
+        Drops duplicate chunks, keeping the first occurrence of each.
+
+        Exact duplicates are found with a content hash. In 'near' mode, chunks are also compared by MinHash signatures
+        of their character shingles; LSH banding only compares a chunk with the kept chunks it shares a band with, so
+        the run time stays close to linear in the number of chunks.
+
+        Args:
+            text (str): The original text.
+            spans (List[Tuple[int, int]]): (start, end) character offsets of the chunks, in order.
+            mode (str, optional): 'exact' or 'near'. Defaults to 'exact'.
+            threshold (float, optional): Minimum estimated Jaccard similarity for two chunks to be near-duplicates.
+
+        Returns:
+            Tuple[List[Tuple[int, int]], List[List[Tuple[int, int]]]]: The kept spans, and for each kept span the
+            spans of the dropped chunks it stands for.
+        """
+        kept = list()
+        duplicates = list()
+        hashes = dict()
+        signatures = list()
+        bands, rows = _lsh_bands(threshold)
+        buckets = [dict() for _ in range(bands)]
+        min_matches = threshold * DEDUP_NUM_PERM
+        for start, end in spans:
+            chunk = text[start:end]
+            digest = hashlib.sha1(chunk.encode('utf-8')).digest()
+            ind = hashes.get(digest)
+            if ind is None and mode == 'near':
+                signature = _minhash_signature(chunk)
+                keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+                checked = set()
+                for band, key in enumerate(keys):
+                    for candidate in buckets[band].get(key, ()):
+                        if candidate in checked:
+                            continue
+                        checked.add(candidate)
+                        if np.count_nonzero(signatures[candidate] == signature) >= min_matches:
+                            ind = candidate
+                            break
+                    if ind is not None:
+                        break
+                if ind is None:
+                    signatures.append(signature)
+                    for band, key in enumerate(keys):
+                        buckets[band].setdefault(key, list()).append(len(kept))
+            if ind is None:
+                hashes[digest] = len(kept)
+                kept.append((start, end))
+                duplicates.append(list())
+            else:
+                hashes[digest] = ind
+                duplicates[ind].append((start, end))
+        return kept, duplicates
+
+    @staticmethod
+    def read_text_incrementally(file_path: str, read_size: int = DEFAULT_STREAM_READ_SIZE) -> Iterator[str]:
+        """
+        Reads a UTF-8 text file in fixed-size byte blocks, decoding incrementally so multi-byte characters that
+        straddle a block boundary are never split.
+
+        Args:
+            file_path (str): Local path of the text file.
+            read_size (int, optional): Number of bytes to read per block.
+
+        Returns:
+            Iterator[str]: Decoded text pieces, in file order.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with open(file_path, 'rb') as f:
+            while True:
+                raw = f.read(read_size)
+                if not raw:
+                    break
+                piece = decoder.decode(raw)
+                if piece:
+                    yield piece
+        piece = decoder.decode(b'', final=True)
+        if piece:
+            yield piece
+
+    @staticmethod
+    def stream_chunks(file_path: str, strategy: str, chunk_size: int, chunk_overlap: int,
+                      read_size: int = DEFAULT_STREAM_READ_SIZE) -> Iterator[Tuple[int, int, str]]:
+        """
+        Chunks a text file without loading it whole, yielding chunks as soon as they are complete.
+
+        'fixed-size' slides a window over the incoming text and 'recursive' merges each complete paragraph into the
+        open chunk (see `_stream_recursive_spans`), so both produce the same chunks as the in-memory path, including
+        `chunk_overlap` across read boundaries. 'token' and the NLTK strategies are applied to segments cut at the
+        last blank line in the buffer (or the last line break / space if a segment has no blank line, or a multiple of
+        `chunk_size` if it has no separator at all): their chunks cover the same text and respect `chunk_size`, but
+        may be cut differently next to a segment boundary. For 'token', the last chunk of a segment is held back and
+        chunked again with the next segment, so `chunk_overlap` is kept across the cuts. '1-chunk' still yields the
+        full text as a single chunk.
+
+        Args:
+            file_path (str): Local path of the text file.
+            strategy (str): The chunking method to use, see `chunking_strategy`.
+            chunk_size (int): Maximum size of each chunk in characters.
+            chunk_overlap (int): Maximum overlap in characters between consecutive chunks.
+            read_size (int, optional): Number of bytes to read per block.
+
+        Returns:
+            Iterator[Tuple[int, int, str]]: (start, end, chunk text) tuples in document order, with offsets in
+            characters from the start of the file.
+        """
+        pieces = ChunksExtractor.read_text_incrementally(file_path=file_path, read_size=read_size)
+
+        # Absolute character offset of buffer[0]
+        base = 0
+        buffer = ''
+
+        if strategy == 'fixed-size':
+            _check_chunk_overlap(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            step = max(chunk_size - chunk_overlap, 1)
+            for piece in pieces:
+                buffer += piece
+                start = 0
+                # A window is emitted only once a character beyond it has arrived, as the in-memory splitter does
+                while len(buffer) - start > chunk_size:
+                    chunk_start, chunk_end = _strip_span(buffer, start, start + chunk_size)
+                    if chunk_start < chunk_end:
+                        yield base + chunk_start, base + chunk_end, buffer[chunk_start:chunk_end]
+                    start += step
+                buffer = buffer[start:]
+                base += start
+            chunk_start, chunk_end = _strip_span(buffer, 0, len(buffer))
+            if chunk_start < chunk_end:
+                yield base + chunk_start, base + chunk_end, buffer[chunk_start:chunk_end]
+            return
+
+        if strategy == 'recursive':
+            _check_chunk_overlap(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            yield from _stream_recursive_spans(pieces=pieces, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            return
+
+        if strategy not in ('token', 'nltk-sentence', 'nltk-paragraphs'):
+            text = ''.join(pieces)
+            yield 0, len(text), text
+            return
+
+        for piece in pieces:
+            buffer += piece
+            cut = -1
+            for separator in ('\n\n', '\n', ' '):
+                cut = buffer.rfind(separator)
+                if cut > 0:
+                    cut += len(separator)
+                    break
+            if cut <= 0:
+                # No separator at all - cut at a multiple of the chunk size, so the buffer stays bounded
+                cut = len(buffer) - len(buffer) % chunk_size
+                if cut <= 0:
+                    continue
+            segment = buffer[:cut]
+            spans = ChunksExtractor.chunking_spans(
+                text=segment, strategy=strategy, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+            )
+            keep = cut
+            if strategy == 'token' and spans:
+                # The last chunk is chunked again with the next segment, so the chunk that follows it overlaps it
+                # (or extends it) as it would in memory
+                keep = spans.pop()[0]
+            for start, end in spans:
+                yield base + start, base + end, segment[start:end]
+            buffer = buffer[keep:]
+            base += keep
+        if buffer:
+            for start, end in ChunksExtractor.chunking_spans(
+                    text=buffer, strategy=strategy, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+            ):
+                yield base + start, base + end, buffer[start:end]
+
     @staticmethod
     def chunking_strategy(text: str, strategy: str, chunk_size: int, chunk_overlap: int) -> List[str]:
         """
@@ -144,85 +1598,157 @@ class ChunksExtractor(dl.BaseServiceRunner):
             strategy (str): The chunking method to use. Options are:
                 - 'fixed-size': Chunks text to a fixed size.
                 - 'recursive': Recursively splits text by characters for best fit.
+                - 'token': Chunks text to a fixed number of tokens, counted with the local tokenizer.
                 - 'nltk-sentence': Uses NLTK to split by sentences.
                 - 'nltk-paragraphs': Uses NLTK to split by paragraphs.
                 - Any other value will return the text as a single chunk.
+            chunk_size (int): Maximum size of each chunk in characters (in tokens for 'token').
+            chunk_overlap (int): Maximum overlap in characters between consecutive chunks (in tokens for 'token').
+
+        Returns:
+            List[str]: A list of text chunks as strings.
+        """
+        spans = ChunksExtractor.chunking_spans(
+            text=text,
+            strategy=strategy,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+        return [text[start:end] for start, end in spans]
+
+    @staticmethod
+    def chunking_spans(text: str, strategy: str, chunk_size: int, chunk_overlap: int,
+                       parallel: bool = True) -> List[Tuple[int, int]]:
+        """
+        Computes the (start, end) character offsets of the chunks `chunking_strategy` returns for the same arguments.
+
+        'fixed-size' and 'recursive' work on offsets only and reproduce the output of LangChain's
+        `CharacterTextSplitter(separator="")` and `RecursiveCharacterTextSplitter` (whitespace-stripped chunks,
+        empty chunks dropped). 'token' tokenizes the text once and cuts chunks at token offsets. The NLTK strategies
+        map each token back to its position in the text; long texts are split at blank lines where no sentence
+        crosses and the shards are tokenized in a process-wide pool.
+
+        Args:
+            text (str): The full text string to be split into chunks.
+            strategy (str): The chunking method to use, see `chunking_strategy`.
             chunk_size (int): Maximum size of each chunk in characters.
             chunk_overlap (int): Maximum overlap in characters between consecutive chunks.
+            parallel (bool, optional): Whether long texts may be tokenized in the NLTK pool. Pass False when already
+                running in a pool worker. Defaults to True.
 
         Returns:
-            List[str]: A list of text chunks as strings.
+            List[Tuple[int, int]]: Chunk offsets in document order, so that `text[start:end]` is the chunk.
         """
 
         # Chunking by a fixed size input
         if strategy == 'fixed-size':
-            text_splitter = CharacterTextSplitter(separator="", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            chunks = text_splitter.create_documents([text])
-            chunks = [chunk.page_content for chunk in chunks]
+            _check_chunk_overlap(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            step = max(chunk_size - chunk_overlap, 1)
+            spans = list()
+            start = 0
+            # A window is closed only when a character beyond it exists; the remainder forms the last chunk
+            while len(text) - start > chunk_size:
+                span = _strip_span(text, start, start + chunk_size)
+                if span[0] < span[1]:
+                    spans.append(span)
+                start += step
+            span = _strip_span(text, start, len(text))
+            if span[0] < span[1]:
+                spans.append(span)
 
         # Split by a list of characters: ["\n\n", "\n", " ", ""] in order, until the chunks are small enough.
         elif strategy == 'recursive':
-            text_splitter = RecursiveCharacterTextSplitter(
+            _check_chunk_overlap(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            spans = _recursive_spans(
+                text=text,
+                start=0,
+                end=len(text),
+                separators=RECURSIVE_SEPARATORS,
                 chunk_size=chunk_size,
                 chunk_overlap=chunk_overlap,
-                length_function=len,
-                is_separator_regex=False,
             )
-            chunks = text_splitter.create_documents([text])
-            chunks = [chunk.page_content for chunk in chunks]
+
+        # Chunks of up to chunk_size tokens, overlapping by chunk_overlap tokens
+        elif strategy == 'token':
+            _check_chunk_overlap(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            offsets = _token_offsets(text)
+            step = max(chunk_size - chunk_overlap, 1)
+            spans = list()
+            for first in range(0, len(offsets), step):
+                last = first + chunk_size
+                end = offsets[last] if last < len(offsets) else len(text)
+                span = _strip_span(text, offsets[first], end)
+                if span[0] < span[1]:
+                    spans.append(span)
+                if last >= len(offsets):
+                    break
 
         # Each sentence as a chunk
         elif strategy == 'nltk-sentence':
-            chunks = nltk.sent_tokenize(text)
+            spans = _parallel_spans(
+                text=text,
+                tokenize=_sentence_spans,
+                is_boundary=_is_sentence_boundary,
+                parallel=parallel,
+            )
 
         # Each paragraph as a chunk
         elif strategy == 'nltk-paragraphs':
-            chunks = nltk.tokenize.blankline_tokenize(text)
+            spans = _parallel_spans(text=text, tokenize=_paragraph_spans, parallel=parallel)
         else:
             # All text as 1 chunk
-            chunks = [text]
+            spans = [(0, len(text))]
 
-        return chunks
+        return spans
 
     def clean_multiple_chunks(self, items: [dl.Item], context: dl.Context) -> List[dl.Item]:
         """
         Preprocesses multiple text chunk items in a Dataloop dataset by cleaning and optionally spell-checking each chunk.
 
         This function downloads each text item in the provided list, processes the text based on the context settings,
-        and saves the cleaned text to new chunk files. Optionally, it performs spell correction if enabled in the context.
+        and uploads the cleaned texts as new chunk items in bulk batches. Optionally, it performs spell correction if
+        enabled in the context.
 
         Args:
             item dl.Item]: A Dataloop text item.
             context (dl.Context): Context configuration specifying whether to apply spell-checking.
 
         Returns:
-            List[dl.Item]: A list of cleaned text chunk items.
+            List[dl.Item]: A list of cleaned text chunk items, in the order of the input items.
         """
 
         node = context.node
         to_correct_spelling = node.metadata['customNodeConfig']['to_correct_spelling']
         remote_path_for_clean_chunks = node.metadata['customNodeConfig']['remote_path_for_clean_chunks']
 
-        ###############################################
-        # Clean text by using unstructured io library #
-        ################################################
+        execution_mode = node.metadata['customNodeConfig'].get('execution_mode', DEFAULT_CLEAN_EXECUTION_MODE)
+        upload_batch_size = node.metadata['customNodeConfig'].get('upload_batch_size', DEFAULT_UPLOAD_BATCH_SIZE)
 
         tic = time.time()
-        futures = list()
-        with ThreadPoolExecutor(max_workers=32) as executor:
-            with tqdm(total=len(items), desc='Processing') as pbar:
-                for item in items:
-                    kwargs = {
-                        'pbar': pbar,
-                        'item': item,
-                        'to_correct_spelling': to_correct_spelling,
-                        "remote_path_for_clean_chunks": remote_path_for_clean_chunks,
-                    }
-                    future = executor.submit(self.clean_chunk, **kwargs)
-                    futures.append(future)
-        results = [future.result() for future in futures]
+        if execution_mode == 'processes':
+            texts = self.clean_chunks_in_processes(items=items, to_correct_spelling=to_correct_spelling)
+        else:
+            futures = list()
+            with ThreadPoolExecutor(max_workers=CLEAN_IO_WORKERS) as executor:
+                with tqdm(total=len(items), desc='Processing') as pbar:
+                    for item in items:
+                        kwargs = {
+                            'pbar': pbar,
+                            'item': item,
+                            'to_correct_spelling': to_correct_spelling,
+                        }
+                        future = executor.submit(self.clean_chunk_text, **kwargs)
+                        futures.append(future)
+            texts = [future.result() for future in futures]
 
-        logger.info('Using threads took {:.2f}[s]'.format(time.time() - tic))
+        logger.info('Using {} took {:.2f}[s]'.format(execution_mode, time.time() - tic))
+
+        upload_tic = time.time()
+        results = self.upload_clean_chunks(items=items,
+                                           texts=texts,
+                                           remote_path_for_clean_chunks=remote_path_for_clean_chunks,
+                                           batch_size=upload_batch_size)
+        logger.info(f"Uploaded {len(results)} clean chunks in {time.time() - upload_tic} seconds")
 
         return results
 
@@ -232,8 +1758,8 @@ class ChunksExtractor(dl.BaseServiceRunner):
         Cleans a text chunk item using various text preprocessing functions and optionally applies spell-checking.
 
         This function downloads the text item, applies a series of cleaning functions, optionally performs spell
-        correction, and saves the cleaned text as a new chunk file. It then uploads the cleaned chunk back to the
-        Dataloop dataset with metadata indicating the processing status.
+        correction, and uploads the cleaned chunk back to the Dataloop dataset with metadata indicating the
+        processing status.
 
         Args:
             pbar (tqdm): Progress bar instance to track progress.
@@ -244,79 +1770,167 @@ class ChunksExtractor(dl.BaseServiceRunner):
         Returns:
             dl.Item: The cleaned text chunk item uploaded back to the Dataloop dataset.
         """
-        # Create a partial function for cleaner1 with the specified parameters for clean function of unstructured-io
-        cleaner1_partial = partial(
-            clean,
-            extra_whitespace=True,  # Removes extra whitespace from a section of text
-            dashes=True,  # Removes dashes from a section of text.
-            bullets=True,  # Removes bullets from the beginning of text.
-            trailing_punctuation=True,  # Removes trailing punctuation from a section of text.
-            lowercase=True,
-        )  # Lowercase the output
-
-        cleaners = [
-            cleaner1_partial,
-            # Replaces unicode quote characters in strings
-            replace_unicode_quotes,
-            # Removes non-ascii characters from a string.
-            clean_non_ascii_chars,
-            # # Remove alphanumeric bullets from the beginning of text up to three subsection levels.
-            # clean_ordered_bullets,
-            # Groups together paragraphs that are broken up with line breaks
-            group_broken_paragraphs,
-            # Removes ASCII and unicode punctuation from a string.
-            remove_punctuation,
-        ]
+        text = ChunksExtractor.clean_chunk_text(pbar=pbar, item=item, to_correct_spelling=to_correct_spelling)
+        clean_chunk_item, = ChunksExtractor.upload_clean_chunks(items=[item],
+                                                                texts=[text],
+                                                                remote_path_for_clean_chunks=remote_path_for_clean_chunks)
+        return clean_chunk_item
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            file_path = os.path.join(temp_dir, item.name)
-            textfile_path = item.download(local_path=file_path, save_locally=True)
-            logger.info(f"Downloaded item to temporary path: {textfile_path}")
-
-            # Extract content
-            elements = partition_text(filename=textfile_path)
-            text = ''
-            # Clean content
-            for element in elements:
-                element = Text(element.text)
-                element.apply(*cleaners)
-                if element.text.split() != []:  # clean_ordered_bullets fails when splitting returns an empty list
-                    # Remove alphanumeric bullets from the beginning of text up to three subsection levels.
-                    element.text = clean_ordered_bullets(text=element.text)
-                logger.info("Applied cleaning methods")
-                if to_correct_spelling is True:
-                    spell = Speller(lang='en')
-                    clean_text = spell(element.text)
-                    text += clean_text + ''
-                    logger.info("Applied autocorrect spelling")
-                else:
-                    text += element.text + ' '
+    @staticmethod
+    def clean_chunk_text(pbar: tqdm, item: dl.Item, to_correct_spelling: bool = True) -> str:
+        """
+        Downloads a text chunk item into memory and returns its cleaned text.
 
-        # Save
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_file_path = os.path.join(temp_dir, f"{Path(item.name).stem}_text.txt")
-            with open(temp_file_path, "w", encoding="utf-8") as temp_text_file:
-                temp_text_file.write(text)
-
-            logger.info(f"Saved chunk to temporary file at: {temp_file_path}")
-
-            original_id = item.metadata.get('user', dict()).get('original_item_id', None)
-            clean_chunk_item = item.dataset.items.upload(
-                local_path=temp_file_path,
-                remote_path=remote_path_for_clean_chunks,
-                item_metadata={
-                    "user": {
-                        "clean_chunk": True,
-                        "original_item_id": original_id,
-                        "original_chunk_id": item.id,
-                    }
-                },
-                overwrite=True,
-                raise_on_error=True,
-            )
+        Args:
+            pbar (tqdm): Progress bar instance to track progress.
+            item (dl.Item): The Dataloop text item representing a chunk of the original file.
+            to_correct_spelling (bool, optional): Whether to apply spell-checking using autocorrect. Defaults to True.
+
+        Returns:
+            str: The cleaned text.
+        """
+        buffer = item.download(save_locally=False)
+        logger.info(f"Downloaded item {item.id} to memory")
+        text = ChunksExtractor.clean_text(data=buffer.read(), to_correct_spelling=to_correct_spelling)
+        logger.info("Applied cleaning methods")
         pbar.update()
+        return text
 
-        return clean_chunk_item
+    @staticmethod
+    def clean_chunks_in_processes(items: List[dl.Item], to_correct_spelling: bool = True) -> List[str]:
+        """
+        Cleans text chunk items with the downloads on threads and the cleaning on a process pool.
+
+        Cleaning and spell correction are CPU bound, so they run in the process-wide cleaning pool, whose workers each
+        hold their own speller and are kept between calls, while the thread pool keeps downloading the next chunks.
+
+        Args:
+            items (List[dl.Item]): The Dataloop text items to clean.
+            to_correct_spelling (bool, optional): Whether to apply spell-checking. Defaults to True.
+
+        Returns:
+            List[str]: The cleaned texts, in the order of the input items.
+        """
+
+        def download(item: dl.Item) -> bytes:
+            data = item.download(save_locally=False).read()
+            logger.info(f"Downloaded item {item.id} to memory")
+            return data
+
+        cpu_executor = _get_clean_executor(to_correct_spelling=to_correct_spelling)
+        logger.info(f"Cleaning {len(items)} chunks in the cleaning pool")
+        try:
+            with ThreadPoolExecutor(max_workers=CLEAN_IO_WORKERS) as io_executor, \
+                    tqdm(total=len(items), desc='Processing') as pbar:
+                downloads = [io_executor.submit(download, item) for item in items]
+                cleanings = list()
+                for data in downloads:
+                    cleaning = cpu_executor.submit(ChunksExtractor.clean_text,
+                                                   data=data.result(),
+                                                   to_correct_spelling=to_correct_spelling)
+                    cleaning.add_done_callback(lambda _: pbar.update())
+                    cleanings.append(cleaning)
+                results = [future.result() for future in cleanings]
+        except BrokenProcessPool:
+            _reset_clean_executor(cpu_executor)
+            raise
+        return results
+
+    @staticmethod
+    def upload_clean_chunks(items: List[dl.Item], texts: List[str], remote_path_for_clean_chunks: str,
+                            batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE) -> List[dl.Item]:
+        """
+        Uploads cleaned texts as new chunk items in bulk batches, one batch per upload call.
+
+        The chunks are grouped by dataset, and each clean chunk keeps the `original_item_id` of its document and the
+        `original_chunk_id` of the chunk it was cleaned from. Clean chunks are named `<chunk name>_<chunk id>_text.txt`
+        in one flat remote path - from the chunk alone, so cleaning a chunk again overwrites its clean chunk, and chunks
+        of a dataset with the same name (in different folders) do not overwrite each other.
+
+        Args:
+            items (List[dl.Item]): The Dataloop text items of the original chunks.
+            texts (List[str]): The cleaned text of each item.
+            remote_path_for_clean_chunks (str): Remote path for the clean chunks.
+            batch_size (int, optional): Maximum number of clean chunks per upload call.
+
+        Returns:
+            List[dl.Item]: The uploaded clean chunk items, in the order of the input items.
+
+        Raises:
+            dl.PlatformException: If a clean chunk was not uploaded.
+        """
+        groups = dict()
+        for item, text in zip(items, texts):
+            groups.setdefault(item.dataset.id, list()).append((item, text))
+
+        uploaded = dict()
+        for group in groups.values():
+            dataset = group[0][0].dataset
+            for batch_start in range(0, len(group), batch_size):
+                rows = list()
+                for item, text in group[batch_start:batch_start + batch_size]:
+                    bin = io.BytesIO(text.encode('utf-8'))
+                    bin.name = f"{Path(item.name).stem}_{item.id}_text.txt"
+                    bin.seek(0)
+                    original_id = item.metadata.get('user', dict()).get('original_item_id', None)
+                    rows.append({
+                        'local_path': bin,
+                        'remote_path': remote_path_for_clean_chunks,
+                        'item_metadata': {
+                            "user": {
+                                "clean_chunk": True,
+                                "original_item_id": original_id,
+                                "original_chunk_id": item.id,
+                            }
+                        },
+                    })
+                clean_chunk_items = dataset.items.upload(
+                    local_path=pd.DataFrame(rows),
+                    overwrite=True,
+                    raise_on_error=True,
+                )
+                if clean_chunk_items is None:
+                    clean_chunk_items = []
+                elif isinstance(clean_chunk_items, dl.Item):
+                    clean_chunk_items = [clean_chunk_items]
+                for clean_chunk_item in clean_chunk_items:
+                    uploaded[clean_chunk_item.metadata['user']['original_chunk_id']] = clean_chunk_item
+
+        missing = [item.id for item in items if item.id not in uploaded]
+        if missing:
+            raise dl.PlatformException(f"Clean chunks were not uploaded for items: {missing}")
+        return [uploaded[item.id] for item in items]
+
+    @staticmethod
+    def clean_text(data: bytes, to_correct_spelling: bool = True) -> str:
+        """
+        Cleans the raw content of a text chunk.
+
+        Produces the same text as partitioning the file with `unstructured.partition.text.partition_text` and applying
+        `clean` (extra whitespace, dashes, bullets, trailing punctuation, lowercase), `replace_unicode_quotes`,
+        `clean_non_ascii_chars`, `group_broken_paragraphs`, `remove_punctuation` and `clean_ordered_bullets` to each
+        element, but works on the bytes in memory and skips element classification and language detection, which do
+        not affect the text.
+
+        Args:
+            data (bytes): The raw content of the text chunk.
+            to_correct_spelling (bool, optional): Whether to apply spell-checking. Defaults to True.
+
+        Returns:
+            str: The cleaned text.
+        """
+        text = ''
+        for element_text in _partition_text_elements(_decode_text_bytes(data)):
+            element_text = _clean_element_text(element_text)
+            if element_text.split() != []:  # clean_ordered_bullets fails when splitting returns an empty list
+                # Remove alphanumeric bullets from the beginning of text up to three subsection levels.
+                element_text = clean_ordered_bullets(text=element_text)
+            if to_correct_spelling is True:
+                spell = get_spell_corrector()
+                text += spell(element_text) + ''
+            else:
+                text += element_text + ' '
+        return text
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+from modules.txt.packed_chunks import is_packed_chunks_item, read_packed_records
 from pathlib import Path
 import dtlpy as dl
 import tempfile
@@ -13,20 +14,33 @@ class ServiceRunner(dl.BaseServiceRunner):
         """
         Creates Contextual prompt item from a txt chunk item.
 
-        :param item: Chunk item
+        :param item: Chunk item, or a packed chunks item (JSONL, one record per chunk)
         :param context: The Dataloop context providing parameters for chunking, including:
                 - `remote_path` (str): The remote path for uploading the prompt chunk.
+                - `record_start` (int, optional): For packed chunks items, index of the first chunk record.
+                - `record_count` (int, optional): For packed chunks items, number of chunk records, 0 for all.
         """
 
         node = context.node
         remote_path = node.metadata['customNodeConfig']['remote_path']
 
-        if not item.mimetype == 'text/plain':
+        packed = is_packed_chunks_item(item)
+        if not item.mimetype == 'text/plain' and not packed:
             raise ValueError(f"Item id : {item.id} is not a txt file! This functions excepts txt only.")
 
-        # Download item
-        buffer = item.download(save_locally=False)
-        chunk_text = buffer.read().decode('utf-8')
+        user_metadata = {"txt_chunk_id": item.id}
+        prompt_item_name = item.name
+        if packed:
+            record_start = node.metadata['customNodeConfig'].get('record_start', 0)
+            record_count = node.metadata['customNodeConfig'].get('record_count', 0)
+            records = read_packed_records(item=item, record_start=record_start, record_count=record_count)
+            chunk_text = '\n\n'.join(record['text'] for record in records)
+            prompt_item_name = f"{Path(item.name).stem}_{record_start}-{record_start + len(records)}.json"
+            user_metadata.update({"record_start": record_start, "record_count": len(records)})
+        else:
+            # Download item
+            buffer = item.download(save_locally=False)
+            chunk_text = buffer.read().decode('utf-8')
 
         original_item_id = item.metadata.get('user', {}).get('original_item_id')
 
@@ -40,13 +54,14 @@ class ServiceRunner(dl.BaseServiceRunner):
 
         p_item = self.contextual_prompt(original_text=original_text,
                                         chunk_text=chunk_text,
-                                        prompt_item_name=item.name)
+                                        prompt_item_name=prompt_item_name)
 
+        user_metadata["original_item_id"] = original_item_id
         prompt_item = item.dataset.items.upload(
             p_item,
             remote_path=remote_path,
             item_metadata={
-                "user": {"txt_chunk_id": item.id, "original_item_id": original_item_id}
+                "user": user_metadata
             },
             overwrite=True,
             raise_on_error=True,
@@ -109,8 +124,19 @@ class ServiceRunner(dl.BaseServiceRunner):
                 f"'metadata.user.original_item_id' with the ID of the item from which this chunk was created.")
 
         original_item = dl.items.get(item_id=original_item_id)
-        buffer = original_item.download(save_locally=False)
-        chunk_text = buffer.read().decode('utf-8')
+        packed = is_packed_chunks_item(original_item)
+        if packed:
+            record_start = item.metadata['user'].get('record_start', 0)
+            record_count = item.metadata['user'].get('record_count', 0)
+            records = read_packed_records(item=original_item, record_start=record_start, record_count=record_count)
+            chunk_text = '\n\n'.join(record['text'] for record in records)
+            if overwrite_chunk is True:
+                logger.warning(f"Item {original_item.id} is a packed chunks item and is not overwritten. "
+                               f"Uploading the contextual chunk as a new item.")
+                overwrite_chunk = False
+        else:
+            buffer = original_item.download(save_locally=False)
+            chunk_text = buffer.read().decode('utf-8')
         prompt_text = f"{context} \n {chunk_text}"
 
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -130,6 +156,9 @@ class ServiceRunner(dl.BaseServiceRunner):
                 )
             else:
                 remote_name = f"{Path(original_item.name).stem}_contextual.txt"
+                if packed:
+                    # One contextual chunk per record range, named after its prompt item
+                    remote_name = f"{Path(item.name).stem}_contextual.txt"
                 new_item = original_item.dataset.items.upload(
                     local_path=temp_file,
                     remote_path=remote_path,
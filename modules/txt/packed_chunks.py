@@ -0,0 +1,93 @@
+from itertools import islice
+from typing import Iterator, List, Tuple
+import dtlpy as dl
+import tempfile
+import json
+
+# Byte offset index of a packed chunks item - the offset of every PACKED_INDEX_INTERVAL-th record is kept in the item's
+# `packed_chunks_index` metadata, so a record range is read with one ranged request of at most that many extra records
+PACKED_INDEX_INTERVAL = 100
+
+
+def is_packed_chunks_item(item: dl.Item) -> bool:
+    """
+    Whether the item is a packed chunks item, created by the chunking app with the 'jsonl' output format.
+    """
+    return item.metadata.get('user', {}).get('packed_chunks', False) is True
+
+
+def iter_packed_records(item: dl.Item) -> Iterator[Tuple[int, int, dict]]:
+    """
+    Iterates over the chunk records of a packed chunks item, one JSON record per line.
+
+    The item is downloaded to a temporary file and read line by line, so the records are never all held in memory.
+
+    :param item: Packed chunks item
+    :return: (byte offset, byte length, record) of each record, in order
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = item.download(local_path=temp_dir)
+        offset = 0
+        with open(file_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield offset, len(line), json.loads(line)
+                offset += len(line)
+
+
+def _read_byte_range(item: dl.Item, offset: int, length: int = None) -> bytes:
+    """
+    Reads a byte range of an item with a ranged request. A length of None reads to the end of the item.
+    """
+    byte_range = f"bytes={offset}-{offset + length - 1}" if length is not None else f"bytes={offset}-"
+    success, response = dl.client_api.gen_request(req_type='get',
+                                                  path=f"/items/{item.id}/stream",
+                                                  headers={'Range': byte_range},
+                                                  dataset_id=item.dataset_id)
+    if not success:
+        raise dl.exceptions.PlatformException(response)
+    content = response.content
+    if response.status_code != 206:
+        # The range was ignored and the whole item was returned
+        content = content[offset:offset + length if length is not None else None]
+    return content
+
+
+def read_packed_record(item: dl.Item, offset: int, length: int) -> dict:
+    """
+    Reads one chunk record of a packed chunks item by its byte range, without downloading the whole item.
+
+    :param item: Packed chunks item
+    :param offset: Byte offset of the record, as yielded by iter_packed_records
+    :param length: Byte length of the record, as yielded by iter_packed_records
+    """
+    return json.loads(_read_byte_range(item=item, offset=offset, length=length))
+
+
+def read_packed_records(item: dl.Item, record_start: int = 0, record_count: int = 0) -> List[dict]:
+    """
+    Reads a range of chunk records from a packed chunks item.
+
+    With the item's byte offset index, only the bytes from the indexed record before the range to the indexed record
+    after it are requested. Items packed without an index are downloaded and read up to the end of the range.
+
+    :param item: Packed chunks item
+    :param record_start: Index of the first record to read
+    :param record_count: Number of records to read, 0 for all the records from record_start
+    """
+    record_end = record_start + record_count if record_count else None
+    index = item.metadata.get('user', {}).get('packed_chunks_index')
+    if not index:
+        return list(islice((record for _, _, record in iter_packed_records(item)), record_start, record_end))
+
+    interval, offsets = index['interval'], index['offsets']
+    block = min(record_start // interval, len(offsets) - 1)
+    length = None
+    if record_end is not None:
+        end_block = -(-record_end // interval)
+        if end_block < len(offsets):
+            length = offsets[end_block] - offsets[block]
+    # JSON escapes line breaks in strings, so every line is a record
+    lines = _read_byte_range(item=item, offset=offsets[block], length=length).splitlines()
+    skip = record_start - block * interval
+    return [json.loads(line) for line in islice(lines, skip, skip + record_count if record_count else None)]
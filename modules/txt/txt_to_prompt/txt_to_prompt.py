@@ -4,6 +4,8 @@ import os
 
 import dtlpy as dl
 
+from modules.txt.packed_chunks import is_packed_chunks_item, read_packed_records
+
 logger = logging.getLogger('document-preprocessing.txt-to-prompt')
 
 DEFAULT_OUTPUT_DIR = '/prompt_items_dir'
@@ -17,6 +19,9 @@ class ServiceRunner(dl.BaseServiceRunner):
         Receives a text item, reads its content, wraps it in a PromptItem,
         and uploads the prompt item to the same dataset.
 
+        A packed chunks item (JSONL, one record per chunk) is also accepted; the prompt then holds the text of the
+        records in the configured record range, read from the packed item with a ranged request.
+
         Args:
             item (dl.Item): A text (.txt) item.
             context (dl.Context): Pipeline context containing node configuration.
@@ -26,7 +31,8 @@ class ServiceRunner(dl.BaseServiceRunner):
         """
         logger.info(f"Processing text item: {item.id} ({item.name})")
 
-        if item.mimetype != 'text/plain':
+        packed = is_packed_chunks_item(item)
+        if item.mimetype != 'text/plain' and not packed:
             raise ValueError(
                 f"Item {item.id} is not a txt file. This function accepts txt only. "
                 f"Use other extracting applications from Marketplace to convert to txt first."
@@ -38,15 +44,22 @@ class ServiceRunner(dl.BaseServiceRunner):
         metadata_keys = node_config.get('metadata_keys_to_extract', [])
         add_metadata_to_prompt = node_config.get('add_metadata_to_prompt', False)
 
-        buffer = item.download(save_locally=False)
-        text_content = buffer.read().decode('utf-8')
+        base_name = os.path.splitext(item.name)[0]
+        if packed:
+            record_start = node_config.get('record_start', 0)
+            record_count = node_config.get('record_count', 0)
+            records = read_packed_records(item=item, record_start=record_start, record_count=record_count)
+            text_content = '\n\n'.join(record['text'] for record in records)
+            prompt_item_name = f"{base_name}_{record_start}-{record_start + len(records)}.json"
+            logger.info(f"Read {len(records)} chunk records from packed item {item.id}")
+        else:
+            buffer = item.download(save_locally=False)
+            text_content = buffer.read().decode('utf-8')
+            prompt_item_name = f"{base_name}.json"
         logger.info(f"Read text content ({len(text_content)} chars) from item {item.id}")
 
         extracted_metadata = self._extract_metadata(item, metadata_keys)
 
-        base_name = os.path.splitext(item.name)[0]
-        prompt_item_name = f"{base_name}.json"
-
         prompt_item = dl.PromptItem(name=prompt_item_name)
         prompt = dl.Prompt(key='1')
 
@@ -63,6 +76,8 @@ class ServiceRunner(dl.BaseServiceRunner):
         prompt_item.prompts.append(prompt)
 
         item_metadata = {'user': {'source_item_id': item.id}}
+        if packed:
+            item_metadata['user'].update({'record_start': record_start, 'record_count': len(records)})
         if not add_metadata_to_prompt and extracted_metadata:
             for key, value in extracted_metadata.items():
                 if isinstance(value, dict) and key in item_metadata:
@@ -0,0 +1,31 @@
+import glob
+import os
+import sys
+
+import nltk
+import pytest
+from nltk.tokenize.punkt import PunktParameters, PunktSentenceTokenizer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every module is an entry point file, imported by its file name as the runner does. Code shared between modules is
+# imported from the repository root (e.g. `modules.txt.packed_chunks`), which the runner runs from
+for module_dir in [ROOT] + sorted(glob.glob(os.path.join(ROOT, 'modules', '*', '*'))):
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
+
+
+@pytest.fixture
+def sent_tokenize(monkeypatch):
+    """
+    `nltk.sent_tokenize`, with an untrained Punkt model when the trained one is not downloaded. The parity tests compare
+    two code paths over the same tokenizer, so they do not depend on the model.
+    """
+    try:
+        nltk.sent_tokenize("Punkt.")
+    except LookupError:
+        parameters = PunktParameters()
+        parameters.abbrev_types = {'dr', 'mr', 'mrs', 'e.g', 'i.e', 'etc', 'inc'}
+        tokenizer = PunktSentenceTokenizer(parameters)
+        monkeypatch.setattr(nltk, 'sent_tokenize', lambda text, language='english': tokenizer.tokenize(text))
+    return nltk.sent_tokenize
@@ -0,0 +1,191 @@
+import base64
+import bisect
+import random
+from functools import lru_cache, partial
+
+import nltk
+import pytest
+
+import chunks_extractor
+from chunks_extractor import ChunksExtractor
+
+text_splitters = pytest.importorskip('langchain_text_splitters')
+
+WORDS = ['héllo', 'wörld', '日本語', 'a', 'b  ', '\n', '\n\n', '\n \n', 'test', '   ', '\t', 'supercalifragilistic ',
+         'x' * 30, '.', ' Mr. Smith. ', 'Dr. Who went home. ', '?! ']
+
+
+def random_text(rng: random.Random, max_words: int = 300) -> str:
+    return ''.join(rng.choice(WORDS) for _ in range(rng.randint(0, max_words)))
+
+
+def baseline_chunks(text: str, strategy: str, chunk_size: int, chunk_overlap: int):
+    """The chunks of the LangChain / NLTK implementation the offset splitters replace."""
+    if strategy == 'fixed-size':
+        splitter = text_splitters.CharacterTextSplitter(separator="", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    elif strategy == 'recursive':
+        splitter = text_splitters.RecursiveCharacterTextSplitter(chunk_size=chunk_size,
+                                                                 chunk_overlap=chunk_overlap,
+                                                                 length_function=len,
+                                                                 is_separator_regex=False)
+    elif strategy == 'nltk-sentence':
+        return nltk.sent_tokenize(text)
+    elif strategy == 'nltk-paragraphs':
+        return nltk.tokenize.blankline_tokenize(text)
+    else:
+        return [text]
+    return [document.page_content for document in splitter.create_documents([text])]
+
+
+@pytest.mark.parametrize('strategy', ['fixed-size', 'recursive', 'nltk-sentence', 'nltk-paragraphs', '1-chunk'])
+@pytest.mark.parametrize('seed', range(4))
+def test_chunking_matches_baseline(strategy, seed, sent_tokenize):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng)
+        chunk_size = rng.randint(1, 80)
+        chunk_overlap = rng.randint(0, chunk_size)
+        expected = baseline_chunks(text, strategy, chunk_size, chunk_overlap)
+        assert ChunksExtractor.chunking_strategy(text, strategy, chunk_size, chunk_overlap) == expected
+
+
+@pytest.mark.parametrize('strategy', ['fixed-size', 'recursive', 'nltk-sentence', 'nltk-paragraphs'])
+def test_spans_are_offsets_of_the_chunks(strategy, sent_tokenize):
+    rng = random.Random(7)
+    for _ in range(100):
+        text = random_text(rng)
+        spans = ChunksExtractor.chunking_spans(text, strategy, 40, 10)
+        assert all(0 <= start < end <= len(text) for start, end in spans)
+        assert [start for start, _ in spans] == sorted(start for start, _ in spans)
+        assert [text[start:end] for start, end in spans] == baseline_chunks(text, strategy, 40, 10)
+
+
+def test_overlap_larger_than_chunk_size_raises():
+    with pytest.raises(ValueError):
+        ChunksExtractor.chunking_spans('some text', 'fixed-size', 10, 20)
+    with pytest.raises(ValueError):
+        ChunksExtractor.chunking_spans('some text', 'recursive', 10, 20)
+
+
+def stream_chunks(tmp_path, text: str, strategy: str, chunk_size: int, chunk_overlap: int, read_size: int) -> list:
+    file_path = tmp_path / 'text.txt'
+    file_path.write_text(text, encoding='utf-8')
+    return list(ChunksExtractor.stream_chunks(file_path=str(file_path), strategy=strategy, chunk_size=chunk_size,
+                                              chunk_overlap=chunk_overlap, read_size=read_size))
+
+
+def assert_covers(text: str, chunks: list, chunk_size: int = None):
+    """The chunks are slices of the text in order, within the chunk size, and leave no text out but whitespace."""
+    assert [start for start, _, _ in chunks] == sorted(start for start, _, _ in chunks)
+    covered = set()
+    for start, end, chunk in chunks:
+        assert text[start:end] == chunk
+        assert chunk_size is None or end - start <= chunk_size
+        covered.update(range(start, end))
+    assert all(ind in covered for ind, char in enumerate(text) if not char.isspace())
+
+
+@pytest.mark.parametrize('strategy', ['fixed-size', 'recursive'])
+@pytest.mark.parametrize('read_size', [1, 7, 64, 997])
+def test_streaming_matches_in_memory(tmp_path, strategy, read_size):
+    rng = random.Random(read_size)
+    for _ in range(50):
+        text = random_text(rng, max_words=600)
+        chunk_size = rng.randint(1, 80)
+        chunk_overlap = rng.randint(0, chunk_size)
+        expected = [(start, end, text[start:end])
+                    for start, end in ChunksExtractor.chunking_spans(text, strategy, chunk_size, chunk_overlap)]
+        assert stream_chunks(tmp_path, text, strategy, chunk_size, chunk_overlap, read_size) == expected
+
+
+def test_streaming_cuts_long_paragraphs_without_gaps(tmp_path, monkeypatch):
+    # Every paragraph is longer than the buffered limit
+    monkeypatch.setattr('chunks_extractor.STREAM_MAX_PARAGRAPH_SIZE', 0)
+    rng = random.Random(3)
+    for _ in range(50):
+        text = random_text(rng, max_words=600)
+        chunk_size = rng.randint(1, 80)
+        chunk_overlap = rng.randint(0, chunk_size)
+        for read_size in [1, 64]:
+            chunks = stream_chunks(tmp_path, text, 'recursive', chunk_size, chunk_overlap, read_size)
+            assert_covers(text, chunks, chunk_size)
+
+
+@pytest.mark.parametrize('strategy', ['nltk-sentence', 'nltk-paragraphs'])
+@pytest.mark.parametrize('read_size', [1, 64, 997])
+def test_streaming_covers_the_text(tmp_path, strategy, read_size, sent_tokenize):
+    rng = random.Random(read_size)
+    for _ in range(30):
+        text = random_text(rng, max_words=600)
+        assert_covers(text, stream_chunks(tmp_path, text, strategy, 40, 10, read_size))
+
+
+# Byte pair merges of the synthetic vocabulary, on top of the 256 single bytes
+TOKEN_MERGES = [b'he', b'll', b'hell', b'hello', b' w', b'or', b' wor', b'ld', b' world', b'\xc3\xa9', b'xx', b'xxxx',
+                b'  ', b'\n\n', b'te', b'st', b'test', b'. ', b'Mr']
+
+
+@pytest.fixture
+def tokenizer(tmp_path, monkeypatch):
+    """A small BPE vocabulary written in the runner image's file format and loaded by `_load_tokenizer`."""
+    ranks = [bytes([byte]) for byte in range(256)] + TOKEN_MERGES
+    vocabulary_path = tmp_path / 'synthetic.tiktoken'
+    vocabulary_path.write_bytes(b''.join(base64.b64encode(token) + b' %d\n' % rank for rank, token in enumerate(ranks)))
+    load_tokenizer = lru_cache(maxsize=1)(partial(chunks_extractor._load_tokenizer.__wrapped__, str(vocabulary_path)))
+    monkeypatch.setattr(chunks_extractor, '_load_tokenizer', load_tokenizer)
+    chunks_extractor._segment_token_offsets.cache_clear()
+    yield load_tokenizer()
+    chunks_extractor._segment_token_offsets.cache_clear()
+
+
+def test_token_offsets_match_the_whole_text(tokenizer):
+    rng = random.Random(11)
+    for _ in range(100):
+        text = random_text(rng) + rng.choice(['hello world', 'héllo', 'test\n\ntest'])
+        _, expected = tokenizer.decode_with_offsets(tokenizer.encode_ordinary(text))
+        offsets = chunks_extractor._token_offsets(text)
+        assert offsets == expected
+        # The byte tokens of a multi-byte character share its offset
+        assert offsets[0] == 0 and offsets == sorted(offsets)
+
+
+def test_token_chunks_overlap_by_tokens(tokenizer):
+    # Tokens: 'hello', ' world', '.', ' ', 'hello', ' world', '.', ' ', 'test'
+    text = 'hello world. hello world. test'
+    assert chunks_extractor._token_offsets(text) == [0, 5, 11, 12, 13, 18, 24, 25, 26]
+    assert ChunksExtractor.chunking_strategy(text, 'token', 3, 1) == \
+        ['hello world.', '. hello', 'hello world.', '. test']
+    assert ChunksExtractor.chunking_strategy(text, 'token', 9, 0) == [text]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_token_chunks_respect_size_and_overlap(tokenizer, seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng)
+        chunk_size = rng.randint(1, 40)
+        chunk_overlap = rng.randint(0, chunk_size)
+        offsets = chunks_extractor._token_offsets(text)
+        spans = ChunksExtractor.chunking_spans(text, 'token', chunk_size, chunk_overlap)
+        assert_covers(text, [(start, end, text[start:end]) for start, end in spans])
+        # A window of `chunk_size` tokens every `chunk_size - chunk_overlap` tokens, stripped
+        windows = list()
+        for first in range(0, len(offsets), max(chunk_size - chunk_overlap, 1)):
+            end = offsets[first + chunk_size] if first + chunk_size < len(offsets) else len(text)
+            if text[offsets[first]:end].strip():
+                windows.append(text[offsets[first]:end].strip())
+            if first + chunk_size >= len(offsets):
+                break
+        assert [text[start:end] for start, end in spans] == windows
+
+
+@pytest.mark.parametrize('read_size', [1, 64, 997])
+def test_streaming_token_chunks_cover_the_text(tmp_path, tokenizer, read_size):
+    rng = random.Random(read_size)
+    for _ in range(30):
+        text = random_text(rng, max_words=600)
+        chunks = stream_chunks(tmp_path, text, 'token', 20, 5, read_size)
+        assert_covers(text, chunks)
+        offsets = chunks_extractor._token_offsets(text)
+        assert all(bisect.bisect_left(offsets, end) - bisect.bisect_right(offsets, start) + 1 <= 20
+                   for start, end, _ in chunks)
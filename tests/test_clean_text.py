@@ -0,0 +1,85 @@
+import os
+import random
+from functools import partial
+
+import pytest
+import unstructured.partition.text as partition_text_module
+from autocorrect import Speller
+from unstructured.cleaners.core import clean, clean_non_ascii_chars, clean_ordered_bullets, group_broken_paragraphs, \
+    remove_punctuation, replace_unicode_quotes
+from unstructured.documents.elements import Text
+
+from chunks_extractor import ChunksExtractor
+
+TOKENS = ['Hello', 'world', 'e', 'E', 'the', '1.1', 'a.b', '2.', '-', '–', '•', '●', '*', '·', '\x95', '', '\xa0', '\n',
+          '\n\n', '\n \n', '\r\n', '\t', '  ', ' ', ' ', ' ', ' ', '.', ',', ':', ';', '!', '?', '"', '“', '’', '&apos;',
+          'â\x80\x99', 'é', '日本', '$', '+', '(x)', 'End.', 'Mr.', 'ok;', 'e ', '- item', '\n• bullet', '\n1. first',
+          '\n- dash', 'Speling', 'mistaks']
+
+CLEANERS = [
+    partial(clean, extra_whitespace=True, dashes=True, bullets=True, trailing_punctuation=True, lowercase=True),
+    replace_unicode_quotes,
+    clean_non_ascii_chars,
+    group_broken_paragraphs,
+    remove_punctuation,
+]
+
+
+@pytest.fixture
+def baseline_clean(monkeypatch, tmp_path, sent_tokenize):
+    """The cleaning of the baseline `clean_chunk`: partition_text on the file, then the cleaners chain per element."""
+    # Elements are re-wrapped as Text before cleaning, so their classification (which needs the NLTK taggers) does not
+    # change the result
+    monkeypatch.setattr(partition_text_module, 'is_possible_narrative_text', lambda *args, **kwargs: False)
+    monkeypatch.setattr(partition_text_module, 'is_possible_title', lambda *args, **kwargs: False)
+    monkeypatch.setattr(partition_text_module, 'sent_tokenize', sent_tokenize)
+    speller = Speller(lang='en')
+
+    def baseline(data: bytes, to_correct_spelling: bool) -> str:
+        file_path = os.path.join(tmp_path, 'chunk.txt')
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        text = ''
+        for element in partition_text_module.partition_text(filename=file_path):
+            element = Text(element.text)
+            element.apply(*CLEANERS)
+            if element.text.split() != []:
+                element.text = clean_ordered_bullets(text=element.text)
+            if to_correct_spelling is True:
+                text += speller(element.text) + ''
+            else:
+                text += element.text + ' '
+        return text
+
+    return baseline
+
+
+def random_chunk(rng: random.Random) -> bytes:
+    text = ''.join(rng.choice(TOKENS) for _ in range(rng.randint(0, 80)))
+    encoding = rng.choice(['utf-8', 'utf-8', 'latin-1'])
+    try:
+        return text.encode(encoding)
+    except UnicodeEncodeError:
+        return text.encode('utf-8')
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_clean_text_matches_baseline(seed, baseline_clean):
+    rng = random.Random(seed)
+    for _ in range(150):
+        data = random_chunk(rng)
+        assert ChunksExtractor.clean_text(data, to_correct_spelling=False) == baseline_clean(data, False), data
+
+
+def test_clean_text_with_spelling_matches_baseline(baseline_clean):
+    rng = random.Random(100)
+    for _ in range(20):
+        data = random_chunk(rng)
+        assert ChunksExtractor.clean_text(data, to_correct_spelling=True) == baseline_clean(data, True), data
+
+
+def test_long_paragraphs_match_baseline(baseline_clean):
+    # Paragraphs longer than the partition size are split at sentences by partition_text
+    sentence = 'This is a fairly long sentence - with “quotes”, bullets • and numbers 1.2. '
+    data = ('\n\n'.join(sentence * count for count in (5, 30, 60)) + '\n' + 'x' * 4000).encode('utf-8')
+    assert ChunksExtractor.clean_text(data, to_correct_spelling=False) == baseline_clean(data, False)
@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+import pytest
+
+import chunks_extractor
+from chunks_extractor import ChunksExtractor
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta', 'café', 'naïve', '日本語']
+
+
+def random_words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(count))
+
+
+def chunk_spans(chunks: list) -> tuple:
+    """The text of the chunks joined by blank lines, and the span of each chunk."""
+    text = ''
+    spans = list()
+    for chunk in chunks:
+        spans.append((len(text), len(text) + len(chunk)))
+        text += chunk + '\n\n'
+    return text, spans
+
+
+def test_signature_is_the_minimum_over_all_shingles():
+    text = random_words(random.Random(0), 2000)
+    data = np.frombuffer(' '.join(text.lower().split()).encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+    count = len(data) - chunks_extractor.DEDUP_SHINGLE_SIZE + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(chunks_extractor.DEDUP_SHINGLE_SIZE):
+        shingles = shingles * np.uint64(257) + data[offset:offset + count]
+    shingles = np.unique(shingles)
+    assert len(shingles) > 2 * chunks_extractor.DEDUP_SHINGLE_BLOCK
+    multipliers, increments = chunks_extractor._minhash_permutations()
+    expected = ((shingles[:, None] * multipliers[None, :] + increments[None, :]) >> np.uint64(32)).min(axis=0)
+    assert np.array_equal(chunks_extractor._minhash_signature(text), expected)
+
+
+@pytest.mark.parametrize('mode', ['exact', 'near'])
+def test_exact_duplicates_are_dropped_in_order(mode):
+    rng = random.Random(1)
+    first, second, third = (random_words(rng, 50) for _ in range(3))
+    text, spans = chunk_spans([first, second, first, third, second, first])
+    kept, duplicates = ChunksExtractor.deduplicate_spans(text, spans, mode=mode)
+    assert kept == [spans[0], spans[1], spans[3]]
+    assert duplicates == [[spans[2], spans[5]], [spans[4]], []]
+
+
+def test_near_duplicates_above_the_threshold_are_dropped():
+    rng = random.Random(2)
+    chunk = random_words(rng, 300)
+    # One word changed, and the whitespace and case changed
+    near = chunk.replace(chunk.split()[150], 'changed', 1).upper().replace(' ', '  ')
+    other = random_words(rng, 300)
+    text, spans = chunk_spans([chunk, other, near])
+    assert ChunksExtractor.deduplicate_spans(text, spans, mode='exact') == (spans, [[], [], []])
+    assert ChunksExtractor.deduplicate_spans(text, spans, mode='near', threshold=0.9) == \
+        ([spans[0], spans[1]], [[spans[2]], []])
+
+
+def test_near_duplicates_below_the_threshold_are_kept():
+    rng = random.Random(3)
+    words = random_words(rng, 400).split()
+    # The chunks share half of their words, a Jaccard similarity of about 1/3
+    chunk = ' '.join(words[:200])
+    partial = ' '.join(words[100:300])
+    text, spans = chunk_spans([chunk, partial])
+    assert ChunksExtractor.deduplicate_spans(text, spans, mode='near', threshold=0.9) == (spans, [[], []])
+    assert ChunksExtractor.deduplicate_spans(text, spans, mode='near', threshold=0.2) == ([spans[0]], [[spans[1]]])
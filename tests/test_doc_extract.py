@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from doc_extractor import DocExtractor
+
+
+def python_docx_content(docx_path, extract_tables=True) -> str:
+    """The text of a DOCX file read through python-docx, as the extraction did before streaming."""
+    doc = Document(docx_path)
+    full_text = list()
+    table_index = 0
+    for element in doc.element.body:
+        if element.tag.endswith('p'):
+            full_text.append(element.text)
+        elif element.tag.endswith('tbl') and extract_tables is True:
+            for row in doc.tables[table_index].rows:
+                full_text.append("\t".join(cell.text for cell in row.cells))
+            table_index += 1
+    return '\n'.join(full_text)
+
+
+def make_docx(path, seed: int) -> str:
+    """A DOCX file with paragraphs of runs, breaks and tabs, and tables with merged cells and nested tables."""
+    rng = random.Random(seed)
+    doc = Document()
+    for block in range(rng.randint(1, 12)):
+        paragraph = doc.add_paragraph(f"Paragraph {block} ")
+        run = paragraph.add_run(rng.choice(['bold\twith tab', 'café', 'naïve', '']))
+        run.bold = True
+        if rng.random() < 0.3:
+            run.add_break()
+        if rng.random() < 0.2:
+            paragraph._p.append(parse_xml(f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99">'
+                                          f'<w:r><w:t>link {block}</w:t></w:r></w:hyperlink>'))
+            paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:t>x</w:t><w:noBreakHyphen/><w:br w:type="page"/>'
+                                          f'<w:cr/><w:ptab w:relativeTo="margin" w:alignment="left" '
+                                          f'w:leader="none"/></w:r>'))
+            paragraph._p.append(parse_xml(f'<w:ins {nsdecls("w")} w:id="1" w:author="a">'
+                                          f'<w:r><w:t>inserted</w:t></w:r></w:ins>'))
+        if rng.random() < 0.3:
+            continue
+
+        rows, cols = rng.randint(1, 5), rng.randint(1, 4)
+        table = doc.add_table(rows=rows, cols=cols)
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = f"t{block}r{row_index}c{col_index}"
+                if rng.random() < 0.2:
+                    cell.add_paragraph('second paragraph')
+        if rows > 2 and cols > 2 and rng.random() < 0.5:
+            # Horizontal, vertical and block merges
+            table.cell(0, 0).merge(table.cell(0, 1))
+            table.cell(1, 2).merge(table.cell(rows - 1, 2))
+            table.cell(1, 0).merge(table.cell(2, 1))
+        if rng.random() < 0.3:
+            nested = table.cell(0, cols - 1).add_table(2, 2)
+            nested.cell(0, 0).text = 'nested'
+            nested.cell(1, 1).add_table(1, 2).cell(0, 1).text = 'nested twice'
+    doc.add_paragraph('end')
+    doc.save(str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize('extract_tables', [True, False])
+def test_extract_content_matches_python_docx(tmp_path, extract_tables):
+    for seed in range(60):
+        docx_path = make_docx(tmp_path / f'doc_{seed}.docx', seed)
+        assert DocExtractor.extract_content(docx_path, extract_tables) == \
+            python_docx_content(docx_path, extract_tables), seed
+
+
+def test_iter_content_yields_one_line_per_paragraph_and_row(tmp_path):
+    docx_path = make_docx(tmp_path / 'doc.docx', seed=0)
+    doc = Document(docx_path)
+    lines = list(DocExtractor.iter_content(docx_path))
+    assert len(lines) == len(doc.paragraphs) + sum(len(table.rows) for table in doc.tables)
+    assert '\n'.join(lines) == python_docx_content(docx_path)
@@ -0,0 +1,88 @@
+import io
+import random
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import chunks_extractor
+from chunks_extractor import ChunksExtractor
+
+WORDS = 'the cat sat on a mat and then Dr. Smith e.g. went home etc. quickly Mr. Brown said hello world'.split()
+ENDINGS = ['.', '!', '?', '', '.', ' Dr.', ' etc.', ' e.g.', '."', '.)']
+GAPS = ['\n\n', '\n \n', '\n\n\n', '\n', '  \n\n  ']
+
+
+def random_document(rng: random.Random, size: int) -> str:
+    parts = list()
+    length = 0
+    while length < size:
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 20))) + rng.choice(ENDINGS)
+                     for _ in range(rng.randint(1, 6))]
+        parts.append(' '.join(sentences))
+        parts.append(rng.choice(GAPS))
+        length += len(parts[-2]) + len(parts[-1])
+    return ''.join(parts)
+
+
+@pytest.fixture
+def small_shards(monkeypatch, sent_tokenize):
+    """Shards of a few paragraphs, tokenized in a pool of 4 processes."""
+    monkeypatch.setattr(chunks_extractor, 'NLTK_SHARD_SIZE', 1500)
+    monkeypatch.setattr(chunks_extractor, '_available_cpus', lambda: 4)
+
+
+@pytest.mark.parametrize('strategy, tokenize', [('nltk-sentence', chunks_extractor._sentence_spans),
+                                                ('nltk-paragraphs', chunks_extractor._paragraph_spans)])
+def test_sharded_spans_match_serial(strategy, tokenize, small_shards):
+    for seed in range(10):
+        text = random_document(random.Random(seed), 30000)
+        assert len(chunks_extractor._shard_bounds(text, 1500)) > 10
+        assert ChunksExtractor.chunking_spans(text, strategy, 0, 0) == tokenize(text), seed
+        assert ChunksExtractor.chunking_spans(text, strategy, 0, 0, parallel=False) == tokenize(text), seed
+    # One pool for all the texts
+    assert chunks_extractor._nltk_executor is not None
+
+
+def test_pipeline_workers_do_not_start_nested_pools(monkeypatch, small_shards):
+    monkeypatch.setattr(chunks_extractor, '_get_nltk_executor', lambda: pytest.fail("nested NLTK pool"))
+    text = random_document(random.Random(0), 30000)
+    spans, _ = ChunksExtractor.document_chunks(text, 'nltk-sentence', 0, 0, parallel=False)
+    assert spans == chunks_extractor._sentence_spans(text)
+
+
+def test_shards_end_after_blank_line_gaps(small_shards):
+    text = random_document(random.Random(0), 30000)
+    bounds = chunks_extractor._shard_bounds(text, 1500, chunks_extractor._is_sentence_boundary)
+    assert bounds[0] == 0 and bounds[-1] == len(text)
+    for bound in bounds[1:-1]:
+        # A gap ends here, and does not go on
+        assert text[:bound].rstrip(' \t').endswith('\n') and not text[bound].isspace()
+
+
+class InProcessPool(ThreadPoolExecutor):
+    """The chunking pool, run on threads so that the test sees what its workers call."""
+    started = list()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started.append(self)
+
+
+def test_pipeline_reuses_one_pool_without_nested_pools(monkeypatch, small_shards):
+    monkeypatch.setattr(chunks_extractor, 'ProcessPoolExecutor', InProcessPool)
+    monkeypatch.setattr(InProcessPool, 'started', list())
+    monkeypatch.setattr(chunks_extractor, '_chunk_executor', None)
+    monkeypatch.setattr(chunks_extractor, '_get_nltk_executor', lambda: pytest.fail("nested NLTK pool"))
+    monkeypatch.setattr(ChunksExtractor, 'upload_document_chunks', lambda text, spans, **kwargs: spans)
+    texts = [random_document(random.Random(seed), 30000) for seed in range(4)]
+    items = [SimpleNamespace(id=f'item-{ind}', name=f'doc-{ind}.txt', mimetype='text/plain',
+                             download=lambda save_locally, text=text: io.BytesIO(text.encode('utf-8')))
+             for ind, text in enumerate(texts)]
+    for _ in range(2):
+        results = ChunksExtractor.chunk_items_pipeline(items, 'nltk-sentence', 0, 0, '/chunks')
+        assert [result['chunks'] for result in results] == [chunks_extractor._sentence_spans(text) for text in texts]
+    # One pool for both calls, of one worker per CPU
+    assert len(InProcessPool.started) == 1
+    assert InProcessPool.started[0]._max_workers == 4
+    InProcessPool.started[0].shutdown()
@@ -0,0 +1,138 @@
+import json
+import os
+from types import SimpleNamespace
+
+import dtlpy as dl
+import pytest
+
+import chunks_extractor
+from chunks_extractor import ChunksExtractor
+from modules.txt import packed_chunks
+from modules.txt.packed_chunks import iter_packed_records, read_packed_record, read_packed_records
+from txt_to_prompt import ServiceRunner
+
+RECORDS = [{'chunk_index': ind, 'start_offset': ind * 10, 'end_offset': ind * 10 + 9, 'text': text, 'metadata': {}}
+           for ind, text in enumerate(['first chunk', 'second – chunk\nwith a newline', 'third chunk'])]
+CONTENT = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in RECORDS).encode('utf-8')
+
+
+class PackedItem(SimpleNamespace):
+    def download(self, local_path=None, save_locally=True):
+        file_path = os.path.join(local_path, self.name)
+        with open(file_path, 'wb') as f:
+            f.write(CONTENT)
+        return file_path
+
+
+class FakeItems:
+    def __init__(self):
+        self.uploads = list()
+
+    def upload(self, local_path, overwrite, raise_on_error):
+        rows = local_path.to_dict('records')
+        self.uploads.append(rows)
+        return [SimpleNamespace(name=row['local_path'].name, metadata=row['item_metadata']) for row in rows]
+
+
+def make_packed_item():
+    return PackedItem(id='packed', name='doc-chunks.jsonl', dataset_id='dataset', mimetype='application/jsonl',
+                      dataset=SimpleNamespace(items=FakeItems()),
+                      metadata={'user': {'packed_chunks': True, 'num_chunks': len(RECORDS)}})
+
+
+def test_records_are_read_with_their_byte_ranges():
+    records = list(iter_packed_records(make_packed_item()))
+    assert [record for _, _, record in records] == RECORDS
+    assert [CONTENT[offset:offset + length] for offset, length, _ in records] == CONTENT.splitlines(keepends=True)
+
+
+def ranged_requests(monkeypatch, content: bytes, status_code: int = 206) -> list:
+    """Serves ranged requests of `content`, and returns the list of the requested ranges."""
+    requests = list()
+
+    def gen_request(req_type, path, headers, dataset_id):
+        requests.append(headers['Range'])
+        start, end = headers['Range'][len('bytes='):].split('-')
+        # A server that ignores the range returns the whole item
+        ranged = content[int(start):int(end) + 1 if end else None]
+        return True, SimpleNamespace(status_code=status_code, content=ranged if status_code == 206 else content)
+
+    monkeypatch.setattr(dl.client_api, 'gen_request', gen_request)
+    return requests
+
+
+@pytest.mark.parametrize('status_code', [206, 200])
+def test_record_is_read_by_byte_range(monkeypatch, status_code):
+    requests = ranged_requests(monkeypatch, CONTENT, status_code)
+    item = make_packed_item()
+    for offset, length, record in iter_packed_records(item):
+        assert read_packed_record(item, offset, length) == record
+    assert len(requests) == len(RECORDS)
+
+
+class PackingItems:
+    """Dataset items keeping the content and metadata of the uploaded packed item."""
+
+    def upload(self, local_path, remote_path, item_metadata, overwrite, raise_on_error):
+        with open(local_path, 'rb') as f:
+            self.content = f.read()
+        return SimpleNamespace(id='packed', name=os.path.basename(local_path), dataset_id='dataset',
+                               mimetype='application/jsonl', metadata=item_metadata)
+
+
+@pytest.fixture
+def packed_item(monkeypatch):
+    """A packed item of 53 chunks, indexed every 10 records."""
+    monkeypatch.setattr(chunks_extractor, 'PACKED_INDEX_INTERVAL', 10)
+    item = SimpleNamespace(name='doc.txt', dir='/', dataset=SimpleNamespace(items=PackingItems()))
+    chunks = ((ind * 10, ind * 10 + 9, f"chunk – {ind}\n" * (ind % 4)) for ind in range(53))
+    [packed] = ChunksExtractor.upload_packed_chunks(chunks, item, '/chunks', {'user': {'original_item_id': 'doc'}})
+    packed.content = item.dataset.items.content
+    return packed
+
+
+def test_packed_item_has_a_byte_offset_index(packed_item):
+    index = packed_item.metadata['user']['packed_chunks_index']
+    assert index['interval'] == 10
+    lines = packed_item.content.splitlines(keepends=True)
+    assert len(lines) == 53
+    assert index['offsets'] == [len(b''.join(lines[:ind])) for ind in range(0, 53, 10)]
+
+
+@pytest.mark.parametrize('record_start, record_count', [(0, 0), (0, 1), (7, 5), (10, 10), (19, 2), (45, 0), (50, 10),
+                                                        (60, 3)])
+def test_record_range_is_read_with_one_ranged_request(monkeypatch, packed_item, record_start, record_count):
+    requests = ranged_requests(monkeypatch, packed_item.content)
+    records = [json.loads(line) for line in packed_item.content.splitlines()]
+    record_end = record_start + record_count if record_count else None
+    assert read_packed_records(packed_item, record_start, record_count) == records[record_start:record_end]
+    assert len(requests) == 1
+    # At most one index interval is read before and after the range
+    start, end = requests[0][len('bytes='):].split('-')
+    lines = packed_item.content.splitlines(keepends=True)
+    assert int(start) >= len(b''.join(lines[:max(0, min(record_start, 50) - 9)]))
+    if record_count and record_start + record_count < 50:
+        assert int(end) < len(b''.join(lines[:record_start + record_count + 10]))
+
+
+def test_record_range_of_an_item_without_index_is_read_from_the_download(monkeypatch):
+    monkeypatch.setattr(dl.client_api, 'gen_request', lambda **kwargs: pytest.fail("ranged request"))
+    assert read_packed_records(make_packed_item(), 1, 1) == RECORDS[1:2]
+    assert read_packed_records(make_packed_item()) == RECORDS
+
+
+def test_packed_item_prompt_holds_the_record_range(monkeypatch, packed_item):
+    ranged_requests(monkeypatch, packed_item.content)
+    packed_item.dataset = SimpleNamespace(items=SimpleNamespace(upload=lambda prompt_item, remote_path, item_metadata,
+                                                                overwrite: SimpleNamespace(id='prompt',
+                                                                                           name=prompt_item.name,
+                                                                                           prompt_item=prompt_item,
+                                                                                           metadata=item_metadata)))
+    node_config = {'output_dir': '/prompts', 'record_start': 12, 'record_count': 3}
+    context = SimpleNamespace(node=SimpleNamespace(metadata={'customNodeConfig': node_config}))
+    prompt_item = ServiceRunner().run(packed_item, context)
+
+    assert prompt_item.name == 'doc-chunks_12-15.json'
+    records = [json.loads(line) for line in packed_item.content.splitlines()][12:15]
+    assert prompt_item.prompt_item.prompts[0].elements[0]['value'] == '\n\n'.join(record['text'] for record in records)
+    assert prompt_item.metadata['user'] == {'source_item_id': 'packed', 'record_start': 12, 'record_count': 3}
@@ -0,0 +1,226 @@
+import io
+import os
+import random
+import time
+from itertools import islice
+from types import SimpleNamespace
+
+import dtlpy as dl
+import fitz
+import pytest
+
+import pdf_extractor
+from pdf_extractor import PdfExtractor
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'café', 'naïve', 'Größe', '日本']
+
+
+def make_pdf(path, pages: int, seed: int = 0) -> str:
+    """A PDF with text pages, blank pages and pages with an image."""
+    rng = random.Random(seed)
+    image = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), 0)
+    image.set_rect(image.irect, (200, 30, 30))
+    with fitz.open() as doc:
+        for page_index in range(pages):
+            page = doc.new_page()
+            if page_index % 7 != 3:
+                text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 300)))
+                page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {page_index + 1}\n{text}", fontsize=9)
+            if page_index % 5 == 0:
+                page.insert_image(fitz.Rect(10, 10, 60, 60), stream=image.tobytes('png'))
+        doc.save(str(path))
+    return str(path)
+
+
+def serial_pages(pdf_path: str):
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc]
+
+
+@pytest.mark.parametrize('num_workers, pages_per_shard, page_timeout', [
+    (1, 50, 0),  # serial
+    (3, 4, 0),  # process pool
+    (3, 50, 0),  # fewer pages than one shard - serial
+    (1, 50, 60),  # supervised, one worker
+    (3, 4, 60),  # supervised shards
+])
+def test_pages_text_matches_serial(tmp_path, num_workers, pages_per_shard, page_timeout):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    skipped_pages = list()
+    pages = list(PdfExtractor.extract_pages_text(pdf_path, num_workers=num_workers, pages_per_shard=pages_per_shard,
+                                                 page_timeout=page_timeout, skipped_pages=skipped_pages))
+    assert pages == serial_pages(pdf_path)
+    assert skipped_pages == []
+
+
+@pytest.mark.parametrize('page_timeout', [0, 60])
+def test_resumed_pages_match_serial(tmp_path, page_timeout):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    pages = list(PdfExtractor.extract_pages_text(pdf_path, num_workers=3, pages_per_shard=4, start_page=9,
+                                                 page_timeout=page_timeout))
+    assert pages == serial_pages(pdf_path)[9:]
+
+
+def test_document_and_page_files_match_serial(tmp_path):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    expected = '\n\n'.join(serial_pages(pdf_path))
+    for num_workers, page_timeout in [(1, 0), (3, 0), (3, 60)]:
+        [text_path] = PdfExtractor.extract_text_from_pdf(pdf_path, num_workers=num_workers, pages_per_shard=4,
+                                                         page_timeout=page_timeout)
+        with open(text_path, encoding='utf-8') as f:
+            assert f.read() == expected
+
+        page_files = PdfExtractor.extract_text_by_pages(pdf_path, pages_per_item=5, num_workers=num_workers,
+                                                        pages_per_shard=4, page_timeout=page_timeout)
+        texts = list()
+        for path, metadata in page_files:
+            with open(path, encoding='utf-8') as f:
+                texts.append(f.read())
+            assert expected[metadata['char_start']:metadata['char_end']] == texts[-1]
+        assert '\n\n'.join(texts) == expected
+        assert [metadata['page_start'] for _, metadata in page_files] == [1, 6, 11, 16, 21]
+
+
+def slow_page_text(page) -> str:
+    if page.number == 5:
+        time.sleep(60)
+    return page.get_text()
+
+
+def test_supervised_pages_skip_a_page_over_budget(tmp_path):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=12)
+    tic = time.monotonic()
+    results = list(pdf_extractor._supervised_pages(pdf_path, page_function=slow_page_text, page_timeout=1,
+                                                   num_workers=2, pages_per_shard=4))
+    assert time.monotonic() - tic < 30
+    expected = serial_pages(pdf_path)
+    expected[5] = None
+    assert results == list(enumerate(expected))
+
+
+class FakeCheckpointItems:
+    """Dataset items holding the checkpoints of one PDF item, keyed by file path, and its uploaded text items."""
+
+    def __init__(self):
+        self.files = dict()
+        self.uploads = list()
+        self.fail_text_upload = False
+
+    def upload(self, local_path, overwrite, raise_on_error, remote_path=None, remote_name=None, item_metadata=None):
+        if remote_path is None:
+            # The text items, in a data-frame
+            if self.fail_text_upload:
+                raise dl.exceptions.InternalServerError('500', "Upload failed")
+            return [SimpleNamespace(name=os.path.basename(row['local_path'])) for _, row in local_path.iterrows()]
+        with open(local_path, 'rb') as f:
+            content = f.read()
+        self.uploads.append((remote_name, len(content)))
+        self.files[f"{remote_path}/{remote_name}"] = SimpleNamespace(
+            metadata=item_metadata, download=lambda save_locally: io.BytesIO(content))
+
+    def list(self, filters):
+        conditions = {condition.field: condition.values for condition in filters.and_filter_list}
+        item_id = conditions['metadata.user.pdf_extraction_checkpoint.original_item_id']
+        checkpoints = [checkpoint for checkpoint in self.files.values()
+                       if checkpoint.metadata['user']['pdf_extraction_checkpoint']['original_item_id'] == item_id]
+        return SimpleNamespace(all=lambda: iter(checkpoints))
+
+    def delete(self, filters):
+        for checkpoint in list(self.list(filters).all()):
+            self.files = {filepath: other for filepath, other in self.files.items() if other is not checkpoint}
+
+
+def crash_after(monkeypatch, pages: int):
+    """Makes the next extractions die with a MemoryError after `pages` pages."""
+    extract_pages_text = PdfExtractor.extract_pages_text
+
+    def crashing_pages(**kwargs):
+        yield from islice(extract_pages_text(**kwargs), pages)
+        raise MemoryError
+
+    monkeypatch.setattr(PdfExtractor, 'extract_pages_text', crashing_pages)
+    return extract_pages_text
+
+
+def test_streaming_checkpoints_are_parts_of_the_text(tmp_path, monkeypatch):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    expected = '\n\n'.join(serial_pages(pdf_path)).encode('utf-8')
+    item = SimpleNamespace(id='pdf', dataset=SimpleNamespace(items=FakeCheckpointItems()))
+
+    # The first execution dies after the checkpoint of page 10
+    extract_pages_text = crash_after(monkeypatch, 12)
+    with pytest.raises(MemoryError):
+        PdfExtractor.extract_text_streaming(pdf_path, item, checkpoint_interval=5)
+    # Each part holds only the pages since the previous checkpoint
+    checkpoints = item.dataset.items.files
+    assert list(checkpoints) == ['/.pdf_extraction_checkpoints/pdf-0.checkpoint',
+                                 '/.pdf_extraction_checkpoints/pdf-5.checkpoint']
+    parts = [checkpoint.download(save_locally=False).read() for checkpoint in checkpoints.values()]
+    assert b''.join(parts) == '\n\n'.join(serial_pages(pdf_path)[:10]).encode('utf-8')
+    assert [checkpoint.metadata['user']['pdf_extraction_checkpoint']['next_page']
+            for checkpoint in checkpoints.values()] == [5, 10]
+
+    # The second one dies after the checkpoint of page 20, and only uploads the new pages
+    monkeypatch.setattr(PdfExtractor, 'extract_pages_text', extract_pages_text)
+    crash_after(monkeypatch, 12)
+    with pytest.raises(MemoryError):
+        PdfExtractor.extract_text_streaming(pdf_path, item, checkpoint_interval=5)
+    assert [name for name, _ in item.dataset.items.uploads] == [
+        'pdf-0.checkpoint', 'pdf-5.checkpoint', 'pdf-10.checkpoint', 'pdf-15.checkpoint']
+    uploaded_bytes = sum(size for _, size in item.dataset.items.uploads)
+    assert uploaded_bytes == len('\n\n'.join(serial_pages(pdf_path)[:20]).encode('utf-8'))
+
+    # The last one completes, and keeps the checkpoints until the text item is uploaded
+    monkeypatch.setattr(PdfExtractor, 'extract_pages_text', extract_pages_text)
+    [text_path] = PdfExtractor.extract_text_streaming(pdf_path, item, checkpoint_interval=5)
+    with open(text_path, 'rb') as f:
+        assert f.read() == expected
+    assert len(item.dataset.items.files) == 4
+    PdfExtractor.delete_checkpoints(item)
+    assert item.dataset.items.files == dict()
+
+
+def test_checkpoints_are_deleted_only_after_the_text_upload(tmp_path, monkeypatch):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    items = FakeCheckpointItems()
+
+    def download(local_path):
+        with open(pdf_path, 'rb') as source, open(os.path.join(local_path, 'doc.pdf'), 'wb') as f:
+            f.write(source.read())
+        return os.path.join(local_path, 'doc.pdf')
+
+    item = SimpleNamespace(id='pdf', name='doc.pdf', dir='/', mimetype='application/pdf', download=download,
+                           dataset=SimpleNamespace(items=items))
+    node_config = {'extract_images': False, 'remote_path_for_extractions': '/extracted', 'streaming': True,
+                   'checkpoint_interval': 5}
+    context = SimpleNamespace(node=SimpleNamespace(metadata={'customNodeConfig': node_config}))
+
+    items.fail_text_upload = True
+    with pytest.raises(dl.exceptions.InternalServerError):
+        PdfExtractor().pdf_extraction(item, context)
+    assert len(items.files) == 4
+
+    # The retry resumes from page 20 and deletes the checkpoints once the text item is uploaded
+    items.fail_text_upload = False
+    extract_pages_text = PdfExtractor.extract_pages_text
+    monkeypatch.setattr(PdfExtractor, 'extract_pages_text',
+                        lambda **kwargs: (pytest.fail("page extracted again") if kwargs['start_page'] < 20
+                                          else extract_pages_text(**kwargs)))
+    [text_item] = PdfExtractor().pdf_extraction(item, context)
+    assert text_item.name == 'doc.txt'
+    assert items.files == dict()
+
+
+@pytest.mark.parametrize('num_workers, page_timeout', [(1, 0), (3, 0), (3, 60)])
+def test_triage_reuses_the_extracted_text(tmp_path, monkeypatch, num_workers, page_timeout):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=23)
+    expected = PdfExtractor.triage_pages(pdf_path)
+    page_chars = dict()
+    PdfExtractor.extract_text_from_pdf(pdf_path, num_workers=num_workers, pages_per_shard=4,
+                                       page_timeout=page_timeout, page_chars=page_chars)
+    assert sorted(page_chars) == list(range(1, 24))
+
+    monkeypatch.setattr(fitz.Page, 'get_text', lambda *args, **kwargs: pytest.fail("text extracted again"))
+    assert PdfExtractor.triage_pages(pdf_path, page_chars=page_chars) == expected
+    # Pages 4 and 18 have no text, page 11 only an image
+    assert expected['counts']['empty'] == 2 and expected['counts']['image'] == 1
@@ -0,0 +1,142 @@
+import os
+import random
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+import pdf_to_image
+from pdf_to_image import ServiceRunner
+
+
+def make_pdf(path, pages: int, seed: int = 0) -> str:
+    """A PDF with text pages in a few colors, blank pages and pages with an image."""
+    rng = random.Random(seed)
+    image = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), 0)
+    image.set_rect(image.irect, (200, 30, 30))
+    with fitz.open() as doc:
+        for page_index in range(pages):
+            page = doc.new_page()
+            if page_index % 6 != 2:
+                text = ' '.join(rng.choice(['alpha', 'beta', 'gamma', 'café']) for _ in range(rng.randint(10, 200)))
+                page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9,
+                                    color=(rng.random(), rng.random(), rng.random()))
+            if page_index % 4 == 0:
+                page.insert_image(fitz.Rect(100, 300, 400, 600), stream=image.tobytes('png'))
+        doc.save(str(path))
+    return str(path)
+
+
+def rendered_files(pdf_path: str, images_path, **kwargs) -> list:
+    """(page number, blank, image bytes, level bytes) of each rendered page."""
+    os.makedirs(images_path)
+    files = list()
+    for page_number, result in ServiceRunner.render_pages(file_path=pdf_path, images_path=str(images_path), **kwargs):
+        with open(result['path'], 'rb') as f:
+            image = f.read()
+        levels = dict()
+        for level, level_path in result['levels'].items():
+            with open(level_path, 'rb') as f:
+                levels[level] = f.read()
+        files.append((page_number, result['blank'], image, levels))
+    return files
+
+
+@pytest.mark.parametrize('dpi, colorspace, image_format', [
+    (72, 'rgb', 'png'),
+    (100, 'gray', 'png'),
+    (72, 'rgb', 'jpeg'),
+    (50, 'gray', 'jpeg'),
+    (72, 'rgb', 'webp'),
+])
+def test_parallel_renders_match_serial(tmp_path, dpi, colorspace, image_format):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=13)
+    settings = dict(dpi=dpi, colorspace=colorspace, image_format=image_format, blank_page_mode='flag',
+                    pyramid_sizes={'thumbnail': 64})
+    expected = rendered_files(pdf_path, tmp_path / 'serial', **settings)
+    assert [page_number for page_number, *_ in expected] == list(range(13))
+    # Page 2 is blank, page 8 has only an image
+    assert expected[2][1] is True and expected[8][1] is False
+    for name, num_workers, page_timeout in [('processes', 3, 0), ('supervised', 3, 60), ('one supervised', 1, 60)]:
+        assert rendered_files(pdf_path, tmp_path / name, num_workers=num_workers, page_timeout=page_timeout,
+                              **settings) == expected, name
+
+
+def test_parallel_renders_of_a_page_selection_match_serial(tmp_path):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=13)
+    expected = rendered_files(pdf_path, tmp_path / 'serial', page_selection='0-2,every:5,last:2')
+    assert [page_number for page_number, *_ in expected] == [0, 1, 2, 5, 10, 11, 12]
+    assert rendered_files(pdf_path, tmp_path / 'parallel', page_selection='0-2,every:5,last:2',
+                          num_workers=3) == expected
+
+
+class FakeImageItems:
+    """Dataset items recording the uploaded image items and their updates."""
+
+    def __init__(self):
+        self.uploaded = list()
+
+    def upload(self, local_path, overwrite, raise_on_error):
+        img_items = list()
+        for row in local_path.to_dict('records'):
+            img_item = SimpleNamespace(metadata=row['item_metadata'], update=lambda: pytest.fail("image item updated"))
+            img_items.append(img_item)
+        self.uploaded.extend(img_items)
+        return img_items
+
+
+def test_page_lists_are_stored_once_on_the_pdf_item(tmp_path):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=13)
+    os.makedirs(tmp_path / 'images')
+    pages = list(ServiceRunner.render_pages(file_path=pdf_path, images_path=str(tmp_path / 'images'),
+                                            blank_page_mode='flag'))
+    # Page 5 went over its time budget
+    pages[5] = (5, None)
+    updates = list()
+    item = SimpleNamespace(id='pdf', metadata=dict(), dataset=SimpleNamespace(items=FakeImageItems()),
+                           update=lambda: updates.append(True))
+    img_items = ServiceRunner.upload_pages_pipeline(pages=iter(pages), item=item, metadata={'original_item_id': 'pdf'},
+                                                    record_skipped=True, record_blank=True, upload_batch_size=4)
+    assert item.metadata['user']['pdf_to_image'] == {'skipped_pages': [5], 'blank_pages': [2]}
+    assert updates == [True]
+    assert [img_item.metadata['user']['pdf_to_image']['page_number'] for img_item in img_items] == \
+        [page_number for page_number in range(13) if page_number != 5]
+    for img_item in img_items:
+        img_metadata = img_item.metadata['user']['pdf_to_image']
+        assert set(img_metadata) == {'original_item_id', 'page_number', 'blank'}
+        assert img_metadata['blank'] is (img_metadata['page_number'] == 2)
+
+
+def test_failed_cache_hit_does_not_leave_links_to_the_cached_files(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    images_path = tmp_path / 'images'
+    os.makedirs(cache_dir)
+    os.makedirs(images_path / 'thumbnail')
+    (images_path / 'page.png').write_bytes(b'full')
+    (images_path / 'thumbnail' / 'page.png').write_bytes(b'thumbnail')
+    pdf_to_image._render_cache_put(str(cache_dir), 'key', {'path': str(images_path / 'page.png'), 'blank': False,
+                                                           'levels': {'thumbnail': str(images_path / 'thumbnail' /
+                                                                                       'page.png')}})
+    os.remove(images_path / 'page.png')
+    os.remove(images_path / 'thumbnail' / 'page.png')
+    # The full image links, and the thumbnail is gone
+    os.remove(cache_dir / 'key' / 'thumbnail.png')
+    image_filename = str(images_path / 'page.png')
+    assert pdf_to_image._render_cache_get(str(cache_dir), 'key', image_filename) is None
+    assert not os.path.exists(image_filename)
+
+    # Rendering the page again does not change the cached image
+    with open(image_filename, 'wb') as f:
+        f.write(b'rendered again')
+    assert (cache_dir / 'key' / 'full.png').read_bytes() == b'full'
+
+
+def test_convert_pdf_to_image_returns_the_rendered_pages(tmp_path):
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', pages=7)
+    skipped_pages, blank_pages = list(), list()
+    paths = ServiceRunner.convert_pdf_to_image(file_path=pdf_path, temp_dir=str(tmp_path), skipped_pages=skipped_pages,
+                                               blank_page_mode='drop', blank_pages=blank_pages)
+    # Page 2 is blank and dropped
+    assert blank_pages == [2] and skipped_pages == []
+    assert [os.path.dirname(path) for path in paths] == [os.path.join(str(tmp_path), 'images_files')] * 6
+    assert all(os.path.getsize(path) > 0 for path in paths)
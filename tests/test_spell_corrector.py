@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from autocorrect import Speller
+
+from chunks_extractor import SpellCorrector, get_spell_corrector
+
+TYPO_CHARS = 'abcdefghijklmnopqrstuvwxyzEXQ'
+
+
+@pytest.fixture(scope='module')
+def speller():
+    return Speller(lang='en')
+
+
+@pytest.fixture(scope='module')
+def spell_corrector():
+    return SpellCorrector(lang='en')
+
+
+def mutate(rng: random.Random, word: str) -> str:
+    """Applies up to three random deletions, insertions, replacements or transpositions."""
+    word = list(word)
+    for _ in range(rng.randint(0, 3)):
+        operation = rng.randint(0, 3)
+        ind = rng.randint(0, max(len(word) - 1, 0))
+        if operation == 0 and word:
+            del word[ind]
+        elif operation == 1:
+            word.insert(ind, rng.choice(TYPO_CHARS))
+        elif operation == 2 and word:
+            word[ind] = rng.choice(TYPO_CHARS)
+        elif operation == 3 and ind < len(word) - 1:
+            word[ind], word[ind + 1] = word[ind + 1], word[ind]
+    return ''.join(word)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_corrections_match_autocorrect(seed, speller, spell_corrector):
+    rng = random.Random(seed)
+    words = sorted(word for word in speller.nlp_data if word.isalpha() and word.isascii())
+    sample = [mutate(rng, rng.choice(words)) for _ in range(100)]
+    sample = [word for word in sample if word]
+    if seed == 0:
+        sample += ['Teh', 'THe', 'Hellp', 'xyzzq', 'qwrtzp', 'Ab', 'ca', 'Exmaple', 'COIBott']
+    for word in sample:
+        assert spell_corrector(word) == speller(word), word
+
+
+def test_sentences_match_autocorrect(speller, spell_corrector):
+    for sentence in ['Ths is a smple sentnce, with sme typos.',
+                     "it's 42 degres outsde - isnt it?",
+                     'Mixed CASE Wrods and ünïcode wrds',
+                     '']:
+        assert spell_corrector(sentence) == speller(sentence)
+
+
+def test_spell_corrector_is_shared():
+    assert get_spell_corrector() is get_spell_corrector()
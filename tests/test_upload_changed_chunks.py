@@ -0,0 +1,185 @@
+import io
+import itertools
+import json
+import os
+from types import SimpleNamespace
+
+import dtlpy as dl
+
+from chunks_extractor import ChunksExtractor
+
+
+class FakeItem(SimpleNamespace):
+    def update(self):
+        return self
+
+    def download(self, save_locally):
+        assert save_locally is False
+        return io.BytesIO(self.text.encode('utf-8'))
+
+
+class FakeItems:
+    """
+    Items of a dataset: bulk data-frame or single file upload that overwrites by path, get by id and delete by filters.
+    """
+
+    def __init__(self):
+        self.items = dict()
+        self.ids = itertools.count()
+        self.gets = 0
+
+    def upload(self, local_path, overwrite, raise_on_error, remote_path=None, item_metadata=None):
+        if isinstance(local_path, str):
+            with open(local_path, 'rb') as f:
+                return self._put(remote_path, os.path.basename(local_path), f.read(), item_metadata)
+        return [self._put(row['remote_path'], row['local_path'].name, row['local_path'].read(), row['item_metadata'])
+                for _, row in local_path.iterrows()]
+
+    def _put(self, remote_path, name, content, metadata):
+        directory = '/' + remote_path.strip('/')
+        existing = [item for item in self.items.values() if item.dir == directory and item.name == name]
+        item = FakeItem(id=existing[0].id if existing else f"chunk-{next(self.ids)}", dir=directory, name=name,
+                        text=content.decode('utf-8'), metadata=metadata)
+        self.items[item.id] = item
+        return item
+
+    def get(self, item_id):
+        self.gets += 1
+        if item_id not in self.items:
+            raise dl.exceptions.NotFound('404', f"Item not found: {item_id}")
+        return self.items[item_id]
+
+    def delete(self, filters):
+        for item in list(self.items.values()):
+            if all(self._matches(item, condition) for condition in filters.and_filter_list
+                   if condition.field not in ('hidden', 'type')):
+                del self.items[item.id]
+        return True
+
+    @staticmethod
+    def _matches(item, condition):
+        value = item
+        for key in condition.field.split('.'):
+            value = value.get(key) if isinstance(value, dict) else getattr(value, key, None)
+        if condition.operator == dl.FiltersOperations.IN:
+            return value in condition.values
+        if condition.operator == dl.FiltersOperations.NIN:
+            return value not in condition.values
+        if condition.operator == dl.FiltersOperations.NOT_EQUAL:
+            return value != condition.values
+        return value == condition.values
+
+
+def make_document():
+    dataset = SimpleNamespace(id='dataset', items=FakeItems())
+    return FakeItem(id='document', name='doc.txt', dir='/', dataset=dataset, metadata=dict())
+
+
+def upload(item, chunks):
+    spans, start = list(), 0
+    for chunk in chunks:
+        spans.append((start, start + len(chunk)))
+        start += len(chunk) + 1
+    return ChunksExtractor.upload_changed_chunks(chunks=chunks, item=item, remote_path_for_chunks='/chunks',
+                                                 metadata=ChunksExtractor.chunks_metadata(item), spans=spans)
+
+
+def chunk_items_of(item):
+    return [chunk_item for chunk_item in item.dataset.items.items.values()
+            if chunk_item.metadata['user'].get('extracted_chunk') is True]
+
+
+def offsets(item):
+    chunk_items = sorted(chunk_items_of(item), key=lambda chunk_item: chunk_item.metadata['user']['chunk_index'])
+    return [(chunk_item.text, chunk_item.metadata['user']['chunk_index'], chunk_item.metadata['user']['start_offset'],
+             chunk_item.metadata['user']['end_offset']) for chunk_item in chunk_items]
+
+
+def test_identical_chunks_keep_their_own_items():
+    item = make_document()
+    uploaded = upload(item, ['header', 'body', 'header'])
+    assert len(uploaded) == 3
+    assert offsets(item) == [('header', 0, 0, 6), ('body', 1, 7, 11), ('header', 2, 12, 18)]
+
+
+def test_moved_chunks_keep_their_item_and_get_new_offsets():
+    item = make_document()
+    upload(item, ['alpha', 'beta', 'gamma'])
+    ids = {chunk_item.text: chunk_item.id for chunk_item in chunk_items_of(item)}
+
+    uploaded = upload(item, ['new', 'alpha', 'gamma'])
+    assert [chunk_item.text for chunk_item in uploaded] == ['new']
+    assert offsets(item) == [('new', 0, 0, 3), ('alpha', 1, 4, 9), ('gamma', 2, 10, 15)]
+    assert {chunk_item.text: chunk_item.id for chunk_item in chunk_items_of(item)
+            if chunk_item.text != 'new'} == {'alpha': ids['alpha'], 'gamma': ids['gamma']}
+
+    # Nothing moved - only the manifest item is fetched
+    gets = item.dataset.items.gets
+    assert upload(item, ['new', 'alpha', 'gamma']) == []
+    assert item.dataset.items.gets == gets + 1
+
+
+def test_deleted_chunk_items_are_uploaded_again():
+    item = make_document()
+    upload(item, ['alpha', 'beta'])
+    beta = next(chunk_item for chunk_item in chunk_items_of(item) if chunk_item.text == 'beta')
+    del item.dataset.items.items[beta.id]
+    uploaded = upload(item, ['beta', 'alpha'])
+    assert [chunk_item.text for chunk_item in uploaded] == ['beta']
+    assert offsets(item) == [('beta', 0, 0, 4), ('alpha', 1, 5, 10)]
+
+
+def test_first_incremental_run_deletes_regular_chunks():
+    item = make_document()
+    ChunksExtractor.upload_chunks(chunks=['alpha', 'beta'], item=item, remote_path_for_chunks='/chunks',
+                                  metadata=ChunksExtractor.chunks_metadata(item), spans=[(0, 5), (6, 10)])
+    other = make_document()
+    other.id, other.name = 'other', 'other.txt'
+    other.dataset = item.dataset
+    ChunksExtractor.upload_chunks(chunks=['other'], item=other, remote_path_for_chunks='/chunks',
+                                  metadata=ChunksExtractor.chunks_metadata(other), spans=[(0, 5)])
+    upload(item, ['alpha', 'beta'])
+    names = sorted(chunk_item.name for chunk_item in chunk_items_of(item))
+    # The regular chunks of the document are gone, the chunks of the other document are kept
+    assert len(names) == 3
+    assert 'doc-0.txt' not in names and 'doc-1.txt' not in names and 'other-0.txt' in names
+
+
+def test_manifest_is_kept_in_a_json_item():
+    item = make_document()
+    upload(item, ['alpha', 'beta', 'alpha'])
+    manifest_item = item.dataset.items.get(item_id=item.metadata['user']['chunks_manifest_id'])
+    assert (manifest_item.dir, manifest_item.name) == ('/.chunks_manifests', 'document.json')
+    assert 'chunks_manifest' not in item.metadata['user']
+    manifest = json.loads(manifest_item.text)
+    assert sorted(entry['id'] for entry in manifest.values()) == sorted(chunk_item.id for chunk_item in
+                                                                        chunk_items_of(item))
+
+    # The next run overwrites the same manifest item
+    upload(item, ['alpha', 'gamma'])
+    assert item.metadata['user']['chunks_manifest_id'] == manifest_item.id
+    manifest = json.loads(item.dataset.items.get(item_id=manifest_item.id).text)
+    assert sorted(entry['start_offset'] for entry in manifest.values()) == [0, 6]
+    assert sorted(chunk_item.text for chunk_item in chunk_items_of(item)) == ['alpha', 'gamma']
+
+
+def test_manifest_in_the_item_metadata_is_moved_to_a_json_item():
+    item = make_document()
+    upload(item, ['alpha', 'beta'])
+    manifest_item = item.dataset.items.items.pop(item.metadata['user'].pop('chunks_manifest_id'))
+    # As older versions kept it
+    item.metadata['user']['chunks_manifest'] = json.loads(manifest_item.text)
+    assert upload(item, ['alpha', 'beta']) == []
+    assert 'chunks_manifest' not in item.metadata['user']
+    assert json.loads(item.dataset.items.get(item_id=item.metadata['user']['chunks_manifest_id']).text) == \
+        json.loads(manifest_item.text)
+
+
+def test_deleted_manifest_item_uploads_all_the_chunks_again():
+    item = make_document()
+    upload(item, ['alpha', 'beta'])
+    del item.dataset.items.items[item.metadata['user']['chunks_manifest_id']]
+    uploaded = upload(item, ['alpha', 'gamma'])
+    # Chunk items are named by content, so 'alpha' is overwritten and 'beta' is deleted as an orphan
+    assert sorted(chunk_item.text for chunk_item in uploaded) == ['alpha', 'gamma']
+    assert sorted(chunk_item.text for chunk_item in chunk_items_of(item)) == ['alpha', 'gamma']
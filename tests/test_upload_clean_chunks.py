@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from chunks_extractor import ChunksExtractor
+
+
+class FakeItems:
+    """Bulk data-frame upload that overwrites by remote path and name, as the platform does with `overwrite=True`."""
+
+    def __init__(self):
+        self.files = dict()
+
+    def upload(self, local_path, overwrite, raise_on_error):
+        uploaded = dict()
+        for _, row in local_path.iterrows():
+            filepath = f"{row['remote_path']}/{row['local_path'].name}"
+            self.files[filepath] = SimpleNamespace(name=row['local_path'].name,
+                                                   text=row['local_path'].read().decode('utf-8'),
+                                                   metadata=row['item_metadata'])
+            uploaded[filepath] = self.files[filepath]
+        return list(uploaded.values())
+
+
+def chunk_item(dataset, item_id, name):
+    return SimpleNamespace(id=item_id, name=name, dataset=dataset, metadata={'user': {'original_item_id': 'document'}})
+
+
+def test_same_name_chunks_do_not_overwrite_each_other():
+    dataset = SimpleNamespace(id='dataset', items=FakeItems())
+    items = [chunk_item(dataset, 'a', 'chunk-1.txt'),
+             chunk_item(dataset, 'b', 'chunk-1.txt'),
+             chunk_item(dataset, 'c', 'chunk-2.txt')]
+    for batch_size in (1, 10):
+        results = ChunksExtractor.upload_clean_chunks(items, ['one', 'two', 'three'], '/clean', batch_size=batch_size)
+        assert [result.name for result in results] == ['chunk-1_a_text.txt', 'chunk-1_b_text.txt', 'chunk-2_c_text.txt']
+        assert [result.text for result in results] == ['one', 'two', 'three']
+        assert [result.metadata['user']['original_chunk_id'] for result in results] == ['a', 'b', 'c']
+
+
+def test_chunks_are_uploaded_per_dataset():
+    first = SimpleNamespace(id='first', items=FakeItems())
+    second = SimpleNamespace(id='second', items=FakeItems())
+    items = [chunk_item(first, 'a', 'chunk-1.txt'), chunk_item(second, 'b', 'chunk-1.txt')]
+    results = ChunksExtractor.upload_clean_chunks(items, ['one', 'two'], '/clean')
+    # Same name in different datasets - no collision
+    assert [result.name for result in results] == ['chunk-1_a_text.txt', 'chunk-1_b_text.txt']
+    assert list(first.items.files) == ['/clean/chunk-1_a_text.txt']
+    assert list(second.items.files) == ['/clean/chunk-1_b_text.txt']
+
+
+def test_cleaning_again_overwrites_the_clean_chunks():
+    dataset = SimpleNamespace(id='dataset', items=FakeItems())
+    items = [chunk_item(dataset, 'a', 'chunk-1.txt'),
+             chunk_item(dataset, 'b', 'chunk-1.txt'),
+             chunk_item(dataset, 'c', 'chunk-2.txt')]
+    ChunksExtractor.upload_clean_chunks(items, ['one', 'two', 'three'], '/clean')
+    # The name of a clean chunk does not depend on the other chunks cleaned with it
+    for item, text in zip(items, ['uno', 'dos', 'tres']):
+        ChunksExtractor.upload_clean_chunks([item], [text], '/clean')
+    assert {filepath: file.text for filepath, file in dataset.items.files.items()} == \
+        {'/clean/chunk-1_a_text.txt': 'uno', '/clean/chunk-1_b_text.txt': 'dos', '/clean/chunk-2_c_text.txt': 'tres'}